@@ -0,0 +1,94 @@
+"""
+End-to-end wall time of `Agent.execute` with the stub model.
+
+The stub plans, answers the internal monologue, asks the user one question and
+writes `--files` files. The user's reply arrives `--reply-after` seconds after the
+question. Everything else is the real pipeline: the agents, the agent state and
+project messages in SQLite, and the files written to the project. The sleeps the
+old pipeline added to the same run (2 s per written file, and a 5 s poll for the
+reply that also slept after finding it) are printed next to the measured time.
+Keyword extraction is skipped, `keyword_model.py` measures it.
+
+    python benchmarks/agent_pipeline.py [--files N] [--reply-after S] [--runs N]
+"""
+import argparse
+import json
+import math
+import threading
+import time
+import uuid
+
+from common import print_table, scratch_workdir
+
+scratch_workdir()
+
+from src.agents.agent import Agent
+from src.config import Config
+from src.llm import LLM
+from src.project import ProjectManager
+
+PLAN = """Project Name: Todo API
+Your Reply to the Human Prompter: I'll build a small todo API.
+Current Focus: A Flask API that stores todo items.
+Plan:
+- [ ] Step 1: Create the Flask application.
+- [ ] Step 2: Add the todo model and routes.
+Summary: A Flask todo API."""
+
+
+def code_response(files: int) -> str:
+    sections = [
+        f"File: `app/module_{n}.py`:\n```py\n" + "".join(f"def handler_{n}_{i}():\n    return {i}\n\n" for i in range(20)) + "```\n"
+        for n in range(files)
+    ]
+    return "~~~\n" + "\n".join(sections) + "~~~"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=15)
+    parser.add_argument("--reply-after", type=float, default=0.5)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--stream-delay-ms", type=int, default=0, help="stub model delay between chunks")
+    args = parser.parse_args()
+
+    config = Config()
+    config.config["STUB_LLM"]["ENABLED"] = "true"
+    config.config["STUB_LLM"]["DELAY_MS"] = args.stream_delay_ms
+    project_manager = ProjectManager()
+    current_project = [None]
+
+    def respond(prompt: str) -> str:
+        if prompt.startswith("Project Step-by-step Plan:"):
+            return code_response(args.files)
+        if prompt.startswith("For the provided step-by-step plan"):
+            # the user answers a moment after the question is asked
+            threading.Timer(
+                args.reply_after, project_manager.add_message_from_user, (current_project[0], "Use SQLite.")
+            ).start()
+            return json.dumps({"queries": [], "ask_user": "Which database should I use?"})
+        if "One of your AI agent module" in prompt:
+            return json.dumps({"internal_monologue": "Planning the todo API."})
+        return PLAN
+
+    LLM.get_provider("STUB").respond_with(respond)
+    agent = Agent(base_model="Stub", search_engine="duckduckgo")
+    agent.update_contextual_keywords = lambda sentence: []
+
+    rows = []
+    for run in range(args.runs):
+        current_project[0] = f"pipeline-{uuid.uuid4().hex[:8]}"
+        project_manager.create_project(current_project[0])
+        start = time.perf_counter()
+        agent.execute("Build a todo API with Flask.", current_project[0])
+        rows.append({"run": run + 1, "seconds": time.perf_counter() - start})
+
+    old_sleeps = 2 * args.files + 5 * (math.ceil(args.reply_after / 5) + 1)
+    print_table(
+        f"Agent.execute writing {args.files} files, reply {args.reply_after:g} s after the question "
+        f"(the old sleeps alone added {old_sleeps} s)", rows
+    )
+
+
+if __name__ == "__main__":
+    main()
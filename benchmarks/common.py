@@ -0,0 +1,75 @@
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import toml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def scratch_workdir() -> str:
+    """
+    Move into a temporary directory set up like a fresh checkout: the sample config,
+    its storage directories and a link to `src` (the agents open their prompts by
+    relative path). Config reads and writes config.toml in the working directory, so
+    benchmarks never touch the real database or projects.
+    """
+    workdir = tempfile.mkdtemp(prefix="devika-bench-")
+    shutil.copy(os.path.join(ROOT, "sample.config.toml"), workdir)
+    os.symlink(os.path.join(ROOT, "src"), os.path.join(workdir, "src"))
+    os.chdir(workdir)
+    for path in toml.load("sample.config.toml")["STORAGE"].values():
+        os.makedirs(os.path.dirname(path) if os.path.splitext(path)[1] else path, exist_ok=True)
+    return workdir
+
+
+def measure(fn, repeat: int, warmup: int = 1) -> dict:
+    """
+    Call `fn` `repeat` times after `warmup` untimed calls and return its latencies in ms.
+    """
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "mean": statistics.fmean(samples),
+        "p50": samples[len(samples) // 2],
+        "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "max": samples[-1],
+    }
+
+
+def print_table(title: str, rows: list):
+    """
+    Print `rows` (dicts with the same keys) as an aligned table.
+    """
+    print(f"\n{title}")
+    if not rows:
+        return
+    columns = list(rows[0])
+    cells = [[f"{row[c]:.3f}" if isinstance(row[c], float) else str(row[c]) for c in columns] for row in rows]
+    widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for r in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(r, widths)))
+
+
+def serve(handler_class) -> str:
+    """
+    Serve `handler_class` (a `BaseHTTPRequestHandler`) on a free local port from a
+    daemon thread and return its base URL.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
@@ -0,0 +1,133 @@
+"""
+Latency of the REST pollers' agent state reads while an agent thread keeps writing.
+
+Reader threads call `AgentState.get_latest_state` in a loop, as `/api/get-agent-state`
+does, while a writer thread appends states. "rollback journal" is the old database:
+SQLite defaults and no index on the project column. "WAL + indexes" is `Database`,
+with `SQLITE_PRAGMAS` and the model indexes.
+
+    python benchmarks/concurrent_state.py [--readers N] [--seconds S]
+"""
+import argparse
+import json
+import os
+import threading
+import time
+
+from common import print_table, scratch_workdir
+
+scratch_workdir()
+
+from sqlalchemy import text
+from sqlmodel import Session, SQLModel, create_engine
+
+from src.database import Database
+from src.state import AgentState, AgentStateEvent, AgentStateModel
+
+PROJECTS = 20
+SEEDED_STATES = 500
+
+
+def legacy_engine(sqlite_path: str):
+    engine = create_engine(f"sqlite:///{sqlite_path}", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine, tables=[AgentStateModel.__table__, AgentStateEvent.__table__])
+    with engine.begin() as connection:
+        for index in AgentStateEvent.__table__.indexes:
+            connection.execute(text(f"DROP INDEX {index.name}"))
+    return engine
+
+
+def shared_engine(sqlite_path: str):
+    database = Database(sqlite_path)
+    database.create_tables(AgentStateModel, AgentStateEvent)
+    return database.engine
+
+
+def agent_state(engine) -> AgentState:
+    # skips __init__, which always binds to the configured database
+    state = AgentState.__new__(AgentState)
+    state.engine = engine
+    return state
+
+
+def append(state: AgentState, project: str, payload: dict):
+    # add_to_current_state without the socket event
+    with Session(state.engine) as session:
+        state._append_state(session, project, payload)
+
+
+def run(engine, readers: int, seconds: float) -> dict:
+    state = agent_state(engine)
+    payload = state.new_state()
+    payload["internal_monologue"] = "x" * 2000
+    rows = [
+        {"project": f"project-{project}", "seq": seq, "state_json": json.dumps(payload)}
+        for project in range(PROJECTS) for seq in range(SEEDED_STATES)
+    ]
+    with engine.begin() as connection:
+        connection.execute(AgentStateEvent.__table__.insert(), rows)
+
+    stop = threading.Event()
+    latencies = []
+    writes = [0]
+    errors = [0]
+    lock = threading.Lock()
+
+    def writer():
+        while not stop.is_set():
+            try:
+                append(state, "project-0", payload)
+                writes[0] += 1
+            except Exception:
+                with lock:
+                    errors[0] += 1
+
+    def reader():
+        samples = []
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                state.get_latest_state("project-0")
+            except Exception:
+                with lock:
+                    errors[0] += 1
+                continue
+            samples.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(samples)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    latencies.sort()
+    return {
+        "reads/s": round(len(latencies) / seconds),
+        "writes/s": round(writes[0] / seconds),
+        "read p50": latencies[len(latencies) // 2],
+        "read p99": latencies[int(len(latencies) * 0.99)],
+        "read max": latencies[-1],
+        "errors": errors[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    rows = []
+    for name, make_engine in (("rollback journal", legacy_engine), ("WAL + indexes", shared_engine)):
+        engine = make_engine(os.path.abspath(f"{name.split()[0].lower()}.db"))
+        rows.append({"database": name, **run(engine, args.readers, args.seconds)})
+    print_table(f"{args.readers} readers and 1 writer for {args.seconds:g} s, latencies in ms", rows)
+
+
+if __name__ == "__main__":
+    main()
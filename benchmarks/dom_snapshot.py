@@ -0,0 +1,125 @@
+"""
+Time of `Crawler.parse_snapshot` on saved `DOMSnapshot.captureSnapshot` results.
+
+By default synthetic snapshots of 10k-100k nodes (sections of paragraphs, links,
+buttons, inputs and images, about a quarter of them in the viewport) are written to
+JSON and loaded back. `--fixture` parses snapshots captured from real pages instead,
+saved as `{"tree": <captureSnapshot result>, "metrics": <WINDOW_METRICS_JS result>}`.
+The cost per node stays flat as pages grow, where the old parse grew quadratically.
+
+    python benchmarks/dom_snapshot.py [--nodes 10000 30000 100000] [--fixture PATH ...]
+"""
+import argparse
+import contextlib
+import io
+import json
+
+from common import measure, print_table, scratch_workdir
+
+scratch_workdir()
+
+from src.browser.interaction import Crawler
+
+METRICS = {
+    "devicePixelRatio": 1, "scrollX": 0, "scrollY": 0, "pageYOffset": 0, "pageXOffset": 0,
+    "screenWidth": 1280, "screenHeight": 1080, "offsetHeight": 4320, "scrollHeight": 4320,
+}
+
+
+def make_snapshot(node_count: int) -> dict:
+    strings, string_ids = [], {}
+    parent, node_type, node_name, node_value, backend_node_id, attributes = [], [], [], [], [], []
+    clickable, layout_nodes, bounds, input_index, input_value = [], [], [], [], []
+
+    def string(value: str) -> int:
+        if value not in string_ids:
+            string_ids[value] = len(strings)
+            strings.append(value)
+        return string_ids[value]
+
+    def add(name, parent_index, value=None, attrs=(), click=False):
+        index = len(parent)
+        parent.append(parent_index)
+        node_type.append(3 if name == "#text" else 1)
+        node_name.append(string(name))
+        node_value.append(string(value) if value is not None else -1)
+        backend_node_id.append(index + 1)
+        attributes.append([string(a) for a in attrs])
+        if click:
+            clickable.append(index)
+        layout_nodes.append(index)
+        bounds.append([16.0, float(index * 6 % METRICS["scrollHeight"]), 400.0, 18.0])
+        return index
+
+    html = add("HTML", -1)
+    body = add("BODY", html)
+    item = 0
+    while len(parent) < node_count:
+        section = add("DIV", body, attrs=("class", "section"))
+        for _ in range(10):
+            paragraph = add("P", section)
+            add("#text", paragraph, f"Paragraph {item} of the fixture page.")
+            link = add("A", section, attrs=("href", f"/page/{item}", "title", f"Page {item}"), click=True)
+            add("#text", link, f"Link {item}")
+            button = add("BUTTON", section, click=True)
+            add("#text", add("SPAN", button), f"Action {item}")
+            field = add("INPUT", section, attrs=("type", "text", "placeholder", "Search"), click=True)
+            input_index.append(field)
+            input_value.append(string(f"query {item}"))
+            add("IMG", section, attrs=("alt", f"Image {item}"))
+            item += 1
+
+    return {
+        "strings": strings,
+        "documents": [{
+            "nodes": {
+                "parentIndex": parent, "nodeType": node_type, "nodeName": node_name,
+                "nodeValue": node_value, "backendNodeId": backend_node_id, "attributes": attributes,
+                "textValue": {"index": [], "value": []},
+                "inputValue": {"index": input_index, "value": input_value},
+                "inputChecked": {"index": []},
+                "isClickable": {"index": clickable},
+            },
+            "layout": {"nodeIndex": layout_nodes, "bounds": bounds},
+        }],
+    }
+
+
+def parse(tree: dict, metrics: dict) -> list:
+    # a crawler without a page: parse_snapshot only needs the element id map
+    crawler = Crawler.__new__(Crawler)
+    crawler.reset_snapshot()
+    with contextlib.redirect_stdout(io.StringIO()):  # parse_snapshot prints its own timing
+        return crawler.parse_snapshot(tree, metrics)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--nodes", type=int, nargs="+", default=[10000, 30000, 100000])
+    parser.add_argument("--fixture", nargs="+", default=[], help="captured snapshots to parse instead")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    fixtures = args.fixture
+    if not fixtures:
+        for node_count in args.nodes:
+            path = f"dom-{node_count}.json"
+            with open(path, "w") as f:
+                json.dump({"tree": make_snapshot(node_count), "metrics": METRICS}, f)
+            fixtures.append(path)
+
+    rows = []
+    for path in fixtures:
+        with open(path) as f:
+            fixture = json.load(f)
+        tree, metrics = fixture["tree"], fixture["metrics"]
+        nodes = len(tree["documents"][0]["nodes"]["parentIndex"])
+        elements = len(parse(tree, metrics))
+        timing = measure(lambda: parse(tree, metrics), args.repeat)
+        rows.append({"fixture": path, "nodes": nodes, "elements": elements, **timing,
+                     "us/node": timing["mean"] * 1000 / nodes})
+    print_table(f"parse_snapshot, ms ({args.repeat} runs)", rows)
+
+
+if __name__ == "__main__":
+    main()
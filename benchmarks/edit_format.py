@@ -0,0 +1,124 @@
+"""
+Output tokens and latency of a small fix answered with SEARCH/REPLACE edits vs whole files.
+
+A fixture project has `--files` files of 300-450 lines and the fix changes one line
+in each. `Patcher.execute` and `save_code_to_project` run on both answers, streamed
+by the stub model at `--tokens-per-second` (about 4 characters per token), so the
+latency includes generation, parsing, resolving and writing the files. The last
+column estimates generation at the `--model-tokens-per-second` of a hosted model.
+
+    python benchmarks/edit_format.py [--files N] [--tokens-per-second T]
+"""
+import argparse
+import os
+import time
+
+import tiktoken
+
+from common import print_table, scratch_workdir
+
+scratch_workdir()
+
+from src.agents.patcher import Patcher
+from src.config import Config
+from src.llm import LLM
+
+CHARS_PER_TOKEN = 4
+FUNCTION = '''def step_{i}(values):
+    """Scaled sum of `values` for step {i}."""
+    total = 0
+    for value in values:
+        total += value * {i}
+    return total
+
+'''
+
+
+def fixture_files(count: int) -> dict:
+    files = {}
+    for n in range(count):
+        functions = 45 + 9 * n  # 7 lines each, so 315-441 lines for the default 3 files
+        files[f"src/module_{n}.py"] = "".join(FUNCTION.format(i=i) for i in range(functions))
+    return files
+
+
+def fix(code: str):
+    """
+    The one-line change made to `code`, as (old lines, new lines) with two lines of
+    context on each side, like the SEARCH/REPLACE blocks the prompt asks for.
+    """
+    lines = code.split("\n")
+    target = next(i for i, line in enumerate(lines) if line.strip().startswith("total += value * ") and i > len(lines) // 2)
+    old = lines[target - 2:target + 3]
+    new = list(old)
+    new[2] = new[2] + " + 1"
+    return "\n".join(old), "\n".join(new)
+
+
+def whole_files_response(files: dict) -> str:
+    sections = []
+    for file, code in files.items():
+        old, new = fix(code)
+        sections.append(f"File: `{file}`:\n```py\n{code.replace(old, new)}\n```\n")
+    return "~~~\n" + "\n".join(sections) + "~~~"
+
+
+def edits_response(files: dict) -> str:
+    sections = []
+    for file, code in files.items():
+        old, new = fix(code)
+        sections.append(f"File: `{file}`:\n<<<<<<< SEARCH\n{old}\n=======\n{new}\n>>>>>>> REPLACE\n")
+    return "~~~\n" + "\n".join(sections) + "~~~"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=3)
+    parser.add_argument("--tokens-per-second", type=int, default=1000, help="stub model speed, at most 1000")
+    parser.add_argument("--model-tokens-per-second", type=int, default=60)
+    args = parser.parse_args()
+
+    config = Config()
+    config.config["STUB_LLM"]["ENABLED"] = "true"
+    config.config["STUB_LLM"]["CHUNK_SIZE"] = CHARS_PER_TOKEN
+    config.config["STUB_LLM"]["DELAY_MS"] = max(1, 1000 // args.tokens_per_second)
+    stub = LLM.get_provider("STUB")
+
+    project_name = "edit-format-benchmark"
+    patcher = Patcher(base_model="Stub")
+    project_path = patcher.get_project_path(project_name)
+    files = fixture_files(args.files)
+    encoding = tiktoken.get_encoding("cl100k_base")
+
+    rows = []
+    for name, response in (("whole files", whole_files_response(files)), ("search/replace", edits_response(files))):
+        for file, code in files.items():
+            os.makedirs(os.path.dirname(os.path.join(project_path, file)), exist_ok=True)
+            with open(os.path.join(project_path, file), "w") as f:
+                f.write(code)
+
+        stub.respond_with(response)
+        start = time.perf_counter()
+        code_set = patcher.execute("Fix the off-by-one in every module.", "", [], "", "Linux", project_name)
+        patcher.save_code_to_project(code_set, project_name)
+        elapsed = time.perf_counter() - start
+
+        for file, code in files.items():
+            old, new = fix(code)
+            with open(os.path.join(project_path, file)) as f:
+                # whole files come back without their trailing blank lines
+                assert f.read().rstrip("\n") == code.replace(old, new).rstrip("\n")
+
+        tokens = len(encoding.encode(response))
+        rows.append({
+            "answer": name,
+            "output tokens": tokens,
+            "seconds": elapsed,
+            f"seconds at {args.model_tokens_per_second} tok/s": tokens / args.model_tokens_per_second,
+        })
+    lines = sum(code.count("\n") for code in files.values())
+    print_table(f"one-line fix in each of {args.files} files ({lines} lines), stub at {args.tokens_per_second} tok/s", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Keyword extraction latency of `SentenceBert`, as used by `Agent.update_contextual_keywords`.
+
+"first call" loads the shared `KeywordModel` (run it in a fresh process to include
+importing the libraries), "steady state" is every later call, and "batch" extracts
+the keywords of `--batch` sentences in one `extract_keywords_batch` call. "new KeyBERT
+per call" is what `SentenceBert` used to do: load a `KeyBERT()` for every sentence.
+
+    python benchmarks/keyword_model.py [--repeat N] [--batch N]
+"""
+import argparse
+import itertools
+import time
+
+from common import measure, print_table, scratch_workdir
+
+scratch_workdir()
+
+from src.bert.sentence import SentenceBert
+
+SENTENCES = [
+    "Create a Flask API that stores todo items in SQLite and serves them as JSON.",
+    "Add pagination and a search endpoint to the todo list API.",
+    "Write unit tests for the todo API with pytest and a temporary database.",
+    "Build a React frontend that lists the todo items and lets the user add new ones.",
+    "Deploy the application with Docker and configure environment variables.",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--reload-repeat", type=int, default=3, help="runs of the slow per-call KeyBERT")
+    parser.add_argument("--batch", type=int, default=16)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    SentenceBert(SENTENCES[0]).extract_keywords()
+    first_call = (time.perf_counter() - start) * 1000
+
+    calls = itertools.count()
+
+    def steady_state():
+        SentenceBert(SENTENCES[next(calls) % len(SENTENCES)]).extract_keywords()
+
+    batch = [SENTENCES[i % len(SENTENCES)] for i in range(args.batch)]
+
+    def one_by_one():
+        for sentence in batch:
+            SentenceBert(sentence).extract_keywords()
+
+    def new_keybert_per_call():
+        from keybert import KeyBERT
+        KeyBERT().extract_keywords(
+            SENTENCES[0], keyphrase_ngram_range=(1, 1), stop_words='english', top_n=5, use_mmr=True, diversity=0.7
+        )
+
+    rows = [
+        {"variant": "first call (loads the model)", "mean": first_call, "p50": first_call, "p95": first_call, "max": first_call},
+        {"variant": "steady state", **measure(steady_state, args.repeat)},
+        {"variant": f"{args.batch} sentences one by one", **measure(one_by_one, max(1, args.repeat // 10))},
+        {"variant": f"{args.batch} sentences batched", **measure(lambda: SentenceBert.extract_keywords_batch(batch), max(1, args.repeat // 10))},
+        {"variant": "new KeyBERT per call", **measure(new_keybert_per_call, args.reload_repeat, warmup=0)},
+    ]
+    print_table("keyword extraction, ms", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+`KnowledgeBase` lookups on a synthetic corpus of `--documents` research results.
+
+Times indexing the corpus, adding one more entry to the full index, a BM25 `search`
+for a stored tag and for a few rare terms, and `get_knowledge` for an exact tag, for
+the same query reworded (other case and word order) and for a query that isn't stored.
+"unindexed tag ==" is the old lookup: an exact tag match scanning the table.
+
+    python benchmarks/knowledge_search.py [--documents N]
+"""
+import argparse
+import itertools
+import random
+import time
+
+from common import measure, print_table, scratch_workdir
+
+scratch_workdir()
+
+from sqlalchemy import text
+
+from src.memory.knowledge_base import Knowledge, KnowledgeBase
+
+VOCABULARY = 20000
+TAG_WORDS = 6
+CONTENT_WORDS = 150
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--documents", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    words = [f"w{i}" for i in range(VOCABULARY)]
+    # Zipf-like word frequencies, so common terms match many documents as in real text
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(VOCABULARY)))
+
+    def phrase(length: int) -> str:
+        return " ".join(rng.choices(words, cum_weights=cum_weights, k=length))
+
+    documents = [{"tag": phrase(TAG_WORDS), "contents": phrase(CONTENT_WORDS)} for _ in range(args.documents)]
+
+    knowledge_base = KnowledgeBase()
+    start = time.perf_counter()
+    with knowledge_base.engine.begin() as connection:
+        connection.execute(Knowledge.__table__.insert(), documents)
+    indexing = time.perf_counter() - start
+    print(f"indexed {args.documents} documents in {indexing:.1f} s ({args.documents / indexing:.0f} documents/s)")
+
+    stored = documents[len(documents) // 2]["tag"]
+    reworded = " ".join(reversed(stored.split())).upper()
+    missing = phrase(TAG_WORDS) + " unseen"
+    # the stored tag is mostly frequent words, which match most of the corpus
+    rare = " ".join(rng.sample(words[VOCABULARY // 2:], 3))
+
+    def unindexed_lookup():
+        with knowledge_base.engine.connect() as connection:
+            connection.execute(
+                text("SELECT contents FROM knowledge NOT INDEXED WHERE tag = :tag LIMIT 1"), {"tag": stored}
+            ).first()
+
+    def add_one():
+        knowledge_base.add_knowledge(phrase(TAG_WORDS), phrase(CONTENT_WORDS))
+
+    assert knowledge_base.get_knowledge(reworded) is not None
+    assert knowledge_base.get_knowledge(missing) is None
+    rows = [
+        {"operation": "add_knowledge (incremental)", **measure(add_one, args.repeat)},
+        {"operation": "search top-5", **measure(lambda: knowledge_base.search(stored, 5), args.repeat)},
+        {"operation": "search top-5, rare terms", **measure(lambda: knowledge_base.search(rare, 5), args.repeat)},
+        {"operation": "get_knowledge exact tag", **measure(lambda: knowledge_base.get_knowledge(stored), args.repeat)},
+        {"operation": "get_knowledge reworded", **measure(lambda: knowledge_base.get_knowledge(reworded), args.repeat)},
+        {"operation": "get_knowledge miss", **measure(lambda: knowledge_base.get_knowledge(missing), args.repeat)},
+        {"operation": "unindexed tag ==", **measure(unindexed_lookup, args.repeat)},
+    ]
+    print_table(f"{args.documents} documents, ms ({args.repeat} runs)", rows)
+
+
+if __name__ == "__main__":
+    main()
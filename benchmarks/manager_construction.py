@@ -0,0 +1,58 @@
+"""
+Cost of constructing the SQLite-backed managers (`AgentState`, `ProjectManager`,
+`KnowledgeBase`) and running one query on them.
+
+"per-instance engine" reproduces what every constructor used to do: build its own
+engine and connection pool and run `create_all`, so the query opens a new
+connection. "shared engine" is the current code, which looks the pooled engine up
+in `Database`.
+
+    python benchmarks/manager_construction.py [--repeat N]
+"""
+import argparse
+
+from common import measure, print_table, scratch_workdir
+
+scratch_workdir()
+
+from sqlalchemy import text
+from sqlmodel import SQLModel, create_engine
+
+from src.config import Config
+from src.memory.knowledge_base import KnowledgeBase
+from src.project import ProjectManager
+from src.state import AgentState
+
+
+def query(engine):
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1")).all()
+
+
+def per_instance_engine():
+    sqlite_path = Config().get_sqlite_db()
+    for _ in range(3):
+        engine = create_engine(f"sqlite:///{sqlite_path}")
+        SQLModel.metadata.create_all(engine)
+        query(engine)
+        engine.dispose()
+
+
+def shared_engine():
+    for manager in (AgentState, ProjectManager, KnowledgeBase):
+        query(manager().engine)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rows = []
+    for name, fn in (("per-instance engine", per_instance_engine), ("shared engine", shared_engine)):
+        rows.append({"variant": name, **measure(fn, args.repeat)})
+    print_table(f"constructing the 3 managers + 1 query each, ms ({args.repeat} runs)", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Latency of opening a page of a local fixture server and reading its text.
+
+"launch per page" is what `Agent.open_page` and `Crawler` used to do: start a
+Playwright driver and a Chromium process for every page and close both afterwards.
+"pooled context" is `Browser` on the `BrowserPool`, where a page costs a new browser
+context on a warm browser. `--concurrency` opens that many pages at once.
+
+    python benchmarks/page_open.py [--pages N] [--concurrency C]
+"""
+import argparse
+import asyncio
+import time
+from http.server import BaseHTTPRequestHandler
+
+from common import measure, print_table, scratch_workdir, serve
+
+scratch_workdir()
+
+from playwright.async_api import async_playwright
+
+from src.browser.browser import Browser
+from src.browser.pool import BrowserPool
+from src.config import Config
+
+BODY = ("<html><head><title>fixture</title></head><body>"
+        + "<p>Fixture paragraph with a <a href='#'>link</a>.</p>" * 200
+        + "</body></html>").encode()
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+
+async def launch_per_page(url: str):
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=True)
+        page = await browser.new_page()
+        await page.goto(url)
+        await page.evaluate("() => document.body.innerText")
+        await browser.close()
+
+
+async def pooled_context(url: str):
+    browser = Browser()
+    try:
+        await browser.start()
+        await browser.go_to(url)
+        await browser.extract_text()
+    finally:
+        await browser.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=1)
+    args = parser.parse_args()
+
+    url = serve(FixtureHandler)
+    pool = BrowserPool()
+
+    async def batch(open_page):
+        await asyncio.gather(*(open_page(url) for _ in range(args.concurrency)))
+
+    rows = [
+        {"variant": "launch per page", **measure(lambda: asyncio.run(batch(launch_per_page)), args.pages)},
+        {"variant": "pooled context", **measure(lambda: pool.run(batch(pooled_context)), args.pages)},
+    ]
+    print_table(
+        f"opening {args.concurrency} page(s) at once, ms ({args.pages} runs, "
+        f"pool of {Config().get_browser_pool_size()} browsers)", rows
+    )
+
+    # a browser is relaunched after serving BROWSER.MAX_PAGES contexts, so its memory doesn't keep growing
+    start = time.perf_counter()
+    for _ in range(Config().get_browser_max_pages() * pool.size):
+        pool.run(pooled_context(url))
+    print(f"\n{Config().get_browser_max_pages() * pool.size} pages including recycling every browser once: "
+          f"{time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
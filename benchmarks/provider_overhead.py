@@ -0,0 +1,98 @@
+"""
+Per-call overhead of the provider clients behind `LLM.inference`, against a local
+OpenAI-compatible stub server that answers instantly.
+
+"per-call clients" is what `LLM.inference` used to do: build every provider client
+for each call and use one of them. "shared provider" goes through `LLM.get_provider`,
+which builds the selected client once and keeps its connections alive.
+
+    python benchmarks/provider_overhead.py [--calls N] [--stream]
+"""
+import argparse
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler
+
+from common import measure, print_table, scratch_workdir, serve
+
+scratch_workdir()
+
+from src.config import Config
+from src.llm.llm import LLM, PROVIDER_CLASSES
+
+RESPONSE = "def add(a, b):\n    return a + b\n"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+    connections = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        # headers and body are written separately, don't let Nagle hold the body back
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with StubHandler.lock:
+            StubHandler.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        model = request.get("model", "stub")
+        if request.get("stream"):
+            chunk = {"id": "bench", "object": "chat.completion.chunk", "created": 0, "model": model,
+                     "choices": [{"index": 0, "delta": {"content": RESPONSE}, "finish_reason": None}]}
+            body = f"data: {json.dumps(chunk)}\n\ndata: [DONE]\n\n".encode()
+            content_type = "text/event-stream"
+        else:
+            body = json.dumps({
+                "id": "bench", "object": "chat.completion", "created": 0, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": RESPONSE}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+            }).encode()
+            content_type = "application/json"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def call(provider, stream: bool):
+    if stream:
+        response = "".join(provider.stream("gpt-4o-mini", "Write an add function."))
+    else:
+        response = provider.inference("gpt-4o-mini", "Write an add function.")
+    assert response == RESPONSE
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--stream", action="store_true", help="use the streaming API, as LLM.inference does")
+    args = parser.parse_args()
+
+    config = Config()
+    config.set_openai_api_key("bench")
+    config.set_openai_api_endpoint(f"{serve(StubHandler)}/v1")
+    LLM.reset_providers()
+
+    def per_call_clients():
+        clients = {name: cls() for name, cls in PROVIDER_CLASSES.items() if name != "STUB"}
+        call(clients["OPENAI"], args.stream)
+
+    def shared_provider():
+        call(LLM.get_provider("OPENAI"), args.stream)
+
+    rows = []
+    for name, fn in (("per-call clients", per_call_clients), ("shared provider", shared_provider)):
+        StubHandler.connections = 0
+        rows.append({"variant": name, **measure(fn, args.calls), "connections": StubHandler.connections})
+    print_table(f"one OpenAI {'stream' if args.stream else 'inference'} call, ms ({args.calls} calls)", rows)
+
+
+if __name__ == "__main__":
+    main()
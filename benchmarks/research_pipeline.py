@@ -0,0 +1,114 @@
+"""
+Wall time of `Agent.search_queries` against local fixture pages.
+
+Every query's first search result is a page of a local fixture server, one of them
+answering only after `--slow-seconds`. Pages are opened in the `BrowserPool` and
+formatted by the stub model, which streams its answer with `--format-delay-ms`
+between chunks. "sequential" researches the queries one after the other, as the
+agent used to; "search_queries" is the concurrent pipeline. Searching itself is not
+timed: the fixture search engine answers without a round-trip.
+
+    python benchmarks/research_pipeline.py [--queries N] [--slow-seconds S]
+"""
+import argparse
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler
+
+from common import print_table, scratch_workdir, serve
+
+scratch_workdir()
+
+from src.agents import agent as agent_module
+from src.agents.agent import Agent
+from src.config import Config
+from src.llm import LLM
+from src.project import ProjectManager
+
+PARAGRAPH = "<p>" + "Fixture text about the research topic, long enough to format. " * 40 + "</p>"
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    slow_seconds = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.startswith("/slow/"):
+            time.sleep(FixtureHandler.slow_seconds)
+        body = f"<html><head><title>{self.path}</title></head><body><h1>{self.path}</h1>{PARAGRAPH * 5}</body></html>".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FixtureSearch:
+    """
+    Search engine whose first result for a query is the fixture page of that query.
+    """
+    links = {}
+
+    def search_many(self, queries: list) -> dict:
+        return {query: [{"href": self.links[query]}] for query in queries}
+
+    @staticmethod
+    def first_link(query_result):
+        return query_result[0]["href"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", type=int, default=5)
+    parser.add_argument("--slow-seconds", type=float, default=3.0)
+    parser.add_argument("--format-delay-ms", type=int, default=20)
+    args = parser.parse_args()
+
+    config = Config()
+    config.config["STUB_LLM"]["ENABLED"] = "true"
+    config.config["STUB_LLM"]["DELAY_MS"] = args.format_delay_ms
+    LLM.get_provider("STUB").respond_with("Formatted research notes. " * 20)
+    FixtureHandler.slow_seconds = args.slow_seconds
+    base_url = serve(FixtureHandler)
+
+    project_name = "research-benchmark"
+    ProjectManager().create_project(project_name)
+    agent = Agent(base_model="Stub", search_engine="duckduckgo")
+    agent.new_web_search = FixtureSearch
+    # results are stored as usual, but embedding them isn't part of the pipeline's latency
+    agent.remember_research = lambda query, contents, project_name: None
+
+    def fresh_queries() -> list:
+        # new queries every run, so none is answered from the knowledge base
+        run = uuid.uuid4().hex[:8]
+        queries = [f"topic {i} {run}" for i in range(args.queries)]
+        for i, query in enumerate(queries):
+            FixtureSearch.links[query] = f"{base_url}/{'slow' if i == 0 else 'page'}/{i}"
+        return queries
+
+    def sequential():
+        for query in fresh_queries():
+            agent.research_query(query, FixtureSearch.links[query], project_name)
+
+    def concurrent():
+        results = agent.search_queries(fresh_queries(), project_name)
+        assert len(results) == args.queries
+
+    # warm the browser pool so neither variant pays for launching Chromium
+    agent.research_query("warmup", f"{base_url}/page/warmup", project_name)
+
+    rows = []
+    for name, fn in (("sequential", sequential), ("search_queries", concurrent)):
+        start = time.perf_counter()
+        fn()
+        rows.append({"pipeline": name, "seconds": time.perf_counter() - start})
+    print_table(
+        f"{args.queries} queries, one page {args.slow_seconds:g} s slow, "
+        f"{agent_module.RESEARCH_WORKERS} research workers", rows
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -22,7 +22,10 @@ from src.logger import Logger, route_logger
 from src.project import ProjectManager
 from src.state import AgentState
 from src.agents import Agent
-from src.llm import LLM
+from src.llm import LLM, TokenUsageTracker, ResponseCache
+from src.browser.screenshots import ScreenshotStore
+from src.sandbox.environments import EnvironmentCache
+from src.sandbox.code_runner import CodeRunner
 
 
 app = Flask(__name__)
@@ -123,8 +126,19 @@ def get_agent_state():
 @app.route("/api/get-browser-snapshot", methods=["GET"])
 @route_logger(logger)
 def browser_snapshot():
-    snapshot_path = request.args.get("snapshot_path")
-    return send_file(snapshot_path, as_attachment=True)
+    # snapshots are content-addressed, accept either the hash or the stored path
+    digest = request.args.get("hash")
+    if not digest:
+        snapshot_path = request.args.get("snapshot_path", "")
+        digest = os.path.splitext(os.path.basename(snapshot_path))[0]
+
+    snapshot_path = ScreenshotStore().resolve(digest)
+    if not snapshot_path:
+        return jsonify({"error": "Snapshot not found"}), 404
+
+    response = send_file(snapshot_path, mimetype="image/png", etag=digest, max_age=31536000)
+    response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
 
 
 @app.route("/api/get-browser-session", methods=["GET"])
@@ -161,6 +175,15 @@ def run_code():
     return jsonify({"message": "Code execution started"})
 
 
+@app.route("/api/stop-commands", methods=["POST"])
+@route_logger(logger)
+def stop_commands():
+    data = request.json
+    project_name = data.get("project_name")
+    cancelled = CodeRunner.cancel(project_name)
+    return jsonify({"cancelled": cancelled})
+
+
 @app.route("/api/calculate-tokens", methods=["POST"])
 @route_logger(logger)
 def calculate_tokens():
@@ -174,10 +197,22 @@ def calculate_tokens():
 @route_logger(logger)
 def token_usage():
     project_name = request.args.get("project_name")
-    token_count = AgentState.get_latest_token_usage(project_name)
+    token_count = TokenUsageTracker().get(project_name)
     return jsonify({"token_usage": token_count})
 
 
+@app.route("/api/llm-cache", methods=["GET"])
+@route_logger(logger)
+def llm_cache_stats():
+    return jsonify({"llm_cache": ResponseCache().stats()})
+
+
+@app.route("/api/environments", methods=["GET"])
+@route_logger(logger)
+def environment_stats():
+    return jsonify({"environments": EnvironmentCache().stats()})
+
+
 @app.route("/api/logs", methods=["GET"])
 def real_time_logs():
     log_file = logger.read_log_file()
@@ -189,6 +224,7 @@ def real_time_logs():
 def set_settings():
     data = request.json
     config.update_config(data)
+    LLM.reset_providers()
     return jsonify({"message": "Settings updated"})
 
 
@@ -14,24 +14,40 @@ from .decision import Decision
 from src.project import ProjectManager
 from src.state import AgentState
 from src.logger import Logger
+from src.config import Config
 
 from src.bert.sentence import SentenceBert
-from src.memory import KnowledgeBase
+from src.memory import KnowledgeBase, VectorMemory
 from src.browser.search import BingSearch, GoogleSearch, DuckDuckGoSearch
-from src.browser import Browser
+from src.browser import Browser, BrowserPool
+from src.browser.screenshots import PREVIEW_MIME_TYPES
 from src.browser import start_interaction
 from src.filesystem import ReadCode
+from src.llm import TokenUsageTracker
 from src.services import Netlify
 from src.documenter.pdf import PDF
 
 import json
-import time
 import platform
 import tiktoken
-import asyncio
+import threading
+import concurrent.futures
 
 from src.socket_instance import emit_agent
 
+# Research pipeline limits: queries researched at once, and concurrent calls per stage.
+# Searches are batched through `search_many`, which is bounded by SEARCH.MAX_CONCURRENT.
+RESEARCH_WORKERS = 4
+PAGE_SLOTS = threading.BoundedSemaphore(2)
+FORMAT_SLOTS = threading.BoundedSemaphore(2)
+RESEARCH_TIMEOUT = 120  # seconds to wait for all queries before moving on without the slow ones
+
+# Research results are embedded in the background, so the research pipeline never waits on the model.
+MEMORY_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory")
+RESEARCH_RECALL_TOP_K = 3
+RESEARCH_RECALL_MIN_SCORE = 0.3  # cosine similarity below which a past result isn't worth the prompt space
+RESEARCH_NOTE_CHARS = 2000
+
 
 class Agent:
     def __init__(self, base_model: str, search_engine: str, browser: Browser = None):
@@ -39,6 +55,7 @@ class Agent:
             raise ValueError("base_model is required")
 
         self.logger = Logger()
+        self.base_model = base_model
 
         """
         Accumulate contextual keywords from chained prompts of all preparation agents
@@ -67,53 +84,127 @@ class Agent:
         self.tokenizer = tiktoken.get_encoding("cl100k_base")
 
     async def open_page(self, project_name, url):
-        browser = await Browser().start()
+        browser = Browser()
 
-        await browser.go_to(url)
-        _, raw = await browser.screenshot(project_name)
-        data = await browser.extract_text()
-        await browser.close()
+        try:
+            # inside the try, so the pooled context is released even if opening the page fails
+            await browser.start()
+            await browser.go_to(url)
+            screenshot_path, preview = await browser.screenshot(project_name)
+            data = await browser.extract_text()
+        finally:
+            await browser.close()
 
-        return browser, raw, data
-
-    def search_queries(self, queries: list, project_name: str) -> dict:
-        results = {}
-
-        knowledge_base = KnowledgeBase()
+        return browser, screenshot_path, preview, data
 
+    def new_web_search(self):
         if self.engine == "bing":
-            web_search = BingSearch()
+            return BingSearch()
         elif self.engine == "google":
-            web_search = GoogleSearch()
+            return GoogleSearch()
         else:
-            web_search = DuckDuckGoSearch()
-
-        self.logger.info(f"\nSearch Engine :: {self.engine}")
+            return DuckDuckGoSearch()
 
-        for query in queries:
-            query = query.strip().lower()
+    def research_query(self, query: str, link: str, project_name: str):
+        """
+        Open the first search result of a query and format it. Every stage is bounded by
+        its own semaphore so concurrent queries don't launch an unbounded number of
+        browsers or LLM calls.
+        """
+        print("\nLink :: ", link, '\n')
+        if not link:
+            return None
+
+        with PAGE_SLOTS:
+            browser, screenshot_path, preview, data = BrowserPool().run(self.open_page(project_name, link))
+        emit_agent("screenshot", {
+            "data": preview,
+            "mime_type": PREVIEW_MIME_TYPES[Config().get_screenshot_preview_format()],
+            "path": screenshot_path,
+            "project_name": project_name
+        }, False)
+
+        with FORMAT_SLOTS:
+            return self.formatter.execute(data, project_name)
 
-            # knowledge = knowledge_base.get_knowledge(tag=query)
-            # if knowledge:
-            #     results[query] = knowledge
-            #     continue
+    def search_queries(self, queries: list, project_name: str) -> dict:
+        """
+        Research results of `queries`, in the order of the queries, from the knowledge
+        base or else the web. Queries without a result are left out.
+        """
+        found = {}
 
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+        knowledge_base = KnowledgeBase()
 
-            web_search.search(query)
+        self.logger.info(f"\nSearch Engine :: {self.engine}")
 
-            link = web_search.get_first_link()
-            print("\nLink :: ", link, '\n')
-            if not link:
+        all_queries = list(dict.fromkeys(query.strip().lower() for query in queries))
+
+        # answer repeat queries from the local knowledge base instead of the web
+        for query in all_queries:
+            knowledge = knowledge_base.get_knowledge(tag=query)
+            if knowledge:
+                found[query] = knowledge
+                self.logger.info(f"got the knowledge base results for : {query}")
+        queries = [query for query in all_queries if query not in found]
+        if not queries:
+            return {query: found[query] for query in all_queries if query in found}
+
+        web_search = self.new_web_search()
+        query_results = web_search.search_many(queries)
+        links = {}
+        for query, query_result in query_results.items():
+            try:
+                links[query] = web_search.first_link(query_result) if query_result else None
+            except Exception as e:
+                self.logger.error(f"no search result for : {query} :: {e}")
+                links[query] = None
+
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=RESEARCH_WORKERS)
+        futures = [executor.submit(self.research_query, query, links[query], project_name) for query in queries]
+        concurrent.futures.wait(futures, timeout=RESEARCH_TIMEOUT)
+        # don't wait for queries that are still stuck on a slow page
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        for query, future in zip(queries, futures):
+            if not future.done() or future.cancelled():
+                self.logger.warning(f"research timed out for : {query}")
+                continue
+            try:
+                result = future.result()
+            except BaseException as e:
+                self.logger.error(f"research failed for : {query} :: {e}")
                 continue
-            browser, raw, data = loop.run_until_complete(self.open_page(project_name, link))
-            emit_agent("screenshot", {"data": raw, "project_name": project_name}, False)
-            results[query] = self.formatter.execute(data, project_name)
+            if result:
+                found[query] = result
+                self.logger.info(f"got the search results for : {query}")
+                knowledge_base.add_knowledge(tag=query, contents=result)
+                self.remember_research(query, result, project_name)
 
-            self.logger.info(f"got the search results for : {query}")
-            # knowledge_base.add_knowledge(tag=query, contents=results[query])
-        return results
+        return {query: found[query] for query in all_queries if query in found}
+
+    def remember_research(self, query: str, contents: str, project_name: str):
+        """
+        Add a research result to the "research" vector memory on `MEMORY_EXECUTOR`.
+        """
+        def store():
+            try:
+                VectorMemory("research").add([contents], [{"query": query, "project": project_name}], key=project_name)
+            except Exception as e:
+                self.logger.warning(f"could not embed the research results for : {query} :: {e}")
+
+        MEMORY_EXECUTOR.submit(store)
+
+    def recall_research(self, query: str, project_name: str) -> list:
+        """
+        Research results of the project most relevant to `query`, for the feature and bug prompts.
+        """
+        try:
+            hits = VectorMemory("research").search(query, RESEARCH_RECALL_TOP_K, project=project_name)
+        except Exception as e:
+            self.logger.warning(f"could not search the research memory :: {e}")
+            return []
+        return [hit["text"][:RESEARCH_NOTE_CHARS] for hit in hits if hit["score"] >= RESEARCH_RECALL_MIN_SCORE]
 
     def update_contextual_keywords(self, sentence: str):
         """
@@ -190,7 +281,8 @@ class Agent:
         self.agent_state.set_agent_active(project_name, True)
 
         conversation = self.project_manager.get_all_messages_formatted(project_name)
-        code_markdown = ReadCode(project_name).code_set_to_markdown()
+        # rank the project files against the latest messages, which hold the request or the error
+        code_markdown = ReadCode(project_name).code_set_to_context("\n".join(conversation[-3:]), self.base_model)
 
         response, action = self.action.execute(conversation, project_name)
 
@@ -233,7 +325,8 @@ class Agent:
                 conversation=conversation,
                 code_markdown=code_markdown,
                 system_os=os_system,
-                project_name=project_name
+                project_name=project_name,
+                research=self.recall_research(prompt, project_name)
             )
             print("\nfeature code :: ", code, '\n')
             self.feature.save_code_to_project(code, project_name)
@@ -245,7 +338,8 @@ class Agent:
                 commands=None,
                 error=prompt,
                 system_os=os_system,
-                project_name=project_name
+                project_name=project_name,
+                research=self.recall_research(prompt, project_name)
             )
             print("\nbug code :: ", code, '\n')
             self.patcher.save_code_to_project(code, project_name)
@@ -264,6 +358,7 @@ class Agent:
 
             self.project_manager.add_message_from_devika(project_name, response)
 
+        TokenUsageTracker().flush(project_name)
         self.agent_state.set_agent_active(project_name, False)
         self.agent_state.set_agent_completed(project_name, True)
 
@@ -323,20 +418,11 @@ class Agent:
         if ask_user != "" and ask_user is not None:
             self.project_manager.add_message_from_devika(project_name, ask_user)
             self.agent_state.set_agent_active(project_name, False)
-            got_user_query = False
-
-            while not got_user_query:
-                self.logger.info("Waiting for user query...")
-
-                latest_message_from_user = self.project_manager.get_latest_message_from_user(project_name)
-                validate_last_message_is_from_user = self.project_manager.validate_last_message_is_from_user(
-                    project_name)
+            self.logger.info("Waiting for user query...")
 
-                if latest_message_from_user and validate_last_message_is_from_user:
-                    ask_user_prompt = latest_message_from_user["message"]
-                    got_user_query = True
-                    self.project_manager.add_message_from_devika(project_name, "Thanks! 🙌")
-                time.sleep(5)
+            latest_message_from_user = self.project_manager.wait_for_message_from_user(project_name)
+            ask_user_prompt = latest_message_from_user["message"]
+            self.project_manager.add_message_from_devika(project_name, "Thanks! 🙌")
 
         self.agent_state.set_agent_active(project_name, True)
 
@@ -356,6 +442,7 @@ class Agent:
 
         self.coder.save_code_to_project(code, project_name)
 
+        TokenUsageTracker().flush(project_name)
         self.agent_state.set_agent_active(project_name, False)
         self.agent_state.set_agent_completed(project_name, True)
         self.project_manager.add_message_from_devika(
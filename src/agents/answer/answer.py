@@ -13,7 +13,7 @@ class Answer:
         config = Config()
         self.project_dir = config.get_projects_dir()
         
-        self.llm = LLM(model_id=base_model)
+        self.llm = LLM(model_id=base_model, agent="answer")
 
     def render(
         self, conversation: str, code_markdown: str
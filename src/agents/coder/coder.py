@@ -1,5 +1,4 @@
 import os
-import time
 
 from jinja2 import Environment, BaseLoader
 from typing import List, Dict, Union
@@ -18,7 +17,7 @@ class Coder:
         config = Config()
         self.project_dir = config.get_projects_dir()
         self.logger = Logger()
-        self.llm = LLM(model_id=base_model)
+        self.llm = LLM(model_id=base_model, agent="coder")
 
     def render(
         self, step_by_step_plan: str, user_context: str, search_results: dict
@@ -87,29 +86,51 @@ class Coder:
         response = "\n".join([f"File: `{file['file']}`:\n```\n{file['code']}\n```" for file in response])
         return f"~~~\n{response}\n~~~"
 
-    def emulate_code_writing(self, code_set: list, project_name: str):
-        files = []
-        for current_file in code_set:
-            file = current_file["file"]
-            code = current_file["code"]
-
-            current_state = AgentState().get_latest_state(project_name)
-            new_state = AgentState().new_state()
-            new_state["browser_session"] = current_state["browser_session"] # keep the browser session
-            new_state["internal_monologue"] = "Writing code..."
-            new_state["terminal_session"]["title"] = f"Editing {file}"
-            new_state["terminal_session"]["command"] = f"vim {file}"
-            new_state["terminal_session"]["output"] = code
-            files.append({
-                "file": file,
-                "code": code
-            })
-            AgentState().add_to_current_state(project_name, new_state)
-            time.sleep(2)
-        emit_agent("code", {
-            "files": files,
-            "from": "coder"
-        })
+    def add_file_state(self, file: str, code: str, project_name: str):
+        current_state = AgentState().get_latest_state(project_name)
+        new_state = AgentState().new_state()
+        new_state["browser_session"] = current_state["browser_session"] # keep the browser session
+        new_state["internal_monologue"] = "Writing code..."
+        new_state["terminal_session"]["title"] = f"Editing {file}"
+        new_state["terminal_session"]["command"] = f"vim {file}"
+        new_state["terminal_session"]["output"] = code
+        AgentState().add_to_current_state(project_name, new_state)
+
+    def stream_response(self, prompt: str, project_name: str) -> str:
+        """
+        Stream the model's response and hand every `File:` block to `validate_response`
+        as soon as it is complete, so files show up while the rest is still generating.
+        """
+        response = []
+        partial_line = ""
+        block = []
+
+        def flush_block():
+            if block:
+                for file in self.validate_response("~~~\n" + "\n".join(block) + "\n~~~") or []:
+                    self.add_file_state(file["file"], file["code"], project_name)
+                block.clear()
+
+        def handle_line(line: str):
+            if line.startswith("File: ") or line.startswith("~~~"):
+                flush_block()
+                if line.startswith("File: "):
+                    block.append(line)
+            elif block:
+                block.append(line)
+
+        for chunk in self.llm.inference_stream(prompt, project_name):
+            response.append(chunk)
+            lines = (partial_line + chunk).split("\n")
+            partial_line = lines.pop()
+            for line in lines:
+                handle_line(line)
+
+        # the closing ~~~ usually has no newline after it, and the response may not have one at all
+        handle_line(partial_line)
+        flush_block()
+
+        return "".join(response).strip()
 
     @retry_wrapper
     def execute(
@@ -120,7 +141,7 @@ class Coder:
         project_name: str
     ) -> str:
         prompt = self.render(step_by_step_plan, user_context, search_results)
-        response = self.llm.inference(prompt, project_name)
+        response = self.stream_response(prompt, project_name)
         
         valid_response = self.validate_response(response)
         
@@ -129,6 +150,9 @@ class Coder:
         
         print(valid_response)
         
-        self.emulate_code_writing(valid_response, project_name)
+        emit_agent("code", {
+            "files": valid_response,
+            "from": "coder"
+        })
 
         return valid_response
@@ -1,10 +1,8 @@
-import os
-import time
-
 from jinja2 import Environment, BaseLoader
 from typing import List, Dict, Union
 
 from src.config import Config
+from src.filesystem.patch import FileEdit, PatchSet, PatchError, parse_edits
 from src.llm import LLM
 from src.state import AgentState
 from src.services.utils import retry_wrapper
@@ -18,64 +16,32 @@ class Feature:
         config = Config()
         self.project_dir = config.get_projects_dir()
         
-        self.llm = LLM(model_id=base_model)
+        self.llm = LLM(model_id=base_model, agent="feature")
 
     def render(
         self,
         conversation: list,
         code_markdown: str,
-        system_os: str
+        system_os: str,
+        research: list = None
     ) -> str:
         env = Environment(loader=BaseLoader())
         template = env.from_string(PROMPT)
         return template.render(
             conversation=conversation,
             code_markdown=code_markdown,
-            system_os=system_os
+            system_os=system_os,
+            research=research
         )
 
-    def validate_response(self, response: str) -> Union[List[Dict[str, str]], bool]:
-        response = response.strip()
-
-        response = response.split("~~~", 1)[1]
-        response = response[:response.rfind("~~~")]
-        response = response.strip()
-
-        result = []
-        current_file = None
-        current_code = []
-        code_block = False
-
-        for line in response.split("\n"):
-            if line.startswith("File: "):
-                if current_file and current_code:
-                    result.append({"file": current_file, "code": "\n".join(current_code)})
-                current_file = line.split("`")[1].strip()
-                current_code = []
-                code_block = False
-            elif line.startswith("```"):
-                code_block = not code_block
-            else:
-                current_code.append(line)
-
-        if current_file and current_code:
-            result.append({"file": current_file, "code": "\n".join(current_code)})
-
-        return result
+    def validate_response(self, response: str) -> Union[List[FileEdit], bool]:
+        file_edits = parse_edits(response)
+        if not file_edits:
+            return False
+        return file_edits
 
     def save_code_to_project(self, response: List[Dict[str, str]], project_name: str):
-        file_path_dir = None
-        project_name = project_name.lower().replace(" ", "-")
-
-        for file in response:
-            file_path = os.path.join(self.project_dir, project_name, file['file'])
-            file_path_dir = os.path.dirname(file_path)
-            os.makedirs(file_path_dir, exist_ok=True)
-    
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write(file["code"])
-        
-        return file_path_dir
+        return PatchSet(self.get_project_path(project_name)).write(response)
 
     def get_project_path(self, project_name: str):
         project_name = project_name.lower().replace(" ", "-")
@@ -101,7 +67,6 @@ class Feature:
                 "code": code,
             })
             AgentState().add_to_current_state(project_name, new_state)
-            time.sleep(1)
         emit_agent("code", {
             "files": files,
             "from": "feature"
@@ -113,16 +78,24 @@ class Feature:
         conversation: list,
         code_markdown: str,
         system_os: str,
-        project_name: str
+        project_name: str,
+        research: list = None
     ) -> str:
-        prompt = self.render(conversation, code_markdown, system_os)
+        prompt = self.render(conversation, code_markdown, system_os, research)
         response = self.llm.inference(prompt, project_name)
         
-        valid_response = self.validate_response(response)
+        file_edits = self.validate_response(response)
         
-        if not valid_response:
+        if not file_edits:
+            return False
+
+        try:
+            # the new contents of every changed file, or nothing if any edit doesn't apply
+            code_set = PatchSet(self.get_project_path(project_name)).resolve(file_edits)
+        except PatchError as e:
+            print(f"\n{e}\n")
             return False
         
-        self.emulate_code_writing(valid_response, project_name)
+        self.emulate_code_writing(code_set, project_name)
 
-        return valid_response
+        return code_set
@@ -6,7 +6,7 @@ PROMPT = open("src/agents/formatter/prompt.jinja2").read().strip()
 
 class Formatter:
     def __init__(self, base_model: str):
-        self.llm = LLM(model_id=base_model)
+        self.llm = LLM(model_id=base_model, agent="formatter")
 
     def render(self, raw_text: str) -> str:
         env = Environment(loader=BaseLoader())
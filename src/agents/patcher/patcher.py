@@ -1,11 +1,9 @@
-import os
-import time
-
 from jinja2 import Environment, BaseLoader
 from typing import List, Dict, Union
 from src.socket_instance import emit_agent
 
 from src.config import Config
+from src.filesystem.patch import FileEdit, PatchSet, PatchError, parse_edits
 from src.llm import LLM
 from src.state import AgentState
 from src.services.utils import retry_wrapper
@@ -17,7 +15,7 @@ class Patcher:
         config = Config()
         self.project_dir = config.get_projects_dir()
         
-        self.llm = LLM(model_id=base_model)
+        self.llm = LLM(model_id=base_model, agent="patcher")
 
     def render(
         self,
@@ -25,7 +23,8 @@ class Patcher:
         code_markdown: str,
         commands: list,
         error :str,
-        system_os: str
+        system_os: str,
+        research: list = None
     ) -> str:
         env = Environment(loader=BaseLoader())
         template = env.from_string(PROMPT)
@@ -34,51 +33,19 @@ class Patcher:
             code_markdown=code_markdown,
             commands=commands,
             error=error,
-            system_os=system_os
+            system_os=system_os,
+            research=research
         )
 
-    def validate_response(self, response: str) -> Union[List[Dict[str, str]], bool]:
-        response = response.strip()
-
-        response = response.split("~~~", 1)[1]
-        response = response[:response.rfind("~~~")]
-        response = response.strip()
-
-        result = []
-        current_file = None
-        current_code = []
-        code_block = False
-
-        for line in response.split("\n"):
-            if line.startswith("File: "):
-                if current_file and current_code:
-                    result.append({"file": current_file, "code": "\n".join(current_code)})
-                current_file = line.split("`")[1].strip()
-                current_code = []
-                code_block = False
-            elif line.startswith("```"):
-                code_block = not code_block
-            else:
-                current_code.append(line)
-
-        if current_file and current_code:
-            result.append({"file": current_file, "code": "\n".join(current_code)})
-
-        return result
+    def validate_response(self, response: str) -> Union[List[FileEdit], bool]:
+        file_edits = parse_edits(response)
+        if not file_edits:
+            return False
+        return file_edits
 
     def save_code_to_project(self, response: List[Dict[str, str]], project_name: str):
-        file_path_dir = None
-        project_name = project_name.lower().replace(" ", "-")
+        return PatchSet(self.get_project_path(project_name)).write(response)
 
-        for file in response:
-            file_path = os.path.join(self.project_dir, project_name, file['file'])
-            file_path_dir = os.path.dirname(file_path)
-            os.makedirs(file_path_dir, exist_ok=True)
-    
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write(file["code"])
-    
-        return file_path_dir
     def get_project_path(self, project_name: str):
         project_name = project_name.lower().replace(" ", "-")
         return f"{self.project_dir}/{project_name}"
@@ -103,7 +70,6 @@ class Patcher:
                 "code": code
             })
             AgentState().add_to_current_state(project_name, new_state)
-            time.sleep(1)
         emit_agent("code", {
             "files": files,
             "from": "patcher"
@@ -117,22 +83,31 @@ class Patcher:
         commands: list,
         error: str,
         system_os: dict,
-        project_name: str
+        project_name: str,
+        research: list = None
     ) -> str:
         prompt = self.render(
             conversation,
             code_markdown,
             commands,
             error,
-            system_os
+            system_os,
+            research
         )
         response = self.llm.inference(prompt, project_name)
         
-        valid_response = self.validate_response(response)
+        file_edits = self.validate_response(response)
         
-        if not valid_response:
+        if not file_edits:
+            return False
+
+        try:
+            # the new contents of every changed file, or nothing if any edit doesn't apply
+            code_set = PatchSet(self.get_project_path(project_name)).resolve(file_edits)
+        except PatchError as e:
+            print(f"\n{e}\n")
             return False
         
-        self.emulate_code_writing(valid_response, project_name)
+        self.emulate_code_writing(code_set, project_name)
 
-        return valid_response
+        return code_set
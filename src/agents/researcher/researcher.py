@@ -13,7 +13,7 @@ PROMPT = open("src/agents/researcher/prompt.jinja2").read().strip()
 class Researcher:
     def __init__(self, base_model: str):
         self.bing_search = BingSearch()
-        self.llm = LLM(model_id=base_model)
+        self.llm = LLM(model_id=base_model, agent="researcher")
 
     def render(self, step_by_step_plan: str, contextual_keywords: str) -> str:
         env = Environment(loader=BaseLoader())
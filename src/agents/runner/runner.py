@@ -1,7 +1,5 @@
-import time
 import json
 import os
-import subprocess
 
 from jinja2 import Environment, BaseLoader
 
@@ -10,15 +8,22 @@ from src.agents.patcher import Patcher
 from src.llm import LLM
 from src.state import AgentState
 from src.project import ProjectManager
+from src.sandbox.code_runner import CodeRunner
+from src.sandbox.environments import EnvironmentCache
 from src.services.utils import retry_wrapper, validate_responses
 
 PROMPT = open("src/agents/runner/prompt.jinja2", "r").read().strip()
 RERUNNER_PROMPT = open("src/agents/runner/rerunner.jinja2", "r").read().strip()
 
+
+class CommandCancelled(Exception):
+    pass
+
+
 class Runner:
     def __init__(self, base_model: str):
         self.base_model = base_model
-        self.llm = LLM(model_id=base_model)
+        self.llm = LLM(model_id=base_model, agent="runner")
 
     def render(
         self,
@@ -66,6 +71,26 @@ class Runner:
         else:
             return response
 
+    def run_command(self, command: str, project_path: str, project_name: str):
+        """
+        Run one command in the project directory, streaming its output to the terminal,
+        and store the final output in the agent state. Returns the output and whether it failed.
+        Raises `CommandCancelled` if the command was cancelled with `CodeRunner.cancel`.
+        """
+        env = EnvironmentCache().prepare(project_name, project_path)
+        result = CodeRunner().run(command, project_path, project_name, env=env)
+
+        new_state = AgentState().new_state()
+        new_state["internal_monologue"] = "Running code..."
+        new_state["terminal_session"]["title"] = "Terminal"
+        new_state["terminal_session"]["command"] = command
+        new_state["terminal_session"]["output"] = result.output
+        AgentState().add_to_current_state(project_name, new_state)
+
+        if result.cancelled:
+            raise CommandCancelled(command)
+        return result.output, result.failed
+
     @retry_wrapper
     def run_code(
         self,
@@ -79,25 +104,7 @@ class Runner:
         retries = 0
         
         for command in commands:
-            command_set = command.split(" ")
-            command_failed = False
-            
-            process = subprocess.run(
-                command_set,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                cwd=project_path
-            )
-            command_output = process.stdout.decode('utf-8')
-            command_failed = process.returncode != 0
-            
-            new_state = AgentState().new_state()
-            new_state["internal_monologue"] = "Running code..."
-            new_state["terminal_session"]["title"] = "Terminal"
-            new_state["terminal_session"]["command"] = command
-            new_state["terminal_session"]["output"] = command_output
-            AgentState().add_to_current_state(project_name, new_state)
-            time.sleep(1)
+            command_output, command_failed = self.run_command(command, project_path, project_name)
             
             while command_failed and retries < 2:
                 new_state = AgentState().new_state()
@@ -106,7 +113,6 @@ class Runner:
                 new_state["terminal_session"]["command"] = command
                 new_state["terminal_session"]["output"] = command_output
                 AgentState().add_to_current_state(project_name, new_state)
-                time.sleep(1)
                 
                 prompt = self.render_rerunner(
                     conversation=conversation,
@@ -131,25 +137,7 @@ class Runner:
                     
                     ProjectManager().add_message_from_devika(project_name, response)
                     
-                    command_set = command.split(" ")
-                    command_failed = False
-                    
-                    process = subprocess.run(
-                        command_set,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                        cwd=project_path
-                    )
-                    command_output = process.stdout.decode('utf-8')
-                    command_failed = process.returncode != 0
-                    
-                    new_state = AgentState().new_state()
-                    new_state["internal_monologue"] = "Running code..."
-                    new_state["terminal_session"]["title"] = "Terminal"
-                    new_state["terminal_session"]["command"] = command
-                    new_state["terminal_session"]["output"] = command_output
-                    AgentState().add_to_current_state(project_name, new_state)
-                    time.sleep(1)
+                    command_output, command_failed = self.run_command(command, project_path, project_name)
                     
                     if command_failed:
                         retries += 1
@@ -171,25 +159,7 @@ class Runner:
                     
                     Patcher(base_model=self.base_model).save_code_to_project(code, project_name)
                     
-                    command_set = command.split(" ")
-                    command_failed = False
-                    
-                    process = subprocess.run(
-                        command_set,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                        cwd=project_path
-                    )
-                    command_output = process.stdout.decode('utf-8')
-                    command_failed = process.returncode != 0
-                    
-                    new_state = AgentState().new_state()
-                    new_state["internal_monologue"] = "Running code..."
-                    new_state["terminal_session"]["title"] = "Terminal"
-                    new_state["terminal_session"]["command"] = command
-                    new_state["terminal_session"]["output"] = command_output
-                    AgentState().add_to_current_state(project_name, new_state)
-                    time.sleep(1)
+                    command_output, command_failed = self.run_command(command, project_path, project_name)
                     
                     if command_failed:
                         retries += 1
@@ -210,13 +180,17 @@ class Runner:
         
         valid_response = self.validate_response(response)
         
-        self.run_code(
-            valid_response,
-            project_path,
-            project_name,
-            conversation,
-            code_markdown,
-            os_system
-        )
+        try:
+            self.run_code(
+                valid_response,
+                project_path,
+                project_name,
+                conversation,
+                code_markdown,
+                os_system
+            )
+        except CommandCancelled as e:
+            # stopped by the user, don't ask the model to fix it
+            print(f"Command cancelled :: {e}")
 
         return valid_response
\ No newline at end of file
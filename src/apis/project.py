@@ -4,6 +4,10 @@ from src.logger import Logger, route_logger
 from src.config import Config
 from src.project import ProjectManager
 from ..state import AgentState
+from src.llm import TokenUsageTracker
+from src.browser.screenshots import ScreenshotStore
+from src.sandbox.environments import EnvironmentCache
+from src.sandbox.code_runner import CodeRunner
 
 import os
 
@@ -35,9 +39,14 @@ def create_project():
 @route_logger(logger)
 def delete_project():
     data = request.json
+    # commands are registered under the name the agent was given
+    CodeRunner.cancel(data.get("project_name"))
     project_name = secure_filename(data.get("project_name"))
     manager.delete_project(project_name)
+    TokenUsageTracker().evict(project_name)
     AgentState().delete_state(project_name)
+    ScreenshotStore().delete_project(project_name)
+    EnvironmentCache().delete_project(project_name)
     return jsonify({"message": "Project deleted"})
 
 
@@ -1,17 +1,62 @@
-from keybert import KeyBERT
+import threading
+
+from src.shared import Singleton
+
+
+class KeywordModel(Singleton):
+    """
+    Process-wide KeyBERT model (and the sentence-transformer behind it), loaded on
+    first use. Calls into the model are serialized because the fast tokenizers are
+    not safe to use from several threads at once.
+    """
+    def _setup(self):
+        self.kw_model = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        if self.kw_model is None:
+            with self.lock:
+                if self.kw_model is None:
+                    from keybert import KeyBERT
+                    self.kw_model = KeyBERT()
+        return self.kw_model
+
+    def extract_keywords(self, sentences: list, top_n: int = 5) -> list:
+        """
+        Keywords of every sentence in `sentences`, in one batched model call.
+        """
+        if not sentences:
+            return []
+
+        kw_model = self.load()
+        with self.lock:
+            keywords = kw_model.extract_keywords(
+                sentences,
+                keyphrase_ngram_range=(1, 1),
+                stop_words='english',
+                top_n=top_n,
+                use_mmr=True,
+                diversity=0.7
+            )
+        # KeyBERT unwraps the result when it is given a single document
+        if len(sentences) == 1:
+            keywords = [keywords]
+        return keywords
+
+    def embed(self, texts: list):
+        kw_model = self.load()
+        with self.lock:
+            return kw_model.model.embed(texts)
+
 
 class SentenceBert:
     def __init__(self, sentence: str):
         self.sentence = sentence
-        self.kw_model = KeyBERT()
+        self.kw_model = KeywordModel()
 
     def extract_keywords(self, top_n: int = 5) -> list:
-        keywords = self.kw_model.extract_keywords(
-            self.sentence,
-            keyphrase_ngram_range=(1, 1),
-            stop_words='english',
-            top_n=top_n,
-            use_mmr=True,
-            diversity=0.7
-        )
-        return keywords
+        return self.kw_model.extract_keywords([self.sentence], top_n=top_n)[0]
+
+    @staticmethod
+    def extract_keywords_batch(sentences: list, top_n: int = 5) -> list:
+        return KeywordModel().extract_keywords(sentences, top_n=top_n)
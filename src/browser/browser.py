@@ -1,27 +1,31 @@
 import asyncio
-import base64
 import os
 
 from playwright.sync_api import sync_playwright, TimeoutError, Page
-from playwright.async_api import async_playwright, TimeoutError
+from playwright.async_api import TimeoutError
 from markdownify import markdownify as md
 from pdfminer.high_level import extract_text
 from src.socket_instance import emit_agent
 from src.config import Config
 from src.state import AgentState
+from src.browser.pool import BrowserPool
+from src.browser.screenshots import ScreenshotStore, make_preview
 
 
 class Browser:
     def __init__(self):
-        self.playwright = None
-        self.browser = None
+        self.context = None
+        self.pooled_browser = None
         self.page = None
         self.agent = AgentState()
 
     async def start(self):
-        self.playwright = await async_playwright().start()
-        self.browser = await self.playwright.chromium.launch(headless=True)
-        self.page = await self.browser.new_page()
+        """
+        Open a page in a new context of a pooled browser. Must run on the
+        `BrowserPool` event loop, e.g. through `BrowserPool().run(...)`.
+        """
+        self.context, self.pooled_browser = await BrowserPool().acquire()
+        self.page = await self.context.new_page()
         return self
 
     # def new_page(self):
@@ -37,25 +41,39 @@ class Browser:
         return True
 
     async def screenshot(self, project_name):
-        screenshots_save_path = Config().get_screenshots_dir()
+        """
+        Capture the page once, store the full-page PNG and return its path together with
+        a downscaled base64 preview of the visible part. Encoding runs off the event loop.
+        """
+        config = Config()
 
         page_metadata = await self.page.evaluate("() => { return { url: document.location.href, title: document.title } }")
         page_url = page_metadata['url']
-        random_filename = os.urandom(20).hex()
-        filename_to_save = f"{random_filename}.png"
-        path_to_save = os.path.join(screenshots_save_path, filename_to_save)
 
         await self.page.emulate_media(media="screen")
-        await self.page.screenshot(path=path_to_save, full_page=True)
-        screenshot = await self.page.screenshot()
-        screenshot_bytes = base64.b64encode(screenshot).decode()
+        screenshot = await self.page.screenshot(full_page=True)
+        viewport = self.page.viewport_size or {}
+
+        loop = asyncio.get_running_loop()
+        save_task = loop.run_in_executor(None, ScreenshotStore().save, project_name, screenshot)
+        preview = await loop.run_in_executor(
+            None,
+            make_preview,
+            screenshot,
+            viewport.get("height"),
+            config.get_screenshot_preview_width(),
+            config.get_screenshot_preview_quality(),
+            config.get_screenshot_preview_format(),
+        )
+        path_to_save = await save_task
+
         new_state = self.agent.new_state()
         new_state["internal_monologue"] = "Browsing the web right now..."
         new_state["browser_session"]["url"] = page_url
         new_state["browser_session"]["screenshot"] = path_to_save
         self.agent.add_to_current_state(project_name, new_state)
         # self.close()
-        return path_to_save, screenshot_bytes
+        return path_to_save, preview
 
     def get_html(self):
         return self.page.content()
@@ -85,5 +103,18 @@ class Browser:
         return self.page.evaluate("() => document.body.innerText")
 
     async def close(self):
-        await self.page.close()
-        await self.browser.close()
+        """
+        Close the page and give the context back to the pool. Safe to call after a failed
+        `start` and more than once; the context is released even if closing the page fails.
+        """
+        if self.context is None:
+            return
+        context, self.context = self.context, None
+        try:
+            if self.page is not None:
+                await self.page.close()
+        except Exception as e:
+            print(f"Failed to close page: {e}")
+        finally:
+            self.page = None
+            await BrowserPool().release(context, self.pooled_browser)
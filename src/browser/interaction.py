@@ -5,14 +5,15 @@
 #
 # MODIFIED FOR DEVIKA
 
-from playwright.sync_api import sync_playwright
-import os
 import time
 from sys import exit, platform
 
-from src.config import Config
 from src.state import AgentState
 from src.llm import LLM
+from src.browser.pool import BrowserPool
+from src.browser.screenshots import ScreenshotStore
+
+BROWSER_CONTENT_LIMIT = 4500  # characters of browser content sent to the model
 
 prompt_template = """
 You are an agent controlling a browser. You are given:
@@ -52,6 +53,11 @@ probably be a CLICK.)
 
 Don't try to interact with elements that you can't see.
 
+Element ids are stable while you stay on the same page. The browser content always lists the elements currently
+on the page. Lines starting with "+" are elements that appeared since your previous command, "~" are elements whose
+content changed, and a final "(no longer on the page: ...)" line names the ids that disappeared. On long pages some
+unchanged elements may be left out, which is noted with "(N more elements not shown)"; scroll to see them.
+
 Here are some examples:
 
 EXAMPLE 1:
@@ -154,30 +160,59 @@ YOUR COMMAND:
 
 black_listed_elements = set(["html", "head", "title", "meta", "iframe", "body", "script", "style", "path", "svg", "br", "::marker",])
 
+# All window metrics `Crawler.crawl` needs, fetched in a single round-trip
+WINDOW_METRICS_JS = """() => ({
+	devicePixelRatio: window.devicePixelRatio,
+	scrollX: window.scrollX,
+	scrollY: window.scrollY,
+	pageYOffset: window.pageYOffset,
+	pageXOffset: window.pageXOffset,
+	screenWidth: window.screen.width,
+	screenHeight: window.screen.height,
+	offsetHeight: document.body.offsetHeight,
+	scrollHeight: document.body.scrollHeight,
+})"""
+
 class Crawler:
 	def __init__(self):
-		self.browser = (
-			sync_playwright()
-			.start()
-			.chromium.launch(
-				headless=True,
-			)
+		self.pool = BrowserPool()
+		self.context, self.pooled_browser = self.pool.run(
+			self.pool.acquire(viewport={"width": 1280, "height": 1080})
 		)
+		try:
+			self.page = self.pool.run(self.context.new_page())
+		except Exception:
+			self.close()
+			raise
+		self.page_element_buffer = {}
+		self.reset_snapshot()
 
-		self.page = self.browser.new_page()
-		self.page.set_viewport_size({"width": 1280, "height": 1080})
-  
-	def screenshot(self, project_name):
-		screenshots_save_path = Config().get_screenshots_dir()
+	def reset_snapshot(self):
+		"""
+		Forget the previous snapshot and the element ids, e.g. after navigating to a new document
+		where backend node ids start over.
+		"""
+		self.element_ids = {}
+		self.next_element_id = 0
+		self.previous_elements = None
+		self.previous_url = None
+
+	def element_id(self, backend_node_id):
+		if backend_node_id not in self.element_ids:
+			self.element_ids[backend_node_id] = self.next_element_id
+			self.next_element_id += 1
+		return self.element_ids[backend_node_id]
 
-		page_metadata = self.page.evaluate("() => { return { url: document.location.href, title: document.title } }")
+	def close(self):
+		self.pool.run(self.pool.release(self.context, self.pooled_browser))
+
+	def screenshot(self, project_name):
+		page_metadata = self.pool.run(self.page.evaluate("() => { return { url: document.location.href, title: document.title } }"))
 		page_url = page_metadata['url']
-		random_filename = os.urandom(20).hex()
-		filename_to_save = f"{random_filename}.png"
-		path_to_save = os.path.join(screenshots_save_path, filename_to_save)
 
-		self.page.emulate_media(media="screen")
-		self.page.screenshot(path=path_to_save)
+		self.pool.run(self.page.emulate_media(media="screen"))
+		screenshot = self.pool.run(self.page.screenshot())
+		path_to_save = ScreenshotStore().save(project_name, screenshot)
 
 		new_state = AgentState().new_state()
 		new_state["internal_monologue"] = "Browsing the web right now..."
@@ -188,19 +223,20 @@ class Crawler:
 		return path_to_save
 
 	def go_to_page(self, url):
-		self.page.goto(url=url if "://" in url else "http://" + url)
-		self.client = self.page.context.new_cdp_session(self.page)
+		self.pool.run(self.page.goto(url=url if "://" in url else "http://" + url))
+		self.client = self.pool.run(self.context.new_cdp_session(self.page))
 		self.page_element_buffer = {}
+		self.reset_snapshot()
 
 	def scroll(self, direction):
 		if direction == "up":
-			self.page.evaluate(
+			self.pool.run(self.page.evaluate(
 				"(document.scrollingElement || document.body).scrollTop = (document.scrollingElement || document.body).scrollTop - window.innerHeight;"
-			)
+			))
 		elif direction == "down":
-			self.page.evaluate(
+			self.pool.run(self.page.evaluate(
 				"(document.scrollingElement || document.body).scrollTop = (document.scrollingElement || document.body).scrollTop + window.innerHeight;"
-			)
+			))
 
 	def click(self, id):
 		# Inject javascript into the page which removes the target= attribute from all links
@@ -210,52 +246,61 @@ class Crawler:
 			links[i].removeAttribute("target");
 		}
 		"""
-		self.page.evaluate(js)
+		self.pool.run(self.page.evaluate(js))
 
 		element = self.page_element_buffer.get(int(id))
 		if element:
 			x = element.get("center_x")
 			y = element.get("center_y")
 			
-			self.page.mouse.click(x, y)
+			self.pool.run(self.page.mouse.click(x, y))
 		else:
 			print("Could not find element")
 
 	def type(self, id, text):
 		self.click(id)
-		self.page.keyboard.type(text)
+		self.pool.run(self.page.keyboard.type(text))
 
 	def enter(self):
-		self.page.keyboard.press("Enter")
+		self.pool.run(self.page.keyboard.press("Enter"))
 
 	def crawl(self):
-		page = self.page
-		page_element_buffer = self.page_element_buffer
+		metrics = self.pool.run(self.page.evaluate(WINDOW_METRICS_JS))
+		tree = self.pool.run(self.client.send(
+			"DOMSnapshot.captureSnapshot",
+			{"computedStyles": [], "includeDOMRects": True, "includePaintOrder": True},
+		))
+		return self.parse_snapshot(tree, metrics)
+
+	def parse_snapshot(self, tree, metrics):
+		"""
+		Turn a `DOMSnapshot.captureSnapshot` result into the simplified element list
+		shown to the model. Every per-node lookup is precomputed in one linear pass so
+		the whole parse stays O(n) on large pages.
+		"""
+		page_element_buffer = {}
+		current_elements = {}
 		start = time.time()
 
 		page_state_as_text = []
 
-		device_pixel_ratio = page.evaluate("window.devicePixelRatio")
+		device_pixel_ratio = metrics["devicePixelRatio"]
 		if platform == "darwin" and device_pixel_ratio == 1:  # lies
 			device_pixel_ratio = 2
 
-		win_scroll_x 		= page.evaluate("window.scrollX")
-		win_scroll_y 		= page.evaluate("window.scrollY")
-		win_upper_bound 	= page.evaluate("window.pageYOffset")
-		win_left_bound 		= page.evaluate("window.pageXOffset") 
-		win_width 			= page.evaluate("window.screen.width")
-		win_height 			= page.evaluate("window.screen.height")
+		win_scroll_x 		= metrics["scrollX"]
+		win_scroll_y 		= metrics["scrollY"]
+		win_upper_bound 	= metrics["pageYOffset"]
+		win_left_bound 		= metrics["pageXOffset"]
+		win_width 			= metrics["screenWidth"]
+		win_height 			= metrics["screenHeight"]
 		win_right_bound 	= win_left_bound + win_width
 		win_lower_bound 	= win_upper_bound + win_height
-		document_offset_height = page.evaluate("document.body.offsetHeight")
-		document_scroll_height = page.evaluate("document.body.scrollHeight")
+		document_offset_height = metrics["offsetHeight"]
+		document_scroll_height = metrics["scrollHeight"]
 
 		# Removed unused percentage_progress variables
 
-		tree = self.client.send(
-			"DOMSnapshot.captureSnapshot",
-			{"computedStyles": [], "includeDOMRects": True, "includePaintOrder": True},
-		)
 		strings	 	= tree["strings"]
 		document 	= tree["documents"][0]
 		nodes 		= document["nodes"]
@@ -280,17 +325,41 @@ class Crawler:
 		layout_node_index 	= layout["nodeIndex"]
 		bounds 				= layout["bounds"]
 
-		cursor = 0
+		# node index -> position in the layout / input value columns (first occurrence wins)
+		layout_cursor = {}
+		for cursor, node_index in enumerate(layout_node_index):
+			layout_cursor.setdefault(node_index, cursor)
+
+		input_value_of = {}
+		for node_index, value_index in zip(input_value_index, input_value_values):
+			input_value_of.setdefault(node_index, value_index)
+
+		lower_names = {}
+		names = [
+			lower_names[name_index] if name_index in lower_names
+			else lower_names.setdefault(name_index, strings[name_index].lower())
+			for name_index in node_names
+		]
+
+		# Closest `a` / `button` ancestor (or the node itself) of every node, or None.
+		# DOMSnapshot lists nodes in document order, so a parent always comes before its children.
+		anchor_of = [None] * len(names)
+		button_of = [None] * len(names)
+		for index, node_name in enumerate(names):
+			node_parent = parent[index]
+			if node_name == "a":
+				anchor_of[index] = index
+			elif node_parent >= 0:
+				anchor_of[index] = anchor_of[node_parent]
+			if node_name == "button":
+				button_of[index] = index
+			elif node_parent >= 0:
+				button_of[index] = button_of[node_parent]
+
 		html_elements_text = []
 
 		child_nodes = {}
 		elements_in_view_port = []
-		
-		# Refactored to use dict.setdefault() for cleaner logic
-		ancestor_exceptions = {
-			"a": {"ancestry": {"-1": (False, None)}, "nodes": {}},
-			"button": {"ancestry": {"-1": (False, None)}, "nodes": {}},
-		}
 
 		def convert_name(node_name, is_clickable):
 			if node_name == "a":
@@ -317,29 +386,9 @@ class Crawler:
 						return values
 			return values
 
-		def add_to_hash_tree(hash_tree, tag, node_id, node_name, parent_id):
-			parent_id_str = str(parent_id)
-			if parent_id_str not in hash_tree:
-				parent_name = strings[node_names[parent_id]].lower()
-				grand_parent_id = parent[parent_id]
-				add_to_hash_tree(hash_tree, tag, parent_id, parent_name, grand_parent_id)
-			is_parent_desc_anchor, anchor_id = hash_tree[parent_id_str]
-			value = (True, node_id) if node_name == tag else (True, anchor_id) if is_parent_desc_anchor else (False, None)
-			hash_tree[str(node_id)] = value
-			return value
-
-		for index, node_name_index in enumerate(node_names):
-			node_parent = parent[index]
-			node_name = strings[node_name_index].lower()
-
-			# Refactored to use dict to store exceptions
-			for tag in ancestor_exceptions:
-				is_ancestor_of_tag, tag_id = add_to_hash_tree(ancestor_exceptions[tag]["ancestry"], tag, index, node_name, node_parent)
-				ancestor_exceptions[tag]["nodes"][str(index)] = (is_ancestor_of_tag, tag_id)
-				
-			try:
-				cursor = layout_node_index.index(index)
-			except:
+		for index, node_name in enumerate(names):
+			cursor = layout_cursor.get(index)
+			if cursor is None:
 				continue
 
 			if node_name in black_listed_elements:
@@ -373,13 +422,10 @@ class Crawler:
 				attributes[index], ["type", "placeholder", "aria-label", "title", "alt"]
 			)
 
-			ancestor_exception = {
-				tag: ancestor_exceptions[tag]["nodes"].get(str(index), (False, None))
-				for tag in ancestor_exceptions
-			}
-			
-			is_ancestor_of_anchor, anchor_id = ancestor_exception.get("a", (False, None))  
-			is_ancestor_of_button, button_id = ancestor_exception.get("button", (False, None))
+			anchor_id = anchor_of[index]
+			button_id = button_of[index]
+			is_ancestor_of_anchor = anchor_id is not None
+			is_ancestor_of_button = button_id is not None
 			ancestor_node_key = (
 				str(anchor_id) if is_ancestor_of_anchor else str(button_id) if is_ancestor_of_button else None
 			)
@@ -410,9 +456,8 @@ class Crawler:
 				element_node_value = strings[node_value[index]]
 				if element_node_value == "|": 
 					continue
-			elif node_name == "input" and index in input_value_index:
-				input_text_index = input_value_index.index(index)
-				text_index = input_value_values[input_text_index]
+			elif node_name == "input" and index in input_value_of:
+				text_index = input_value_of[index]
 				if text_index >= 0:
 					element_node_value = strings[text_index]
 
@@ -433,7 +478,6 @@ class Crawler:
 			})
 
 		elements_of_interest = []
-		id_counter = 0
 
 		for element in elements_in_view_port:
 			node_index = element["node_index"]
@@ -468,20 +512,75 @@ class Crawler:
 			if not should_include_element:
 				continue
    
-			page_element_buffer[id_counter] = element
+			element_id = self.element_id(element["backend_node_id"])
+			page_element_buffer[element_id] = element
 			
-			element_string = f'<{convert_name(node_name, is_clickable)} id={id_counter}{meta}>'
+			element_string = f'<{convert_name(node_name, is_clickable)} id={element_id}{meta}>'
 			if inner_text:
 				element_string += f'{inner_text}</{convert_name(node_name, is_clickable)}>'
 			else:
 				element_string += '/>'
 			elements_of_interest.append(element_string)
-			
-			id_counter += 1
+			current_elements[element_id] = element_string
 
+		self.page_element_buffer = page_element_buffer
+		self.current_elements = current_elements
 		print(f'Parsing time: {time.time() - start:.2f} seconds')
 		return elements_of_interest
 
+	def crawl_diff(self, limit=None):
+		"""
+		Crawl the page and return a self-contained element list with stable ids. Elements
+		added or changed since the previous call on the same page are marked "+" or "~",
+		and removed ones are listed at the end. When the list is longer than `limit`
+		characters, the marked elements are kept first and unchanged ones are dropped
+		from the end, so the truncation never hides what just changed.
+		"""
+		url = self.page.url
+		if url != self.previous_url:
+			self.reset_snapshot()
+			self.previous_url = url
+
+		elements = self.crawl()
+		previous_elements, self.previous_elements = self.previous_elements, self.current_elements
+		limit = limit or BROWSER_CONTENT_LIMIT
+
+		if previous_elements is None:
+			lines = [(True, element_string) for element_string in elements]
+			removed = []
+		else:
+			lines = []
+			for element_id, element_string in self.current_elements.items():
+				previous_string = previous_elements.get(element_id)
+				if previous_string is None:
+					lines.append((True, f"+ {element_string}"))
+				elif previous_string != element_string:
+					lines.append((True, f"~ {element_string}"))
+				else:
+					lines.append((False, element_string))
+			removed = [
+				f"id={element_id}" for element_id in previous_elements
+				if element_id not in self.current_elements
+			]
+
+		footer = f"(no longer on the page: {', '.join(removed)})" if removed else ""
+		content = "\n".join([line for _, line in lines] + ([footer] if footer else []))
+		if len(content) <= limit:
+			return content
+
+		# keep every marked line that fits, then unchanged lines in document order
+		remaining = limit - len(footer) - 60
+		keep = set()
+		for changed in (True, False):
+			for index, (is_changed, line) in enumerate(lines):
+				if is_changed == changed and len(line) + 1 <= remaining:
+					keep.add(index)
+					remaining -= len(line) + 1
+		omitted = len(lines) - len(keep)
+		kept_lines = [line for index, (_, line) in enumerate(lines) if index in keep]
+		notes = [f"({omitted} more elements not shown)"] if omitted else []
+		return "\n".join(kept_lines + notes + ([footer] if footer else []))
+
 def start_interaction(model_id, objective, project_name):
 	_crawler = Crawler()
 
@@ -496,7 +595,7 @@ def start_interaction(model_id, objective, project_name):
 		prompt = prompt.replace("$objective", objective)
 		prompt = prompt.replace("$url", url[:100])
 		prompt = prompt.replace("$previous_command", previous_command)
-		prompt = prompt.replace("$browser_content", browser_content[:4500])
+		prompt = prompt.replace("$browser_content", browser_content[:BROWSER_CONTENT_LIMIT])
 		response = LLM(model_id=model_id).inference(prompt)
 		return response
 
@@ -524,13 +623,14 @@ def start_interaction(model_id, objective, project_name):
 
 	gpt_cmd = ""
 	prev_cmd = ""
-	_crawler.go_to_page("google.com")
 
 	try:
+		# inside the try, so a failed navigation still gives the context back to the pool
+		_crawler.go_to_page("google.com")
 		visits = 0
 
 		while True and visits < 5:
-			browser_content = "\n".join(_crawler.crawl())
+			browser_content = _crawler.crawl_diff()
 			prev_cmd = gpt_cmd
 
 			current_url = _crawler.page.url
@@ -545,3 +645,6 @@ def start_interaction(model_id, objective, project_name):
 	except KeyboardInterrupt:
 		print("\n[!] Ctrl+C detected, exiting gracefully.")
 		exit(0)
+
+	finally:
+		_crawler.close()
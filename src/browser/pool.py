@@ -0,0 +1,80 @@
+import asyncio
+
+from playwright.async_api import async_playwright
+
+from src.config import Config
+from src.logger import Logger
+from src.shared import BackgroundLoop, Singleton
+
+logger = Logger()
+
+
+class PooledBrowser:
+    def __init__(self, browser):
+        self.browser = browser
+        self.pages_served = 0
+
+
+class BrowserPool(BackgroundLoop, Singleton):
+    """
+    Long-lived headless Chromium processes shared by `Browser` and `Crawler`.
+
+    Playwright objects are bound to the event loop that created them, so the pool
+    owns a dedicated event loop running on a background thread and every browser
+    coroutine is executed there through `run`. A task gets a fresh browser context
+    (cookies, storage and pages isolated) on a warm browser instead of launching a
+    new process; browsers are relaunched when they disconnect or after serving
+    `MAX_PAGES_PER_BROWSER` contexts.
+    """
+    def _setup(self):
+        config = Config()
+        self.size = config.get_browser_pool_size()
+        self.max_pages = config.get_browser_max_pages()
+        self.playwright = None
+        self.available = None
+        self.start_loop("browser-pool")
+
+    async def _launch(self) -> PooledBrowser:
+        browser = await self.playwright.chromium.launch(headless=True)
+        return PooledBrowser(browser)
+
+    async def _ensure_started(self):
+        if self.playwright is None:
+            self.playwright = await async_playwright().start()
+            self.available = asyncio.Queue()
+            for _ in range(self.size):
+                self.available.put_nowait(None)  # browsers are launched on first use
+
+    async def acquire(self, **context_options):
+        """
+        Wait for a free browser and open a new context on it with `context_options`.
+        Returns the context together with the pooled browser it has to be released to.
+        """
+        await self._ensure_started()
+        pooled = await self.available.get()
+
+        try:
+            if pooled is None or not pooled.browser.is_connected():
+                pooled = await self._launch()
+            context = await pooled.browser.new_context(**context_options)
+        except Exception:
+            self.available.put_nowait(None)
+            raise
+
+        pooled.pages_served += 1
+        return context, pooled
+
+    async def release(self, context, pooled: PooledBrowser):
+        try:
+            await context.close()
+        except Exception as e:
+            logger.warning(f"Failed to close browser context: {e}")
+
+        if pooled.pages_served >= self.max_pages or not pooled.browser.is_connected():
+            try:
+                await pooled.browser.close()
+            except Exception as e:
+                logger.warning(f"Failed to close recycled browser: {e}")
+            pooled = None
+
+        self.available.put_nowait(pooled)
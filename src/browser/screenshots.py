@@ -0,0 +1,191 @@
+import base64
+import hashlib
+import io
+import os
+import threading
+import time
+from typing import Optional
+
+from PIL import Image
+from sqlalchemy import Index, func
+from sqlmodel import Field, Session, SQLModel, select
+
+from src.config import Config
+from src.database import Database
+
+PREVIEW_MIME_TYPES = {
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+    "PNG": "image/png",
+}
+
+
+def make_preview(png_bytes: bytes, crop_height: int, width: int, quality: int, image_format: str) -> str:
+    """
+    Derive a small base64 preview from a full-page PNG capture: keep the top
+    `crop_height` pixels (what the viewport showed), scale it down to `width`
+    and re-encode it as `image_format`. CPU bound, so run it off the event loop.
+    """
+    with Image.open(io.BytesIO(png_bytes)) as image:
+        if crop_height and image.height > crop_height:
+            image = image.crop((0, 0, image.width, crop_height))
+        if image.width > width:
+            image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        if image_format == "JPEG" and image.mode != "RGB":
+            image = image.convert("RGB")
+
+        buffer = io.BytesIO()
+        image.save(buffer, format=image_format, quality=quality)
+
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+class Screenshot(SQLModel, table=True):
+    """
+    A project's reference to a stored capture. Several projects (or several visits
+    of the same page) can point at the same `digest`, which is stored only once.
+    """
+    __tablename__ = "screenshot"
+    __table_args__ = (
+        Index("ix_screenshot_project_digest", "project", "digest", unique=True),
+        Index("ix_screenshot_digest", "digest"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    project: str
+    digest: str
+    size: int
+    created_at: float
+
+
+class ScreenshotStore:
+    """
+    Content-addressed screenshot storage: captures are saved as `<sha256>.png` in the
+    screenshots directory, so identical captures are written once. Old captures are
+    dropped by age, per-project size and global size, at most every `RETENTION_INTERVAL`.
+    """
+    RETENTION_INTERVAL = 60  # seconds
+    _last_retention = 0
+    _retention_lock = threading.Lock()
+
+    def __init__(self):
+        config = Config()
+        self.screenshots_dir = config.get_screenshots_dir()
+        self.max_age_days = config.get_screenshot_max_age_days()
+        self.project_max_bytes = config.get_screenshot_project_max_mb() * 1024 * 1024
+        self.max_bytes = config.get_screenshot_max_mb() * 1024 * 1024
+
+        database = Database()
+        database.create_tables(Screenshot)
+        self.engine = database.engine
+
+    def path_for(self, digest: str) -> str:
+        return os.path.join(self.screenshots_dir, f"{digest}.png")
+
+    def resolve(self, digest: str) -> Optional[str]:
+        """
+        Path of the stored capture `digest`, or None for unknown or malformed digests.
+        Captures saved before the store used hex names too, so they still resolve.
+        """
+        if not digest or any(c not in "0123456789abcdef" for c in digest):
+            return None
+        path = self.path_for(digest)
+        return path if os.path.exists(path) else None
+
+    def save(self, project: str, png_bytes: bytes) -> str:
+        digest = hashlib.sha256(png_bytes).hexdigest()
+        path = self.path_for(digest)
+
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(png_bytes)
+            os.replace(tmp_path, path)
+
+        with Session(self.engine) as session:
+            screenshot = session.exec(
+                select(Screenshot).where(Screenshot.project == project, Screenshot.digest == digest)
+            ).first()
+            if screenshot is None:
+                screenshot = Screenshot(project=project, digest=digest, size=len(png_bytes), created_at=time.time())
+            screenshot.created_at = time.time()
+            session.add(screenshot)
+            session.commit()
+
+        if time.time() - ScreenshotStore._last_retention > self.RETENTION_INTERVAL:
+            self.apply_retention()
+
+        return path
+
+    def delete_project(self, project: str):
+        with Session(self.engine) as session:
+            digests = self._delete_rows(session, select(Screenshot).where(Screenshot.project == project))
+            session.commit()
+            self._remove_unreferenced(session, digests)
+
+    def apply_retention(self):
+        if not ScreenshotStore._retention_lock.acquire(blocking=False):
+            return
+        try:
+            ScreenshotStore._last_retention = time.time()
+            with Session(self.engine) as session:
+                digests = set()
+
+                cutoff = time.time() - self.max_age_days * 24 * 60 * 60
+                digests |= self._delete_rows(session, select(Screenshot).where(Screenshot.created_at < cutoff))
+
+                project_sizes = session.exec(
+                    select(Screenshot.project, func.sum(Screenshot.size)).group_by(Screenshot.project)
+                ).all()
+                for project, project_size in project_sizes:
+                    if project_size > self.project_max_bytes:
+                        digests |= self._delete_oldest(
+                            session,
+                            select(Screenshot).where(Screenshot.project == project),
+                            project_size - self.project_max_bytes
+                        )
+
+                stored = session.exec(
+                    select(Screenshot.digest, func.max(Screenshot.size), func.max(Screenshot.created_at))
+                    .group_by(Screenshot.digest)
+                    .order_by(func.max(Screenshot.created_at))
+                ).all()
+                excess = sum(size for _digest, size, _created_at in stored) - self.max_bytes
+                for digest, size, _created_at in stored:
+                    if excess <= 0:
+                        break
+                    digests |= self._delete_rows(session, select(Screenshot).where(Screenshot.digest == digest))
+                    excess -= size
+
+                session.commit()
+                self._remove_unreferenced(session, digests)
+        finally:
+            ScreenshotStore._retention_lock.release()
+
+    @staticmethod
+    def _delete_rows(session: Session, query) -> set:
+        digests = set()
+        for screenshot in session.exec(query).all():
+            digests.add(screenshot.digest)
+            session.delete(screenshot)
+        return digests
+
+    @staticmethod
+    def _delete_oldest(session: Session, query, excess: int) -> set:
+        digests = set()
+        for screenshot in session.exec(query.order_by(Screenshot.created_at)).all():
+            if excess <= 0:
+                break
+            digests.add(screenshot.digest)
+            excess -= screenshot.size
+            session.delete(screenshot)
+        return digests
+
+    def _remove_unreferenced(self, session: Session, digests: set):
+        for digest in digests:
+            still_used = session.exec(select(Screenshot.id).where(Screenshot.digest == digest).limit(1)).first()
+            if still_used is None:
+                try:
+                    os.remove(self.path_for(digest))
+                except FileNotFoundError:
+                    pass
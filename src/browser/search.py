@@ -1,5 +1,10 @@
-import requests
+import asyncio
+import threading
+import time
+
+import httpx
 from src.config import Config
+from src.shared import BackgroundLoop, Singleton
 
 import re
 from urllib.parse import unquote
@@ -7,56 +12,209 @@ from html import unescape
 import orjson
 
 
-class BingSearch:
+class TTLCache:
+    """
+    Small thread-safe mapping whose entries expire `ttl` seconds after they are set.
+    """
+    def __init__(self, ttl: float, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            if len(self.entries) >= self.max_entries:
+                now = time.monotonic()
+                self.entries = {k: v for k, v in self.entries.items() if v[0] >= now}
+                if len(self.entries) >= self.max_entries:
+                    self.entries.pop(next(iter(self.entries)))
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+
+    def pop(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+
+class SearchClient(BackgroundLoop, Singleton):
+    """
+    Connection pools and caches shared by every search engine instance.
+
+    The async sessions are bound to the event loop that created them, so the client
+    owns one event loop on a background thread, like `BrowserPool`, and the blocking
+    `search` API runs its coroutines there through `run`.
+    """
+    def _setup(self):
+        config = Config()
+        self.timeout = config.get_timeout_search()
+        self.results = TTLCache(config.get_search_cache_ttl())
+        self.vqd_tokens = TTLCache(config.get_search_vqd_ttl())
+        self.max_concurrent = config.get_search_max_concurrent()
+
+        self.http = None
+        self.ddg_session = None
+        self.slots = None
+        self.start_loop("search-client")
+
+    def get_slots(self) -> asyncio.Semaphore:
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.max_concurrent)
+        return self.slots
+
+    def get_http(self) -> httpx.AsyncClient:
+        if self.http is None:
+            self.http = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(max_connections=self.max_concurrent * 2, max_keepalive_connections=self.max_concurrent),
+            )
+        return self.http
+
+    def get_ddg_session(self):
+        if self.ddg_session is None:
+            from curl_cffi.requests import AsyncSession
+            self.ddg_session = AsyncSession(impersonate="chrome", allow_redirects=False, timeout=self.timeout)
+            self.ddg_session.headers["Referer"] = "https://duckduckgo.com/"
+        return self.ddg_session
+
+
+class SearchEngine:
+    """
+    Base class of the search engines. Subclasses implement `fetch` (one uncached
+    request) and `first_link` (pick the first result URL out of a query result).
+    """
+    name = None
+
     def __init__(self):
         self.config = Config()
-        self.bing_api_key = self.config.get_bing_api_key()
-        self.bing_api_endpoint = self.config.get_bing_api_endpoint()
+        self.client = SearchClient()
         self.query_result = None
 
+    async def fetch(self, query):
+        raise NotImplementedError
+
+    @staticmethod
+    def first_link(query_result):
+        raise NotImplementedError
+
+    async def asearch(self, query):
+        key = (self.name, query)
+        query_result = self.client.results.get(key)
+        if query_result is None:
+            async with self.client.get_slots():
+                query_result = await self.fetch(query)
+            if self.has_results(query_result):
+                self.client.results.set(key, query_result)
+        return query_result
+
+    def has_results(self, query_result) -> bool:
+        """
+        Only results with a usable link are cached, so an error or quota response
+        that still parsed as JSON isn't served again for `CACHE_TTL`.
+        """
+        try:
+            return bool(query_result) and bool(self.first_link(query_result))
+        except Exception:
+            return False
+
+    async def _search_many(self, queries):
+        unique_queries = list(dict.fromkeys(queries))
+        query_results = await asyncio.gather(
+            *(self.asearch(query) for query in unique_queries),
+            return_exceptions=True
+        )
+        results = {}
+        for query, query_result in zip(unique_queries, query_results):
+            if isinstance(query_result, BaseException):
+                print(f"Search failed for {query}: {query_result}")
+                query_result = None
+            results[query] = query_result
+        return results
+
     def search(self, query):
+        self.query_result = self.client.run(self.asearch(query))
+        return self.query_result
+
+    def search_many(self, queries: list) -> dict:
+        """
+        Search all `queries` concurrently. Returns the query result of every query,
+        or None for the ones that failed.
+        """
+        return self.client.run(self._search_many(queries))
+
+    def get_first_link(self):
+        return self.first_link(self.query_result)
+
+
+class BingSearch(SearchEngine):
+    name = "bing"
+
+    def __init__(self):
+        super().__init__()
+        self.bing_api_key = self.config.get_bing_api_key()
+        self.bing_api_endpoint = self.config.get_bing_api_endpoint()
+
+    async def fetch(self, query):
         headers = {"Ocp-Apim-Subscription-Key": self.bing_api_key}
         params = {"q": query, "mkt": "en-US"}
 
+        response = await self.client.get_http().get(self.bing_api_endpoint, headers=headers, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    def search(self, query):
         try:
-            response = requests.get(self.bing_api_endpoint, headers=headers, params=params)
-            response.raise_for_status()
-            self.query_result = response.json()
-            return self.query_result
+            return super().search(query)
         except Exception as error:
             return error
 
-    def get_first_link(self):
-        return self.query_result["webPages"]["value"][0]["url"]
+    @staticmethod
+    def first_link(query_result):
+        return query_result["webPages"]["value"][0]["url"]
+
 
+class GoogleSearch(SearchEngine):
+    name = "google"
 
-class GoogleSearch:
     def __init__(self):
-        self.config = Config()
+        super().__init__()
         self.google_search_api_key = self.config.get_google_search_api_key()
         self.google_search_engine_ID = self.config.get_google_search_engine_id()
         self.google_search_api_endpoint = self.config.get_google_search_api_endpoint()
-        self.query_result = None
 
-    def search(self, query):
+    async def fetch(self, query):
         params = {
             "key": self.google_search_api_key,
             "cx": self.google_search_engine_ID,
             "q": query
         }
+        print("Searching in Google...")
+        response = await self.client.get_http().get(self.google_search_api_endpoint, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    def search(self, query):
         try:
-            print("Searching in Google...")
-            response = requests.get(self.google_search_api_endpoint, params=params)
-            # response.raise_for_status()
-            self.query_result = response.json()
+            super().search(query)
         except Exception as error:
             return error
 
-    def get_first_link(self):
+    @staticmethod
+    def first_link(query_result):
         item = ""
         try:
-            if 'items' in self.query_result:
-                item = self.query_result['items'][0]['link']
+            if 'items' in query_result:
+                item = query_result['items'][0]['link']
             return item
         except Exception as error:
             print(error)
@@ -83,39 +241,48 @@ class GoogleSearch:
 #
 
 
-class DuckDuckGoSearch:
+class DuckDuckGoSearch(SearchEngine):
     """DuckDuckGo search engine class.
     methods are inherited from the duckduckgo_search package.
     do not change the methods.
 
     currently, the package is not working with our current setup.
     """
-    def __init__(self):
-        from curl_cffi import requests as curl_requests
-        self.query_result = None
-        self.asession = curl_requests.Session(impersonate="chrome", allow_redirects=False)
-        self.asession.headers["Referer"] = "https://duckduckgo.com/"
+    name = "duckduckgo"
 
-    def _get_url(self, method, url, data):
+    async def _get_url(self, method, url, data=None, params=None):
         try:
-            resp = self.asession.request(method, url, data=data)
+            resp = await self.client.get_ddg_session().request(method, url, data=data, params=params)
             if resp.status_code == 200:
                 return resp.content
-            if resp.status_code == (202, 301, 403):
+            if resp.status_code in (202, 301, 403):
                 raise Exception(f"Error: {resp.status_code} rate limit error")
             if not resp:
                 return None
         except Exception as error:
             if "timeout" in str(error).lower():
                 raise TimeoutError("Duckduckgo timed out error")
+            raise
 
-    def duck(self, query):
-        resp = self._get_url("POST", "https://duckduckgo.com/", data={"q": query})
-        vqd = self.extract_vqd(resp)
+    async def get_vqd(self, query):
+        vqd = self.client.vqd_tokens.get(query)
+        if vqd is None:
+            resp = await self._get_url("POST", "https://duckduckgo.com/", data={"q": query})
+            vqd = self.extract_vqd(resp)
+            if vqd:
+                self.client.vqd_tokens.set(query, vqd)
+        return vqd
+
+    async def fetch(self, query):
+        vqd = await self.get_vqd(query)
 
         params = {"q": query, "kl": 'en-us', "p": "1", "s": "0", "df": "", "vqd": vqd, "ex": ""}
-        resp = self._get_url("GET", "https://links.duckduckgo.com/d.js", params)
+        resp = await self._get_url("GET", "https://links.duckduckgo.com/d.js", params=params)
         page_data = self.text_extract_json(resp)
+        if page_data is None:
+            # the cached token may have expired on DuckDuckGo's side
+            self.client.vqd_tokens.pop(query)
+            return []
 
         results = []
         for row in page_data:
@@ -130,13 +297,17 @@ class DuckDuckGoSearch:
                     }
                     results.append(result)
 
-        self.query_result = results
+        return results
+
+    def duck(self, query):
+        return super().search(query)
 
     def search(self, query):
         self.duck(query)
 
-    def get_first_link(self):
-        return self.query_result[0]["href"]
+    @staticmethod
+    def first_link(query_result):
+        return query_result[0]["href"] if query_result else None
 
     @staticmethod
     def extract_vqd(html_bytes: bytes) -> str:
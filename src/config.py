@@ -102,6 +102,15 @@ class Config:
     def get_repos_dir(self):
         return self.config["STORAGE"]["REPOS_DIR"]
 
+    def get_envs_dir(self):
+        return self.config["STORAGE"]["ENVS_DIR"]
+
+    def get_vectors_dir(self):
+        return self.config["STORAGE"]["VECTORS_DIR"]
+
+    def get_llm_cache_dir(self):
+        return self.config["STORAGE"]["LLM_CACHE_DIR"]
+
     def get_logging_rest_api(self):
         return self.config["LOGGING"]["LOG_REST_API"] == "true"
 
@@ -111,6 +120,100 @@ class Config:
     def get_timeout_inference(self):
         return self.config["TIMEOUT"]["INFERENCE"]
 
+    def get_timeout_command(self):
+        return self.config["TIMEOUT"]["COMMAND"]
+
+    def get_sandbox_output_max_kb(self):
+        return self.config["SANDBOX"]["OUTPUT_MAX_KB"]
+
+    def get_sandbox_cpu_seconds(self):
+        return self.config["SANDBOX"]["CPU_SECONDS"]
+
+    def get_sandbox_memory_mb(self):
+        return self.config["SANDBOX"]["MEMORY_MB"]
+
+    def get_sandbox_max_processes(self):
+        return self.config["SANDBOX"]["MAX_PROCESSES"]
+
+    def get_sandbox_file_size_mb(self):
+        return self.config["SANDBOX"]["FILE_SIZE_MB"]
+
+    def get_sandbox_use_cgroups(self):
+        return self.config["SANDBOX"]["USE_CGROUPS"] == "true"
+
+    def get_sandbox_isolation(self):
+        return self.config["SANDBOX"]["ISOLATION"]
+
+    def get_sandbox_build_cpu_seconds(self):
+        return self.config["SANDBOX"]["BUILD_CPU_SECONDS"]
+
+    def get_sandbox_build_memory_mb(self):
+        return self.config["SANDBOX"]["BUILD_MEMORY_MB"]
+
+    def get_sandbox_build_max_processes(self):
+        return self.config["SANDBOX"]["BUILD_MAX_PROCESSES"]
+
+    def get_sandbox_failed_build_ttl(self):
+        return self.config["SANDBOX"]["FAILED_BUILD_TTL"]
+
+    def get_timeout_search(self):
+        return self.config["TIMEOUT"]["SEARCH"]
+
+    def get_search_cache_ttl(self):
+        return self.config["SEARCH"]["CACHE_TTL"]
+
+    def get_search_vqd_ttl(self):
+        return self.config["SEARCH"]["VQD_TTL"]
+
+    def get_search_max_concurrent(self):
+        return self.config["SEARCH"]["MAX_CONCURRENT"]
+
+    def get_code_token_budget(self, model_id: str = None):
+        budgets = self.config["CONTEXT"]["MODEL_CODE_TOKEN_BUDGETS"]
+        return budgets.get(model_id, self.config["CONTEXT"]["CODE_TOKEN_BUDGET"])
+
+    def get_browser_pool_size(self):
+        return self.config["BROWSER"]["POOL_SIZE"]
+
+    def get_browser_max_pages(self):
+        return self.config["BROWSER"]["MAX_PAGES_PER_BROWSER"]
+
+    def get_screenshot_preview_width(self):
+        return self.config["BROWSER"]["SCREENSHOT_PREVIEW_WIDTH"]
+
+    def get_screenshot_preview_quality(self):
+        return self.config["BROWSER"]["SCREENSHOT_PREVIEW_QUALITY"]
+
+    def get_screenshot_preview_format(self):
+        return self.config["BROWSER"]["SCREENSHOT_PREVIEW_FORMAT"].upper()
+
+    def get_screenshot_max_age_days(self):
+        return self.config["BROWSER"]["SCREENSHOT_MAX_AGE_DAYS"]
+
+    def get_screenshot_project_max_mb(self):
+        return self.config["BROWSER"]["SCREENSHOT_PROJECT_MAX_MB"]
+
+    def get_screenshot_max_mb(self):
+        return self.config["BROWSER"]["SCREENSHOT_MAX_MB"]
+
+    def get_llm_cache_enabled(self):
+        return self.config["LLM_CACHE"]["ENABLED"] == "true"
+
+    def get_llm_cache_max_size_mb(self):
+        return self.config["LLM_CACHE"]["MAX_SIZE_MB"]
+
+    def get_llm_cache_agents(self):
+        return self.config["LLM_CACHE"]["AGENTS"]
+
+    def get_stub_llm_enabled(self):
+        return self.config["STUB_LLM"]["ENABLED"] == "true"
+
+    def get_stub_llm_chunk_size(self):
+        return self.config["STUB_LLM"]["CHUNK_SIZE"]
+
+    def get_stub_llm_delay_ms(self):
+        return self.config["STUB_LLM"]["DELAY_MS"]
+
     def set_bing_api_key(self, key):
         self.config["API_KEYS"]["BING"] = key
         self.save_config()
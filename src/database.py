@@ -0,0 +1,75 @@
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import Session, SQLModel, create_engine
+
+from src.config import Config
+from src.logger import Logger
+from src.shared import Singleton
+
+# Applied to every new pooled connection. WAL lets the REST pollers keep reading
+# while an agent thread writes; NORMAL sync is durable enough in WAL mode.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64000,  # negative values are KiB, so ~64 MB of page cache
+    "mmap_size": 268435456,
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,
+}
+
+
+class Database(Singleton):
+    """
+    One pooled engine per SQLite file, shared by every manager in the process.
+    Constructing `AgentState`, `ProjectManager` or `KnowledgeBase` only looks the
+    engine up here instead of building a new connection pool and re-running DDL.
+    """
+    @classmethod
+    def _key(cls, sqlite_path: str = None) -> tuple:
+        return (sqlite_path or Config().get_sqlite_db(),)
+
+    def _setup(self, sqlite_path: str):
+        self.sqlite_path = sqlite_path
+        self.engine = create_engine(
+            f"sqlite:///{sqlite_path}",
+            connect_args={"check_same_thread": False},
+        )
+        event.listen(self.engine, "connect", self._set_pragmas)
+        self.session = sessionmaker(bind=self.engine, class_=Session)
+        self._created_tables = set()
+        self._tables_lock = threading.Lock()
+
+    @staticmethod
+    def _set_pragmas(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+        cursor.close()
+
+    def _create_indexes(self, table):
+        # `create_all` skips tables that already exist, so indexes added to a model
+        # after the database was first created have to be created explicitly.
+        for index in table.indexes:
+            try:
+                index.create(self.engine, checkfirst=True)
+            except IntegrityError as e:
+                Logger().warning(f"Could not create index {index.name} on {table.name}: {e.orig}")
+
+    def create_tables(self, *models):
+        """
+        Create the tables of the given models and their indexes, once per process.
+        """
+        pending = [model.__table__ for model in models if model.__tablename__ not in self._created_tables]
+        if not pending:
+            return
+
+        with self._tables_lock:
+            pending = [table for table in pending if table.name not in self._created_tables]
+            if pending:
+                SQLModel.metadata.create_all(self.engine, tables=pending)
+                for table in pending:
+                    self._create_indexes(table)
+                self._created_tables.update(table.name for table in pending)
@@ -1 +1,3 @@
-from .read_code import ReadCode
\ No newline at end of file
+from .read_code import ReadCode
+from .snapshot import ProjectSnapshot
+from .patch import PatchSet, PatchError, parse_edits
@@ -0,0 +1,205 @@
+import os
+import re
+import threading
+
+import tiktoken
+
+from src.filesystem.snapshot import ProjectSnapshot
+from src.logger import Logger
+
+TIKTOKEN_ENC = tiktoken.get_encoding("cl100k_base")
+
+# Relevance weights of the ranking signals.
+MENTION_SCORE = 10.0  # the file name or path appears in the conversation or error
+TERM_SCORE = 1.0  # per distinct conversation term found in the file
+RECENCY_SCORE = 3.0  # spread over the files from least to most recently modified
+IMPORT_SHARE = 0.5  # part of an importer's score passed on to the files it imports
+SEMANTIC_SCORE = 6.0  # scaled by the best cosine similarity of a file's chunks to the query
+
+CHUNK_LINES = 40  # lines of code per embedded chunk
+SEMANTIC_TOP_K = 64  # chunks retrieved per query
+
+TERM_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]{2,}")
+IMPORT_PATTERNS = [
+    re.compile(r"^\s*(?:from\s+([\w.]+)\s+import|import\s+([\w.]+))", re.MULTILINE),
+    re.compile(r"""(?:require\(|import\s[^'"]*?from\s|import\s)\s*['"]([^'"]+)['"]"""),
+    re.compile(r"""^\s*(?:use|mod)\s+([\w:]+)""", re.MULTILINE),
+    re.compile(r"""^\s*#include\s+["<]([^">]+)[">]""", re.MULTILINE),
+]
+OUTLINE_PATTERN = re.compile(
+    r"^\s*(?:(?:export\s+)?(?:default\s+)?(?:async\s+)?(?:def|class|function|interface|type|enum|struct|trait|impl|fn|func)\b"
+    r"|(?:pub\s+)?(?:fn|struct|enum|trait|impl|mod)\b"
+    r"|export\s+(?:const|let|var)\b"
+    r"|@app\.|@router\.)"
+)
+
+
+# (project, path) -> digest of the file content last stored in the "code" vector memory,
+# so unchanged files aren't re-chunked and re-hashed on every call
+_indexed = {}
+_indexed_lock = threading.Lock()
+
+
+def count_tokens(text: str) -> int:
+    return len(TIKTOKEN_ENC.encode(text, disallowed_special=()))
+
+
+class ContextPacker:
+    """
+    Fits the code of a project into a token budget for a prompt.
+
+    Files are ranked by relevance to the query (files named in it, shared terms,
+    embedding similarity of their chunks, recent modification and being imported by
+    a relevant file), then added whole in that order while they fit. Files that don't
+    fit are reduced to an outline of their definitions, and to just their path when
+    even that doesn't fit.
+    """
+    def __init__(self, snapshot: ProjectSnapshot):
+        self.snapshot = snapshot
+
+    def _tokens(self, entry) -> int:
+        if entry.tokens is None:
+            entry.tokens = count_tokens(entry.markdown)
+        return entry.tokens
+
+    def _relative(self, file_path: str) -> str:
+        return os.path.relpath(file_path, self.snapshot.directory_path).replace(os.sep, "/")
+
+    def _chunks(self, relative_path: str, code: str) -> list:
+        lines = code.split("\n")
+        return [
+            f"{relative_path}\n" + "\n".join(lines[start:start + CHUNK_LINES])
+            for start in range(0, max(len(lines), 1), CHUNK_LINES)
+        ]
+
+    def index(self, memory, project: str) -> dict:
+        """
+        Bring the chunks of `project` in the "code" vector memory in line with the
+        snapshot. Chunks are stored per (project, path): a changed file's chunks replace
+        its old ones, so only the changed chunks are embedded, and a deleted file's
+        chunks are removed. Returns the file path of every relative path.
+        """
+        files = {}
+        for file_path, entry in self.snapshot.entries.items():
+            relative_path = self._relative(file_path)
+            files[relative_path] = file_path
+            key = (project, relative_path)
+            with _indexed_lock:
+                if _indexed.get(key) == entry.digest:
+                    continue
+            chunks = self._chunks(relative_path, entry.code)
+            memory.replace(key, chunks, [{"project": project, "path": relative_path} for _ in chunks])
+            with _indexed_lock:
+                _indexed[key] = entry.digest
+
+        for key in memory.keys():
+            if key[0] == project and key[1] not in files:
+                memory.remove(key)
+                with _indexed_lock:
+                    _indexed.pop(key, None)
+        return files
+
+    def semantic_scores(self, query: str) -> dict:
+        """
+        Best cosine similarity of each file's code chunks to `query`, from the "code"
+        vector memory. Empty if embeddings are unavailable.
+        """
+        from src.memory.rag import VectorMemory
+
+        project = os.path.basename(os.path.normpath(self.snapshot.directory_path))
+        try:
+            memory = VectorMemory("code")
+            files = self.index(memory, project)
+            hits = memory.search(query, SEMANTIC_TOP_K, project=project)
+        except Exception as e:
+            Logger().warning(f"semantic code ranking unavailable: {e}")
+            return {}
+
+        scores = {}
+        for hit in hits:
+            file_path = files.get(hit["metadata"]["path"])
+            if file_path is not None:
+                scores[file_path] = max(scores.get(file_path, 0.0), hit["score"])
+        return scores
+
+    def rank(self, query: str) -> list:
+        """
+        File paths of the snapshot, most relevant to `query` first.
+        """
+        entries = self.snapshot.entries
+        query_lower = query.lower()
+        terms = {term.lower() for term in TERM_PATTERN.findall(query)}
+
+        by_mtime = sorted(entries, key=lambda file_path: entries[file_path].mtime_ns)
+        recency = {file_path: RECENCY_SCORE * (i + 1) / len(by_mtime) for i, file_path in enumerate(by_mtime)}
+
+        semantic = self.semantic_scores(query) if query.strip() else {}
+
+        scores = {}
+        modules = {}
+        for file_path, entry in entries.items():
+            relative_path = self._relative(file_path)
+            name = os.path.basename(relative_path)
+            stem = os.path.splitext(name)[0]
+            modules.setdefault(stem.lower(), []).append(file_path)
+
+            score = recency[file_path] + SEMANTIC_SCORE * max(0.0, semantic.get(file_path, 0.0))
+            if relative_path.lower() in query_lower or name.lower() in query_lower:
+                score += MENTION_SCORE
+            if terms:
+                file_terms = {term.lower() for term in TERM_PATTERN.findall(entry.code)}
+                score += TERM_SCORE * len(terms & file_terms)
+            scores[file_path] = score
+
+        # files imported by a relevant file are likely needed to understand or change it
+        boosts = dict.fromkeys(scores, 0.0)
+        for file_path, entry in entries.items():
+            for pattern in IMPORT_PATTERNS:
+                for match in pattern.finditer(entry.code):
+                    module = next(group for group in match.groups() if group)
+                    stem = re.split(r"[./:\\]", module.strip("./"))[-1].lower()
+                    for imported in modules.get(stem, []):
+                        if imported != file_path:
+                            boosts[imported] = max(boosts[imported], IMPORT_SHARE * scores[file_path])
+        for file_path, boost in boosts.items():
+            scores[file_path] += boost
+
+        return sorted(entries, key=lambda file_path: scores[file_path], reverse=True)
+
+    @staticmethod
+    def outline(file_path: str, code: str) -> str:
+        lines = [line.rstrip() for line in code.splitlines() if OUTLINE_PATTERN.match(line)]
+        return f"### {file_path} (outline):\n\n```\n" + "\n".join(lines) + "\n```\n\n---\n\n"
+
+    def pack(self, query: str, budget: int) -> str:
+        """
+        Project code markdown for `query` within `budget` tokens.
+        """
+        entries = self.snapshot.entries
+        if sum(self._tokens(entry) for entry in entries.values()) <= budget:
+            return self.snapshot.markdown
+
+        full, outlines, omitted = [], [], []
+        remaining = budget
+        ranked = self.rank(query)
+        for file_path in ranked:
+            entry = entries[file_path]
+            tokens = self._tokens(entry)
+            if tokens <= remaining:
+                full.append(entry.markdown)
+                remaining -= tokens
+                continue
+
+            outline = self.outline(file_path, entry.code)
+            tokens = count_tokens(outline)
+            if tokens <= remaining:
+                outlines.append(outline)
+                remaining -= tokens
+            else:
+                omitted.append(file_path)
+
+        if omitted:
+            note = "### Other files (not shown):\n\n" + "\n".join(omitted) + "\n\n---\n\n"
+            if count_tokens(note) <= remaining:
+                outlines.append(note)
+        return "".join(full + outlines)
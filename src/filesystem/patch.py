@@ -0,0 +1,313 @@
+import difflib
+import os
+import re
+import tempfile
+
+# How closely a SEARCH block has to resemble the lines it replaces when it doesn't match exactly.
+FUZZY_THRESHOLD = 0.85
+
+FILE_PATTERN = re.compile(r"^File:\s*`([^`]+)`")
+SEARCH_PATTERN = re.compile(r"^<{5,9}\s*SEARCH\s*$")
+DIVIDER_PATTERN = re.compile(r"^={5,9}\s*$")
+REPLACE_PATTERN = re.compile(r"^>{5,9}\s*REPLACE\s*$")
+HUNK_PATTERN = re.compile(r"^@@.*@@")
+
+
+class PatchError(Exception):
+    pass
+
+
+class FileEdit:
+    """
+    The changes to one file in a model response: either its complete new `code`,
+    or a list of (search, replace) `edits` to apply to its current contents.
+    """
+    def __init__(self, file: str, code: str = None, edits: list = None):
+        self.file = file
+        self.code = code
+        self.edits = edits or []
+
+
+def _fenced_code(lines: list) -> str:
+    return "\n".join(line for line in lines if not line.startswith("```"))
+
+
+def _search_replace_edits(lines: list) -> list:
+    edits = []
+    search, replace, section = [], [], None
+    for line in lines:
+        if SEARCH_PATTERN.match(line):
+            search, replace = [], []
+            section = search
+        elif section is search and DIVIDER_PATTERN.match(line):
+            section = replace
+        elif section is replace and REPLACE_PATTERN.match(line):
+            edits.append(("\n".join(search), "\n".join(replace)))
+            section = None
+        elif section is not None:
+            section.append(line)
+        # anything outside a block (fences, stray prose) is ignored
+    return edits
+
+
+def _diff_edits(lines: list) -> list:
+    """
+    Unified diff hunks as (search, replace) edits. Line numbers in the hunk headers
+    are ignored, the hunks are located by their content like SEARCH blocks are.
+    """
+    edits = []
+    search, replace, in_hunk = [], [], False
+    for line in lines:
+        if HUNK_PATTERN.match(line):
+            if in_hunk:
+                edits.append(("\n".join(search), "\n".join(replace)))
+            search, replace, in_hunk = [], [], True
+        elif not in_hunk or line.startswith("```") or line.startswith("\\ No newline"):
+            continue
+        elif line.startswith("-"):
+            search.append(line[1:])
+        elif line.startswith("+"):
+            replace.append(line[1:])
+        else:
+            # models often drop the leading space of context lines, blank ones especially
+            line = line[1:] if line.startswith(" ") else line
+            search.append(line)
+            replace.append(line)
+    if in_hunk:
+        edits.append(("\n".join(search), "\n".join(replace)))
+    return edits
+
+
+def parse_edits(response: str) -> list:
+    """
+    Parse a model response of `File:` sections into `FileEdit`s. A section holds
+    SEARCH/REPLACE blocks, unified diff hunks, or the complete file in a code block.
+    """
+    response = response.strip()
+    if "~~~" in response:
+        response = response.split("~~~", 1)[1]
+        if "~~~" in response:
+            response = response[:response.rfind("~~~")]
+
+    sections = []
+    for line in response.strip().split("\n"):
+        match = FILE_PATTERN.match(line)
+        if match:
+            sections.append((match.group(1).strip(), []))
+        elif sections:
+            sections[-1][1].append(line)
+
+    file_edits = []
+    for file, lines in sections:
+        if any(SEARCH_PATTERN.match(line) for line in lines):
+            file_edits.append(FileEdit(file, edits=_search_replace_edits(lines)))
+        elif any(HUNK_PATTERN.match(line) for line in lines):
+            file_edits.append(FileEdit(file, edits=_diff_edits(lines)))
+        else:
+            code = _fenced_code(lines).strip("\n")
+            if code:
+                file_edits.append(FileEdit(file, code=code))
+    return file_edits
+
+
+def _indent(line: str) -> str:
+    return line[:len(line) - len(line.lstrip())]
+
+
+def _find_lines(content_lines: list, search_lines: list, normalize) -> list:
+    """
+    Starts of every run of lines equal to `search_lines` once both are normalized.
+    """
+    size = len(search_lines)
+    wanted = [normalize(line) for line in search_lines]
+    return [
+        start for start in range(len(content_lines) - size + 1)
+        if all(normalize(content_lines[start + i]) == wanted[i] for i in range(size))
+    ]
+
+
+def _find_fuzzy(content_lines: list, search_lines: list):
+    size = len(search_lines)
+    search_text = "\n".join(line.strip() for line in search_lines)
+    matcher = difflib.SequenceMatcher(autojunk=False)
+    matcher.set_seq2(search_text)
+
+    best_start, best_ratio = None, FUZZY_THRESHOLD
+    for start in range(len(content_lines) - size + 1):
+        matcher.set_seq1("\n".join(line.strip() for line in content_lines[start:start + size]))
+        if matcher.real_quick_ratio() < best_ratio or matcher.quick_ratio() < best_ratio:
+            continue
+        ratio = matcher.ratio()
+        if ratio > best_ratio:
+            best_start, best_ratio = start, ratio
+    return best_start
+
+
+def apply_edit(content: str, search: str, replace: str) -> str:
+    """
+    Replace the whole lines of `content` that `search` matches with `replace`.
+
+    Tries an exact line match, then one ignoring trailing whitespace, then one ignoring
+    indentation (re-indenting `replace` to the matched lines), then the most similar run
+    of lines above `FUZZY_THRESHOLD`. A `search` matching more than one place at the first
+    level that matches it is ambiguous and rejected. An empty `search` appends `replace`.
+    """
+    if not search.strip():
+        if not content:
+            return replace
+        return content + ("" if content.endswith("\n") else "\n") + replace + "\n"
+
+    content_lines = content.split("\n")
+    search_lines = search.strip("\n").split("\n")
+    replace_lines = replace.strip("\n").split("\n") if replace.strip("\n") else []
+
+    start = None
+    for normalize in (lambda line: line, str.rstrip, str.strip):
+        starts = _find_lines(content_lines, search_lines, normalize)
+        if len(starts) > 1:
+            raise PatchError(f"the SEARCH block matches {len(starts)} places in the file, "
+                             "include more lines to tell them apart:\n" + search)
+        if starts:
+            start = starts[0]
+            break
+    if start is None:
+        start = _find_fuzzy(content_lines, search_lines)
+    if start is None:
+        raise PatchError("the SEARCH block does not match the file:\n" + search)
+
+    # re-indent the replacement like the matched lines, mapping each SEARCH indentation to the file's
+    indents = {}
+    for search_line, content_line in zip(search_lines, content_lines[start:start + len(search_lines)]):
+        if search_line.strip() and content_line.strip():
+            indents.setdefault(_indent(search_line), _indent(content_line))
+    if any(search_indent != found_indent for search_indent, found_indent in indents.items()):
+        shifted = []
+        for line in replace_lines:
+            indent = _indent(line)
+            known = max((i for i in indents if indent.startswith(i)), key=len, default=None)
+            if line.strip() and known is not None:
+                line = indents[known] + line[len(known):]
+            shifted.append(line)
+        replace_lines = shifted
+
+    return "\n".join(content_lines[:start] + replace_lines + content_lines[start + len(search_lines):])
+
+
+class PatchSet:
+    """
+    Applies the edits of a model response to the files of a project, all together or not at all.
+
+    `resolve` computes the new contents of every file in memory, so a single edit that
+    doesn't apply rejects the whole response before anything is touched. `write` then
+    stages each file in a temporary file next to it and moves them into place, restoring
+    the originals if any of the moves fails.
+    """
+    def __init__(self, project_path: str):
+        self.project_path = os.path.abspath(project_path)
+        # the code markdown shows paths as <projects dir>/<project>/<file>, models sometimes keep the prefix
+        self.prefixes = {
+            os.path.normpath(project_path).replace("\\", "/") + "/",
+            os.path.relpath(self.project_path).replace("\\", "/") + "/",
+            self.project_path.replace("\\", "/") + "/",
+        }
+
+    def _path(self, file: str) -> str:
+        file = file.strip().replace("\\", "/")
+        normalized = os.path.normpath(file).replace("\\", "/")
+        for prefix in self.prefixes:
+            if normalized.startswith(prefix):
+                file = normalized[len(prefix):]
+                break
+
+        path = os.path.normpath(os.path.join(self.project_path, file.lstrip("/")))
+        if os.path.commonpath([path, self.project_path]) != self.project_path or path == self.project_path:
+            raise PatchError(f"{file} is outside of the project")
+        return path
+
+    def resolve(self, file_edits: list) -> list:
+        """
+        New contents of the files changed by `file_edits`, as {"file", "code"} dicts.
+        Raises `PatchError` if any edit can't be applied.
+        """
+        names = {}  # path -> file name as first given by the model
+        contents = {}
+        for file_edit in file_edits:
+            path = self._path(file_edit.file)
+            names.setdefault(path, file_edit.file)
+            if file_edit.code is not None:
+                contents[path] = file_edit.code
+                continue
+
+            content = contents.get(path)
+            if content is None:
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        content = f.read()
+                except FileNotFoundError:
+                    content = ""
+                except (OSError, UnicodeDecodeError) as e:
+                    raise PatchError(f"cannot read {file_edit.file}: {e}")
+
+            for search, replace in file_edit.edits:
+                try:
+                    content = apply_edit(content, search, replace)
+                except PatchError as e:
+                    raise PatchError(f"{file_edit.file}: {e}")
+            contents[path] = content
+
+        return [{"file": names[path], "code": code} for path, code in contents.items()]
+
+    def write(self, code_set: list) -> str:
+        """
+        Write every file of `code_set` or, on failure, none of them. Returns the
+        directory of the last file written.
+        """
+        staged = []  # (temporary path, path)
+        try:
+            for file in code_set:
+                path = self._path(file["file"])
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".devika-")
+                staged.append((temp_path, path))
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(file["code"])
+        except OSError as e:
+            for temp_path, _ in staged:
+                self._remove(temp_path)
+            raise PatchError(f"cannot write {file['file']}: {e}")
+
+        originals = {}
+        for _, path in staged:
+            try:
+                with open(path, "rb") as f:
+                    originals[path] = f.read()
+            except FileNotFoundError:
+                originals[path] = None
+
+        replaced = []
+        try:
+            for temp_path, path in staged:
+                # mkstemp creates files readable by the owner only
+                mode = os.stat(path).st_mode & 0o7777 if originals[path] is not None else 0o644
+                os.chmod(temp_path, mode)
+                os.replace(temp_path, path)
+                replaced.append(path)
+        except OSError as e:
+            for replaced_path in replaced:
+                if originals[replaced_path] is None:
+                    self._remove(replaced_path)
+                else:
+                    with open(replaced_path, "wb") as f:
+                        f.write(originals[replaced_path])
+            for temp_path, _ in staged:
+                self._remove(temp_path)
+            raise PatchError(f"cannot write {path}: {e}")
+
+        return os.path.dirname(staged[-1][1]) if staged else None
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
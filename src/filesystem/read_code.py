@@ -1,6 +1,9 @@
 import os
 
 from src.config import Config
+from src.llm import LLM
+from src.filesystem.snapshot import ProjectSnapshot
+from src.filesystem.context_packer import ContextPacker
 
 """
 TODO: Replace this with `code2prompt` - https://github.com/mufeedvh/code2prompt
@@ -11,25 +14,22 @@ class ReadCode:
         config = Config()
         project_path = config.get_projects_dir()
         self.directory_path = os.path.join(project_path, project_name.lower().replace(" ", "-"))
+        self.snapshot = ProjectSnapshot(self.directory_path)
 
     def read_directory(self):
-        files_list = []
-        for root, _dirs, files in os.walk(self.directory_path):
-            for file in files:
-                try:
-                    file_path = os.path.join(root, file)
-                    with open(file_path, 'r') as file_content:
-                        files_list.append({"filename": file_path, "code": file_content.read()})
-                except:
-                    pass
-
-        return files_list
+        self.snapshot.refresh()
+        return self.snapshot.files()
 
     def code_set_to_markdown(self):
-        code_set = self.read_directory()
-        markdown = ""
-        for code in code_set:
-            markdown += f"### {code['filename']}:\n\n"
-            markdown += f"```\n{code['code']}\n```\n\n"
-            markdown += "---\n\n"
-        return markdown
+        self.snapshot.refresh()
+        return self.snapshot.markdown
+
+    def code_set_to_context(self, query: str, base_model: str = None):
+        """
+        Project code markdown packed into the code token budget of `base_model`,
+        keeping the files most relevant to `query`.
+        """
+        # budgets are keyed by API model id, agents know the model by its display name
+        model_id = LLM().model_enum(base_model)[1] if base_model else None
+        self.snapshot.refresh()
+        return ContextPacker(self.snapshot).pack(query, Config().get_code_token_budget(model_id))
@@ -0,0 +1,204 @@
+import hashlib
+import os
+import re
+import threading
+
+from src.shared import Singleton
+
+# Never part of a code snapshot, whatever the project's .gitignore says.
+ALWAYS_IGNORED = {".git", "node_modules", "__pycache__", ".venv", "venv", ".mypy_cache", ".pytest_cache", ".tox"}
+# Larger files are almost always generated or data, and would not fit in a prompt anyway.
+MAX_FILE_SIZE = 1024 * 1024
+BINARY_SNIFF_SIZE = 8192
+
+
+class GitIgnore:
+    """
+    The rules of one .gitignore file, matched against paths relative to its directory.
+    """
+    def __init__(self, lines: list):
+        self.rules = []
+        for line in lines:
+            line = line.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.strip("/") if dir_only else line
+            anchored = "/" in line
+            self.rules.append((self._compile(line.lstrip("/"), anchored), negate, dir_only))
+
+    @staticmethod
+    def _compile(pattern: str, anchored: bool):
+        regex = ""
+        i = 0
+        while i < len(pattern):
+            if pattern.startswith("**/", i):
+                regex += "(?:.*/)?"
+                i += 3
+            elif pattern.startswith("**", i):
+                regex += ".*"
+                i += 2
+            elif pattern[i] == "*":
+                regex += "[^/]*"
+                i += 1
+            elif pattern[i] == "?":
+                regex += "[^/]"
+                i += 1
+            elif pattern[i] == "[" and "]" in pattern[i + 1:]:
+                end = pattern.index("]", i + 1)
+                regex += "[" + pattern[i + 1:end].replace("!", "^", 1) + "]"
+                i = end + 1
+            else:
+                regex += re.escape(pattern[i])
+                i += 1
+        return re.compile(("" if anchored else "(?:.*/)?") + regex + "$")
+
+    def match(self, relative_path: str, is_dir: bool):
+        """
+        True if the path is ignored, False if a negated rule re-includes it, None if no rule applies.
+        """
+        ignored = None
+        for regex, negate, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(relative_path):
+                ignored = not negate
+        return ignored
+
+
+class FileEntry:
+    def __init__(self, mtime_ns: int, size: int, digest: str, code: str, markdown: str):
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.digest = digest
+        self.code = code
+        self.markdown = markdown
+        self.tokens = None  # token count of `markdown`, filled in by the context packer
+
+
+class ProjectSnapshot(Singleton):
+    """
+    Cached contents of the text files of a project directory.
+
+    `refresh` only stats the tree and re-reads files whose mtime or size changed;
+    binaries, oversized files and ignored paths (`ALWAYS_IGNORED` and .gitignore
+    rules) are skipped. The markdown of every file is rendered once and the whole
+    project markdown is rebuilt with a join only when something changed.
+    """
+    @classmethod
+    def _key(cls, directory_path: str) -> tuple:
+        return (directory_path,)
+
+    def _setup(self, directory_path: str):
+        self.directory_path = directory_path
+        self.entries = {}  # file path -> FileEntry, for text files only
+        self.skipped = {}  # file path -> (mtime_ns, size) of binary or unreadable files
+        self.markdown = ""
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _ignored(matchers: list, relative_path: str, is_dir: bool) -> bool:
+        ignored = False
+        for base, gitignore in matchers:
+            result = gitignore.match(relative_path[len(base):], is_dir)
+            if result is not None:
+                ignored = result
+        return ignored
+
+    def _walk(self, path: str, relative_dir: str, matchers: list, found: list):
+        gitignore_path = os.path.join(path, ".gitignore")
+        if os.path.isfile(gitignore_path):
+            try:
+                with open(gitignore_path, "r", encoding="utf-8", errors="ignore") as f:
+                    matchers = matchers + [(relative_dir, GitIgnore(f.readlines()))]
+            except OSError:
+                pass
+
+        try:
+            entries = sorted(os.scandir(path), key=lambda entry: entry.name)
+        except OSError:
+            return
+
+        for entry in entries:
+            relative_path = relative_dir + entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name in ALWAYS_IGNORED or self._ignored(matchers, relative_path, True):
+                    continue
+                self._walk(entry.path, relative_path + "/", matchers, found)
+            elif entry.is_file(follow_symlinks=False):
+                if not self._ignored(matchers, relative_path, False):
+                    found.append(entry)
+
+    @staticmethod
+    def _read_text(file_path: str):
+        with open(file_path, "rb") as f:
+            data = f.read(MAX_FILE_SIZE + 1)
+        if len(data) > MAX_FILE_SIZE or b"\0" in data[:BINARY_SNIFF_SIZE]:
+            return None, None
+        try:
+            return data.decode("utf-8"), hashlib.sha256(data).hexdigest()
+        except UnicodeDecodeError:
+            return None, None
+
+    def refresh(self) -> bool:
+        """
+        Bring the snapshot up to date with the directory. Returns True if anything changed.
+        """
+        with self.lock:
+            found = []
+            if os.path.isdir(self.directory_path):
+                self._walk(self.directory_path, "", [], found)
+
+            changed = False
+            entries = {}
+            skipped = {}
+            for dir_entry in found:
+                # same format as the os.walk paths prompts have always used: <projects dir>/<project>/<file>
+                file_path = dir_entry.path
+                try:
+                    stat = dir_entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                signature = (stat.st_mtime_ns, stat.st_size)
+
+                entry = self.entries.get(file_path)
+                if entry and (entry.mtime_ns, entry.size) == signature:
+                    entries[file_path] = entry
+                    continue
+                if self.skipped.get(file_path) == signature:
+                    skipped[file_path] = signature
+                    continue
+
+                try:
+                    code, digest = self._read_text(dir_entry.path)
+                except OSError:
+                    code, digest = None, None
+                if code is None:
+                    skipped[file_path] = signature
+                    changed = changed or file_path in self.entries
+                    continue
+
+                if entry and entry.digest == digest:
+                    # touched but not modified, the rendered markdown is still valid
+                    entry.mtime_ns, entry.size = signature
+                    entries[file_path] = entry
+                    continue
+
+                markdown = f"### {file_path}:\n\n```\n{code}\n```\n\n---\n\n"
+                entries[file_path] = FileEntry(stat.st_mtime_ns, stat.st_size, digest, code, markdown)
+                changed = True
+
+            if entries.keys() != self.entries.keys():
+                changed = True
+            self.entries = entries
+            self.skipped = skipped
+
+            if changed:
+                self.markdown = "".join(entry.markdown for entry in entries.values())
+            return changed
+
+    def files(self) -> list:
+        return [{"filename": file_path, "code": entry.code} for file_path, entry in self.entries.items()]
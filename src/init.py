@@ -16,6 +16,9 @@ def init_devika():
     pdfs_dir = config.get_pdfs_dir()
     projects_dir = config.get_projects_dir()
     logs_dir = config.get_logs_dir()
+    llm_cache_dir = config.get_llm_cache_dir()
+    vectors_dir = config.get_vectors_dir()
+    envs_dir = config.get_envs_dir()
 
     logger.info("Initializing Prerequisites Jobs...")
     os.makedirs(os.path.dirname(sqlite_db), exist_ok=True)
@@ -23,10 +26,19 @@ def init_devika():
     os.makedirs(pdfs_dir, exist_ok=True)
     os.makedirs(projects_dir, exist_ok=True)
     os.makedirs(logs_dir, exist_ok=True)
+    os.makedirs(llm_cache_dir, exist_ok=True)
+    os.makedirs(vectors_dir, exist_ok=True)
+    os.makedirs(envs_dir, exist_ok=True)
+
+    from src.database import Database
+
+    logger.info("Initializing SQLite storage...")
+    Database()
 
     from src.bert.sentence import SentenceBert
 
     logger.info("Loading sentence-transformer BERT models...")
     prompt = "Light-weight keyword extraction exercise for BERT model loading.".strip()
+    # the model stays loaded in the shared KeywordModel, so this also warms it up
     SentenceBert(prompt).extract_keywords()
     logger.info("BERT model loaded successfully.")
@@ -1 +1,4 @@
-from .llm import LLM
\ No newline at end of file
+from .llm import LLM, InferenceTimeoutError
+from .token_usage import TokenUsageTracker
+from .cache import ResponseCache
+from .stub_client import Stub
\ No newline at end of file
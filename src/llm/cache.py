@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from src.config import Config
+from src.shared import Singleton
+
+
+class ResponseCache(Singleton):
+    """
+    Opt-in, content-addressed cache of model responses, keyed by the model id and
+    the rendered prompt. Entries are JSON files under the cache directory and the
+    least recently used ones are evicted once the directory exceeds its size limit.
+    """
+    def _setup(self):
+        config = Config()
+        self.cache_dir = config.get_llm_cache_dir()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.entries = None  # key -> size in bytes, least recently used first
+        self.size = 0
+
+    def is_enabled(self, agent: str = None) -> bool:
+        config = Config()
+        if not config.get_llm_cache_enabled():
+            return False
+        return agent is None or agent in config.get_llm_cache_agents()
+
+    @staticmethod
+    def make_key(model_id: str, prompt: str) -> str:
+        return hashlib.sha256(f"{model_id}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _load_index(self):
+        if self.entries is not None:
+            return
+
+        entries = []
+        if os.path.isdir(self.cache_dir):
+            for root, _dirs, files in os.walk(self.cache_dir):
+                for file in files:
+                    if file.endswith(".json"):
+                        stat = os.stat(os.path.join(root, file))
+                        entries.append((stat.st_mtime, file[:-len(".json")], stat.st_size))
+
+        self.entries = OrderedDict((key, size) for _mtime, key, size in sorted(entries))
+        self.size = sum(self.entries.values())
+
+    def get(self, model_id: str, prompt: str):
+        key = self.make_key(model_id, prompt)
+        with self.lock:
+            self._load_index()
+            if key not in self.entries:
+                self.misses += 1
+                return None
+
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    response = json.load(f)["response"]
+                os.utime(self._path(key))
+            except (OSError, ValueError, KeyError):
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return response
+
+    def put(self, model_id: str, prompt: str, response: str):
+        key = self.make_key(model_id, prompt)
+        path = self._path(key)
+        data = json.dumps({"model_id": model_id, "response": response})
+
+        with self.lock:
+            self._load_index()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(data)
+
+            size = os.path.getsize(path)
+            self.size += size - self.entries.get(key, 0)
+            self.entries[key] = size
+            self.entries.move_to_end(key)
+            self._evict()
+
+    def discard(self, model_id: str, prompt: str):
+        with self.lock:
+            self._load_index()
+            self._remove(self.make_key(model_id, prompt))
+
+    def _remove(self, key: str):
+        self.size -= self.entries.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        max_size = Config().get_llm_cache_max_size_mb() * 1024 * 1024
+        while self.size > max_size and self.entries:
+            self._remove(next(iter(self.entries)))
+
+    def stats(self) -> dict:
+        with self.lock:
+            self._load_index()
+            return {
+                "enabled": Config().get_llm_cache_enabled(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self.entries),
+                "size_bytes": self.size,
+            }
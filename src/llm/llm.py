@@ -1,4 +1,8 @@
+import concurrent.futures
+import queue
 import sys
+import threading
+import time
 
 import tiktoken
 from typing import List, Tuple
@@ -11,8 +15,9 @@ from .gemini_client import Gemini
 from .mistral_client import MistralAi
 from .groq_client import Groq
 from .lm_studio_client import LMStudio
-
-from src.state import AgentState
+from .stub_client import Stub
+from .token_usage import TokenUsageTracker
+from .cache import ResponseCache
 
 from src.config import Config
 from src.logger import Logger
@@ -21,13 +26,39 @@ TIKTOKEN_ENC = tiktoken.get_encoding("cl100k_base")
 
 ollama = Ollama()
 logger = Logger()
-agentState = AgentState()
 config = Config()
 
+PROVIDER_CLASSES = {
+    "CLAUDE": Claude,
+    "OPENAI": OpenAi,
+    "GOOGLE": Gemini,
+    "MISTRAL": MistralAi,
+    "GROQ": Groq,
+    "LM_STUDIO": LMStudio,
+    "STUB": Stub,
+}
+
+# Provider clients are built on first use and shared by every LLM instance so
+# their HTTP connection pools stay warm across calls and agents.
+_providers = {"OLLAMA": ollama}
+_providers_lock = threading.Lock()
+
+# Shared by every inference so a call doesn't pay for spinning up (and joining) its own pool.
+INFERENCE_EXECUTOR = concurrent.futures.ThreadPoolExecutor(thread_name_prefix="inference")
+PROGRESS_INTERVAL = 1  # seconds between "inference" time events
+SLOW_INFERENCE_WARNING = 5  # seconds before warning the user
+STREAM_END = object()
+
+
+class InferenceTimeoutError(Exception):
+    pass
+
 
 class LLM:
-    def __init__(self, model_id: str = None):
+    def __init__(self, model_id: str = None, agent: str = None):
         self.model_id = model_id
+        self.agent = agent
+        self.last_prompt = None
         self.log_prompts = config.get_logging_prompts()
         self.timeout_inference = config.get_timeout_inference()
         self.models = {
@@ -67,6 +98,8 @@ class LLM:
             ],
             
         }
+        if config.get_stub_llm_enabled():
+            self.models["STUB"] = [("Stub", "stub")]
         if ollama.client:
             self.models["OLLAMA"] = [(model["name"], model["name"]) for model in ollama.models]
 
@@ -81,76 +114,155 @@ class LLM:
         }
         return model_dict.get(model_name, (None, None))
 
+    @staticmethod
+    def get_provider(model_enum: str):
+        provider = _providers.get(model_enum)
+        if provider is None:
+            with _providers_lock:
+                provider = _providers.get(model_enum)
+                if provider is None:
+                    provider = PROVIDER_CLASSES[model_enum]()
+                    _providers[model_enum] = provider
+        return provider
+
+    @staticmethod
+    def reset_providers():
+        """
+        Drop the cached API clients so they are rebuilt with the current settings.
+        """
+        with _providers_lock:
+            _providers.clear()
+            _providers["OLLAMA"] = ollama
+
     @staticmethod
     def update_global_token_usage(string: str, project_name: str):
         token_usage = len(TIKTOKEN_ENC.encode(string))
-        agentState.update_token_usage(project_name, token_usage)
-
-        total = agentState.get_latest_token_usage(project_name) + token_usage
+        total = TokenUsageTracker().add(project_name, token_usage)
         emit_agent("tokens", {"token_usage": total})
 
-    def inference(self, prompt: str, project_name: str) -> str:
+    @staticmethod
+    def pump_stream(model, model_name: str, prompt: str, chunks: queue.Queue, cancelled: threading.Event):
+        """
+        Runs on `INFERENCE_EXECUTOR`: push the provider's chunks onto `chunks`, then
+        `STREAM_END` or the raised exception. Providers without `stream` push one chunk.
+        """
+        try:
+            if hasattr(model, "stream"):
+                for chunk in model.stream(model_name, prompt):
+                    if cancelled.is_set():
+                        return
+                    chunks.put(chunk)
+            else:
+                chunks.put(model.inference(model_name, prompt))
+            chunks.put(STREAM_END)
+        except Exception as e:
+            chunks.put(e)
+
+    def wait_for_chunks(self, chunks: queue.Queue, start_time: float):
+        """
+        Yield chunks the moment they arrive. The inference timeout applies to the wait
+        for each chunk, and the elapsed time is emitted at most every `PROGRESS_INTERVAL`.
+        """
+        warned = False
+        last_chunk_time = time.time()
+        while True:
+            remaining = self.timeout_inference - (time.time() - last_chunk_time)
+            if remaining <= 0:
+                raise InferenceTimeoutError(f"No response from the model for {self.timeout_inference} seconds")
+
+            try:
+                chunk = chunks.get(timeout=min(PROGRESS_INTERVAL, remaining))
+            except queue.Empty:
+                elapsed_time = time.time() - start_time
+                emit_agent("inference", {"type": "time", "elapsed_time": format(elapsed_time, ".2f")}, False)
+                if not warned and elapsed_time >= SLOW_INFERENCE_WARNING:
+                    emit_agent("inference", {"type": "warning", "message": "Inference is taking longer than expected"})
+                    warned = True
+                continue
+
+            if chunk is STREAM_END:
+                return
+            if isinstance(chunk, Exception):
+                raise chunk
+
+            last_chunk_time = time.time()
+            yield chunk
+
+    def inference_stream(self, prompt: str, project_name: str):
+        """
+        Yield the model's response as it is generated, forwarding every chunk to the
+        UI as an `inference` event of type `stream`, between `stream_start` and `stream_end`. Responses are served from and
+        saved to the `ResponseCache` when it is enabled for this agent.
+        """
+        self.last_prompt = prompt
+        cache = ResponseCache()
+        use_cache = cache.is_enabled(self.agent)
+        if use_cache:
+            cached_response = cache.get(self.model_id, prompt)
+            if cached_response is not None:
+                emit_agent("inference", {"type": "stream_start"}, False)
+                emit_agent("inference", {"type": "stream", "chunk": cached_response}, False)
+                emit_agent("inference", {"type": "stream_end"}, False)
+                yield cached_response
+                return
+
         self.update_global_token_usage(prompt, project_name)
 
         model_enum, model_name = self.model_enum(self.model_id)
-                
+
         print(f"Model: {self.model_id}, Enum: {model_enum}")
         if model_enum is None:
             raise ValueError(f"Model {self.model_id} not supported")
 
-        model_mapping = {
-            "OLLAMA": ollama,
-            "CLAUDE": Claude(),
-            "OPENAI": OpenAi(),
-            "GOOGLE": Gemini(),
-            "MISTRAL": MistralAi(),
-            "GROQ": Groq(),
-            "LM_STUDIO": LMStudio()
-        }
+        try:
+            model = self.get_provider(model_enum)
+        except KeyError:
+            raise ValueError(f"Model {model_enum} not supported")
 
+        start_time = time.time()
+        chunks = queue.Queue()
+        cancelled = threading.Event()
+        INFERENCE_EXECUTOR.submit(self.pump_stream, model, model_name, prompt, chunks, cancelled)
+
+        response = []
+        emit_agent("inference", {"type": "stream_start"}, False)
         try:
-            import concurrent.futures
-            import time
+            for chunk in self.wait_for_chunks(chunks, start_time):
+                response.append(chunk)
+                emit_agent("inference", {"type": "stream", "chunk": chunk}, False)
+                yield chunk
 
-            start_time = time.time()
-            model = model_mapping[model_enum]
-            
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(model.inference, model_name, prompt)
-                try:
-                    while True:
-                        elapsed_time = time.time() - start_time
-                        elapsed_seconds = format(elapsed_time, ".2f")
-                        emit_agent("inference", {"type": "time", "elapsed_time": elapsed_seconds})
-                        if int(elapsed_time) == 5:
-                            emit_agent("inference", {"type": "warning", "message": "Inference is taking longer than expected"})
-                        if elapsed_time > self.timeout_inference:
-                            raise concurrent.futures.TimeoutError
-                        if future.done():
-                            break
-                        time.sleep(0.5)
-
-                    response = future.result(timeout=self.timeout_inference).strip()
-
-                except concurrent.futures.TimeoutError:
-                    logger.error(f"Inference failed. took too long. Model: {model_enum}, Model ID: {self.model_id}")
-                    emit_agent("inference", {"type": "error", "message": "Inference took too long. Please try again."})
-                    response = False
-                    sys.exit()
-                
-                except Exception as e:
-                    logger.error(str(e))
-                    response = False
-                    emit_agent("inference", {"type": "error", "message": str(e)})
-                    sys.exit()
+        except InferenceTimeoutError:
+            logger.error(f"Inference failed. took too long. Model: {model_enum}, Model ID: {self.model_id}")
+            emit_agent("inference", {"type": "error", "message": "Inference took too long. Please try again."})
+            raise
 
+        except Exception as e:
+            logger.error(str(e))
+            emit_agent("inference", {"type": "error", "message": str(e)})
+            sys.exit()
 
-        except KeyError:
-            raise ValueError(f"Model {model_enum} not supported")
+        finally:
+            cancelled.set()
+            emit_agent("inference", {"type": "stream_end"}, False)
+
+        response = "".join(response)
 
         if self.log_prompts:
             logger.debug(f"Response ({model}): --> {response}")
 
         self.update_global_token_usage(response, project_name)
 
-        return response
+        if use_cache:
+            cache.put(self.model_id, prompt, response)
+
+    def discard_cached_response(self):
+        """
+        Drop the cached response to the last prompt, e.g. when it failed validation,
+        so a retry asks the model again.
+        """
+        if self.last_prompt is not None and ResponseCache().is_enabled(self.agent):
+            ResponseCache().discard(self.model_id, self.last_prompt)
+
+    def inference(self, prompt: str, project_name: str) -> str:
+        return "".join(self.inference_stream(prompt, project_name)).strip()
@@ -23,3 +23,14 @@ class Ollama:
             options={"temperature": 0}
         )
         return response['response']
+
+    def stream(self, model_id: str, prompt: str):
+        chunks = self.client.generate(
+            model=model_id,
+            prompt=prompt.strip(),
+            options={"temperature": 0},
+            stream=True
+        )
+        for chunk in chunks:
+            if chunk['response']:
+                yield chunk['response']
@@ -22,3 +22,19 @@ class OpenAi:
             temperature=0
         )
         return chat_completion.choices[0].message.content
+
+    def stream(self, model_id: str, prompt: str):
+        chunks = self.client.chat.completions.create(
+            messages=[
+                {
+                    "role": "user",
+                    "content": prompt.strip(),
+                }
+            ],
+            model=model_id,
+            temperature=0,
+            stream=True
+        )
+        for chunk in chunks:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
@@ -0,0 +1,51 @@
+import threading
+import time
+
+from src.config import Config
+
+
+class Stub:
+    """
+    Offline provider that streams canned responses, for tests and benchmarks.
+
+    Listed as the "Stub" model when `STUB_LLM.ENABLED` is true. What it answers is set
+    with `respond_with`, and every response is streamed in `CHUNK_SIZE` character chunks
+    `DELAY_MS` apart, so streaming consumers can be exercised without a real model.
+    """
+    def __init__(self):
+        config = Config()
+        self.chunk_size = max(1, config.get_stub_llm_chunk_size())
+        self.delay = config.get_stub_llm_delay_ms() / 1000
+        self.lock = threading.Lock()
+        self.responses = []
+        self.responder = None
+
+    def respond_with(self, responses):
+        """
+        `responses` is a string answered to every prompt, a list of strings answered
+        in order (the last one repeats), or a callable taking the prompt.
+        """
+        with self.lock:
+            if callable(responses):
+                self.responder, self.responses = responses, []
+            else:
+                self.responder = None
+                self.responses = [responses] if isinstance(responses, str) else list(responses)
+
+    def _response(self, prompt: str) -> str:
+        with self.lock:
+            if self.responder is not None:
+                return self.responder(prompt)
+            if len(self.responses) > 1:
+                return self.responses.pop(0)
+            return self.responses[0] if self.responses else ""
+
+    def inference(self, model_id: str, prompt: str) -> str:
+        return "".join(self.stream(model_id, prompt))
+
+    def stream(self, model_id: str, prompt: str):
+        response = self._response(prompt)
+        for start in range(0, len(response), self.chunk_size):
+            if self.delay:
+                time.sleep(self.delay)
+            yield response[start:start + self.chunk_size]
@@ -0,0 +1,68 @@
+import threading
+
+from src.shared import Singleton
+from src.state import AgentState
+
+# Seconds to hold token counts in memory before writing them to the agent state.
+FLUSH_INTERVAL = 5
+
+
+class TokenUsageTracker(Singleton):
+    """
+    In-memory, per-project token counter shared by every `LLM` instance.
+
+    Counts are added in memory and written to the agent state in batches, either
+    `FLUSH_INTERVAL` seconds after the first unsaved count or when `flush` is called
+    at the end of an agent step.
+    """
+    def _setup(self):
+        self.agent_state = AgentState()
+        self.totals = {}
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.flush_timer = None
+
+    def _load_total(self, project: str) -> int:
+        if project not in self.totals:
+            self.totals[project] = self.agent_state.get_latest_token_usage(project)
+        return self.totals[project]
+
+    def add(self, project: str, token_usage: int) -> int:
+        with self.lock:
+            total = self._load_total(project) + token_usage
+            self.totals[project] = total
+            self.pending[project] = self.pending.get(project, 0) + token_usage
+
+            if self.flush_timer is None:
+                self.flush_timer = threading.Timer(FLUSH_INTERVAL, self.flush)
+                self.flush_timer.daemon = True
+                self.flush_timer.start()
+        return total
+
+    def get(self, project: str) -> int:
+        with self.lock:
+            return self._load_total(project)
+
+    def flush(self, project: str = None):
+        with self.lock:
+            if project is None:
+                pending, self.pending = self.pending, {}
+            else:
+                pending = {project: self.pending.pop(project, 0)}
+
+            if not self.pending and self.flush_timer is not None:
+                self.flush_timer.cancel()
+                self.flush_timer = None
+
+        for pending_project, token_usage in pending.items():
+            if token_usage:
+                self.agent_state.update_token_usage(pending_project, token_usage)
+
+    def evict(self, project: str):
+        """
+        Forget the counts of a deleted project, unsaved ones included, so a new project
+        with the same name starts from zero.
+        """
+        with self.lock:
+            self.totals.pop(project, None)
+            self.pending.pop(project, None)
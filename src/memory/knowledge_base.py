@@ -1,23 +1,82 @@
+import re
+import threading
 from typing import Optional
-from sqlmodel import Field, Session, SQLModel, create_engine
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Field, Session, SQLModel, select
 
-from src.config import Config
+from src.database import Database
+from src.logger import Logger
 
 """
-TODO: The tag check should be a BM25 search, it's just a simple equality check now.
+Knowledge is indexed in an external-content SQLite FTS5 table kept in sync by triggers,
+so lookups are ranked with BM25 instead of only matching the exact tag.
 """
 
+FTS_SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS knowledge_fts USING fts5(
+        tag, contents, content='knowledge', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS knowledge_fts_insert AFTER INSERT ON knowledge BEGIN
+        INSERT INTO knowledge_fts(rowid, tag, contents) VALUES (new.id, new.tag, new.contents);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS knowledge_fts_delete AFTER DELETE ON knowledge BEGIN
+        INSERT INTO knowledge_fts(knowledge_fts, rowid, tag, contents) VALUES ('delete', old.id, old.tag, old.contents);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS knowledge_fts_update AFTER UPDATE ON knowledge BEGIN
+        INSERT INTO knowledge_fts(knowledge_fts, rowid, tag, contents) VALUES ('delete', old.id, old.tag, old.contents);
+        INSERT INTO knowledge_fts(rowid, tag, contents) VALUES (new.id, new.tag, new.contents);
+    END""",
+]
+
+# BM25 column weights: a term in the tag (the research query) counts more than one in the contents.
+TAG_WEIGHT = 4.0
+CONTENTS_WEIGHT = 1.0
+# Tags ranked for an exact term set match before giving up and searching the web.
+EQUIVALENT_TAG_CANDIDATES = 20
+
+
 class Knowledge(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    tag: str
+    tag: str = Field(index=True)
     contents: str
 
 class KnowledgeBase:
+    _fts_available = None
+    _fts_lock = threading.Lock()
+
     def __init__(self):
-        config = Config()
-        sqlite_path = config.get_sqlite_db()
-        self.engine = create_engine(f"sqlite:///{sqlite_path}")
-        SQLModel.metadata.create_all(self.engine)
+        database = Database()
+        database.create_tables(Knowledge)
+        self.engine = database.engine
+
+        if KnowledgeBase._fts_available is None:
+            with KnowledgeBase._fts_lock:
+                if KnowledgeBase._fts_available is None:
+                    KnowledgeBase._fts_available = self.create_fts_index()
+
+    def create_fts_index(self) -> bool:
+        """
+        Create the FTS5 index and its sync triggers, and index existing rows when the
+        index is new. Returns False when SQLite was built without FTS5.
+        """
+        try:
+            with self.engine.begin() as connection:
+                exists = connection.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'knowledge_fts'")
+                ).first()
+                for statement in FTS_SCHEMA:
+                    connection.execute(text(statement))
+                if not exists:
+                    connection.execute(text("INSERT INTO knowledge_fts(knowledge_fts) VALUES ('rebuild')"))
+            return True
+        except OperationalError as e:
+            Logger().warning(f"Full-text search unavailable, falling back to exact tag lookups: {e.orig}")
+            return False
+
+    @staticmethod
+    def _match_terms(query: str) -> list:
+        return [f'"{term}"' for term in re.findall(r"\w+", query.lower())]
 
     def add_knowledge(self, tag: str, contents: str):
         knowledge = Knowledge(tag=tag, contents=contents)
@@ -25,9 +84,45 @@ class KnowledgeBase:
             session.add(knowledge)
             session.commit()
 
+    def search(self, query: str, limit: int = 5) -> list:
+        """
+        Top `limit` knowledge entries for `query`, best BM25 score first.
+        """
+        terms = self._match_terms(query)
+        if not terms or not KnowledgeBase._fts_available:
+            return []
+        return self._ranked(" OR ".join(terms), limit)
+
+    def _ranked(self, match: str, limit: int) -> list:
+        with self.engine.connect() as connection:
+            rows = connection.execute(
+                text(
+                    "SELECT knowledge.id, knowledge.tag, knowledge.contents "
+                    "FROM knowledge_fts JOIN knowledge ON knowledge.id = knowledge_fts.rowid "
+                    "WHERE knowledge_fts MATCH :match "
+                    "ORDER BY bm25(knowledge_fts, :tag_weight, :contents_weight) LIMIT :limit"
+                ),
+                {"match": match, "tag_weight": TAG_WEIGHT, "contents_weight": CONTENTS_WEIGHT, "limit": limit}
+            ).all()
+        return [Knowledge(id=row.id, tag=row.tag, contents=row.contents) for row in rows]
+
     def get_knowledge(self, tag: str) -> str:
+        """
+        Contents stored for `tag`, or for the best ranked entry whose tag has exactly the
+        same terms (e.g. the same research query with different case, order or punctuation).
+        A tag that only contains the terms among others is a different question and doesn't match.
+        """
         with Session(self.engine) as session:
-            knowledge = session.query(Knowledge).filter(Knowledge.tag == tag).first()
+            knowledge = session.exec(select(Knowledge).where(Knowledge.tag == tag)).first()
             if knowledge:
                 return knowledge.contents
-            return None
\ No newline at end of file
+
+        terms = self._match_terms(tag)
+        if not terms or not KnowledgeBase._fts_available:
+            return None
+
+        wanted = set(terms)
+        for knowledge in self._ranked(f"tag : ({' AND '.join(terms)})", EQUIVALENT_TAG_CANDIDATES):
+            if set(self._match_terms(knowledge.tag)) == wanted:
+                return knowledge.contents
+        return None
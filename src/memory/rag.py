@@ -1,3 +1,358 @@
 """
 Vector Search for Code Docs + Docs Loading
-"""
\ No newline at end of file
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+
+from src.bert.sentence import KeywordModel
+from src.config import Config
+from src.logger import Logger
+from src.shared import Singleton
+
+# Rows scored per matrix product, so a search never pages the whole matrix in at once.
+SEARCH_BATCH = 65536
+INITIAL_CAPACITY = 1024
+# Removed rows stay in the files until there are at least this many and they are half of them.
+COMPACT_MIN_REMOVED = 1024
+
+
+def embed(texts: list) -> np.ndarray:
+    """
+    L2-normalized float32 embeddings of `texts`, from the shared KeyBERT sentence-transformer.
+    """
+    embeddings = np.asarray(KeywordModel().embed(texts), dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _hashable(value):
+    # JSON turns tuples into lists, keys and metadata values are compared as tuples
+    return tuple(_hashable(v) for v in value) if isinstance(value, (list, tuple)) else value
+
+
+class VectorMemory(Singleton):
+    """
+    Persistent store of text chunks and their embeddings, one per collection
+    (e.g. "research"), searched by cosine similarity.
+
+    Embeddings are rows of a memory-mapped float32 matrix under
+    `STORAGE.VECTORS_DIR/<collection>/vectors.f32`, grown by doubling, and the chunk
+    texts and metadata are appended to `items.jsonl` next to it. Inserts only append,
+    so nothing is re-embedded when the process restarts.
+
+    Chunks can be stored under a `key` (e.g. a project file), which `replace` and
+    `remove` work on; a chunk is a duplicate if its key already holds the same text.
+    Removals are appended to `items.jsonl` as tombstones, and the files are compacted
+    once enough rows are removed.
+    """
+    @classmethod
+    def _key(cls, collection: str) -> tuple:
+        return (collection,)
+
+    def _setup(self, collection: str):
+        self.path = os.path.join(Config().get_vectors_dir(), collection)
+        self.vectors_path = os.path.join(self.path, "vectors.f32")
+        self.items_path = os.path.join(self.path, "items.jsonl")
+        self.meta_path = os.path.join(self.path, "meta.json")
+        self.lock = threading.RLock()
+        self._reset()
+
+        # finish or undo a compaction that was interrupted
+        compacted_path, old_path = f"{self.path}.compact", f"{self.path}.old"
+        if not os.path.isdir(self.path) and os.path.isdir(compacted_path):
+            os.rename(compacted_path, self.path)
+        shutil.rmtree(compacted_path, ignore_errors=True)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+        if os.path.exists(self.meta_path):
+            self._load()
+
+    def _reset(self):
+        self.dim = None
+        self.count = 0  # rows stored, removed ones included
+        self.removed = 0
+        self.vectors = None
+        self.alive = np.zeros(0, dtype=bool)
+        self.items = []  # None for removed rows
+        self.rows = {}  # key -> {digest: row}
+        self.index = {}  # (metadata field, value) -> rows with that value, removed ones included
+
+    def _load(self):
+        with open(self.meta_path, "r") as f:
+            meta = json.load(f)
+        self.dim = meta["dim"]
+        capacity = os.path.getsize(self.vectors_path) // (4 * self.dim)
+
+        # vectors are flushed before their items are appended and the count is saved last,
+        # so after a crash every complete item line has its vector but the count may lag
+        items, removed_rows, valid_size = [], [], 0
+        with open(self.items_path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line) if line.strip() else None
+                except ValueError:
+                    break
+                if record is not None and "removed" in record:
+                    removed_rows.append(record["removed"])
+                elif record is not None:
+                    if len(items) == capacity:
+                        break
+                    items.append(record)
+                valid_size += len(line)
+
+        if valid_size < os.path.getsize(self.items_path) or len(items) != meta["count"]:
+            Logger().warning(
+                f"repairing vector memory {self.path}: {len(items)} items, {meta['count']} recorded"
+            )
+            with open(self.items_path, "ab") as f:
+                f.truncate(valid_size)
+            self.count = len(items)
+            self._save_meta()
+
+        self.count = len(items)
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.alive[:self.count] = True
+        self.items = []
+        for row, item in enumerate(items):
+            item["key"] = _hashable(item.get("key"))
+            self.items.append(item)
+            self._index(row, item)
+        for row in removed_rows:
+            if 0 <= row < self.count and self.alive[row]:
+                self._forget(row)
+
+    def _index(self, row: int, item: dict):
+        self.rows.setdefault(item["key"], {})[item["digest"]] = row
+        for field, value in item["metadata"].items():
+            value = _hashable(value)
+            if isinstance(value, (str, int, float, bool, tuple, type(None))):
+                self.index.setdefault((field, value), []).append(row)
+
+    def _forget(self, row: int):
+        item = self.items[row]
+        rows = self.rows[item["key"]]
+        del rows[item["digest"]]
+        if not rows:
+            del self.rows[item["key"]]
+        self.items[row] = None
+        self.alive[row] = False
+        self.removed += 1
+
+    def _save_meta(self):
+        tmp_path = f"{self.meta_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"dim": self.dim, "count": self.count}, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def _reserve(self, rows: int):
+        capacity = 0 if self.vectors is None else self.vectors.shape[0]
+        if self.count + rows <= capacity:
+            return
+
+        new_capacity = max(INITIAL_CAPACITY, capacity)
+        while new_capacity < self.count + rows:
+            new_capacity *= 2
+
+        if self.vectors is not None:
+            self.vectors.flush()
+            del self.vectors
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(new_capacity * self.dim * 4)
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(new_capacity, self.dim))
+        alive = np.zeros(new_capacity, dtype=bool)
+        alive[:self.count] = self.alive[:self.count]
+        self.alive = alive
+
+    def __len__(self):
+        return self.count - self.removed
+
+    def _new_chunks(self, key, texts: list, metadata: list) -> list:
+        stored = self.rows.get(key, {})
+        new, seen = [], set()
+        for index, (text, meta) in enumerate(zip(texts, metadata)):
+            digest = _digest(text)
+            if digest not in stored and digest not in seen:
+                seen.add(digest)
+                new.append((index, digest, text, meta))
+        return new
+
+    @staticmethod
+    def _embeddings(new: list, embeddings) -> np.ndarray:
+        if embeddings is None:
+            return embed([text for _index, _digest, text, _meta in new])
+        return np.asarray(embeddings, dtype=np.float32)[[index for index, *_rest in new]]
+
+    def _insert(self, key, new: list, embeddings: np.ndarray) -> int:
+        # chunks embedded outside the lock may have been stored by another thread meanwhile
+        stored = self.rows.get(key, {})
+        fresh = [i for i, (_index, digest, _text, _meta) in enumerate(new) if digest not in stored]
+        if not fresh:
+            return 0
+        new, embeddings = [new[i] for i in fresh], embeddings[fresh]
+
+        if self.dim is None:
+            self.dim = embeddings.shape[1]
+            os.makedirs(self.path, exist_ok=True)
+        self._reserve(len(new))
+
+        self.vectors[self.count:self.count + len(new)] = embeddings
+        self.vectors.flush()
+
+        with open(self.items_path, "a", encoding="utf-8") as f:
+            for _index, digest, text, meta in new:
+                item = {"digest": digest, "text": text, "metadata": meta, "key": key}
+                f.write(json.dumps(item) + "\n")
+                self.items.append(item)
+                self.alive[self.count] = True
+                self._index(self.count, item)
+                self.count += 1
+
+        self._save_meta()
+        return len(new)
+
+    def _remove_rows(self, rows: list):
+        if not rows:
+            return
+        with open(self.items_path, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps({"removed": row}) + "\n")
+                self._forget(row)
+        if self.removed >= COMPACT_MIN_REMOVED and self.removed * 2 >= self.count:
+            self._compact()
+
+    def _compact(self):
+        """
+        Rewrite the collection without its removed rows, in a new directory that is
+        then swapped in, so a crash leaves either the old or the new files.
+        """
+        keep = np.flatnonzero(self.alive[:self.count])
+        compacted_path, old_path = f"{self.path}.compact", f"{self.path}.old"
+        shutil.rmtree(compacted_path, ignore_errors=True)
+        os.makedirs(compacted_path)
+
+        capacity = max(INITIAL_CAPACITY, len(keep))
+        vectors = np.memmap(os.path.join(compacted_path, "vectors.f32"), dtype=np.float32, mode="w+",
+                            shape=(capacity, self.dim))
+        vectors[:len(keep)] = self.vectors[keep]
+        vectors.flush()
+        del vectors
+        with open(os.path.join(compacted_path, "items.jsonl"), "w", encoding="utf-8") as f:
+            for row in keep:
+                f.write(json.dumps(self.items[row]) + "\n")
+        with open(os.path.join(compacted_path, "meta.json"), "w") as f:
+            json.dump({"dim": self.dim, "count": len(keep)}, f)
+
+        self.vectors.flush()
+        self.vectors = None
+        os.rename(self.path, old_path)
+        os.rename(compacted_path, self.path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+        self._reset()
+        self._load()
+
+    def add(self, texts: list, metadata: list = None, embeddings: np.ndarray = None, key=None) -> int:
+        """
+        Embed and store `texts` under `key`, skipping ones the key already holds, each
+        with an optional metadata dict. Returns the number of new chunks.
+        """
+        metadata = metadata or [{} for _ in texts]
+        key = _hashable(key)
+        with self.lock:
+            new = self._new_chunks(key, texts, metadata)
+        if not new:
+            return 0
+
+        embeddings = self._embeddings(new, embeddings)
+        with self.lock:
+            return self._insert(key, new, embeddings)
+
+    def replace(self, key, texts: list, metadata: list = None, embeddings: np.ndarray = None) -> int:
+        """
+        Make `texts` the only chunks stored under `key`: chunks it no longer has are
+        removed and only the new ones are embedded. Returns the number of new chunks.
+        """
+        metadata = metadata or [{} for _ in texts]
+        key = _hashable(key)
+        with self.lock:
+            new = self._new_chunks(key, texts, metadata)
+        embeddings = self._embeddings(new, embeddings) if new else None
+
+        digests = {_digest(text) for text in texts}
+        with self.lock:
+            added = self._insert(key, new, embeddings) if new else 0
+            self._remove_rows([row for digest, row in self.rows.get(key, {}).items() if digest not in digests])
+        return added
+
+    def remove(self, key):
+        """
+        Remove every chunk stored under `key`.
+        """
+        with self.lock:
+            self._remove_rows(list(self.rows.get(_hashable(key), {}).values()))
+
+    def keys(self) -> list:
+        with self.lock:
+            return [key for key in self.rows if key is not None]
+
+    def search(self, query: str, top_k: int = 5, query_embedding: np.ndarray = None, **where) -> list:
+        """
+        The `top_k` most similar chunks to `query`, best first, as dicts with the chunk
+        `text`, its `metadata` and the cosine `score`. Keyword arguments filter on
+        metadata values, e.g. `search(query, project="demo")`; a set of values matches
+        any of them.
+        """
+        with self.lock:
+            if not len(self):
+                return []
+            if query_embedding is None:
+                query_embedding = embed([query])[0]
+            query_embedding = np.asarray(query_embedding, dtype=np.float32)
+
+            mask = self.alive[:self.count] if self.removed else None
+            for field, value in where.items():
+                values = value if isinstance(value, (set, frozenset)) else (value,)
+                matches = np.zeros(self.count, dtype=bool)
+                for value in values:
+                    rows = self.index.get((field, _hashable(value)))
+                    if rows:
+                        matches[rows] = True
+                mask = matches if mask is None else mask & matches
+
+            best_scores = np.empty(0, dtype=np.float32)
+            best_rows = np.empty(0, dtype=np.int64)
+            for start in range(0, self.count, SEARCH_BATCH):
+                end = min(start + SEARCH_BATCH, self.count)
+                scores = self.vectors[start:end] @ query_embedding
+                if mask is not None:
+                    scores = np.where(mask[start:end], scores, -np.inf)
+
+                if len(scores) > top_k:
+                    candidates = np.argpartition(scores, -top_k)[-top_k:]
+                else:
+                    candidates = np.arange(len(scores))
+                best_scores = np.concatenate([best_scores, scores[candidates]])
+                best_rows = np.concatenate([best_rows, candidates + start])
+
+            order = np.argsort(-best_scores)[:top_k]
+            return [
+                {
+                    "text": self.items[row]["text"],
+                    "metadata": self.items[row]["metadata"],
+                    "score": float(score),
+                }
+                for row, score in zip(best_rows[order], best_scores[order])
+                if np.isfinite(score)
+            ]
@@ -1,26 +1,37 @@
 import os
 import json
+import threading
+import time
 import zipfile
 from datetime import datetime
 from typing import Optional
 from src.socket_instance import emit_agent
-from sqlmodel import Field, Session, SQLModel, create_engine
+from sqlalchemy import Index
+from sqlmodel import Field, Session, SQLModel
 from src.config import Config
+from src.database import Database
 
 
 class Projects(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_projects_project", "project", unique=True),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     project: str
     message_stack_json: str
 
 
 class ProjectManager:
+    # notified whenever a user message is stored, so agents waiting for a reply wake up right away
+    _user_message = threading.Condition()
+
     def __init__(self):
         config = Config()
-        sqlite_path = config.get_sqlite_db()
         self.project_path = config.get_projects_dir()
-        self.engine = create_engine(f"sqlite:///{sqlite_path}")
-        SQLModel.metadata.create_all(self.engine)
+        database = Database()
+        database.create_tables(Projects)
+        self.engine = database.engine
 
     def new_message(self):
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -33,6 +44,8 @@ class ProjectManager:
 
     def create_project(self, project: str):
         with Session(self.engine) as session:
+            if session.query(Projects).filter(Projects.project == project).first():
+                return
             project_state = Projects(project=project, message_stack_json=json.dumps([]))
             session.add(project_state)
             session.commit()
@@ -70,6 +83,22 @@ class ProjectManager:
         new_message["from_devika"] = False
         emit_agent("server-message", {"messages": new_message})
         self.add_message_to_project(project, new_message)
+        with ProjectManager._user_message:
+            ProjectManager._user_message.notify_all()
+
+    def wait_for_message_from_user(self, project: str, timeout: float = None):
+        """
+        Block until the last message of the project is from the user and return it,
+        or None if `timeout` seconds pass first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with ProjectManager._user_message:
+            while not self.validate_last_message_is_from_user(project):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                ProjectManager._user_message.wait(remaining)
+        return self.get_latest_message_from_user(project)
 
     def get_messages(self, project: str):
         with Session(self.engine) as session:
@@ -0,0 +1,3 @@
+from .code_runner import CodeRunner
+from .limits import SandboxLimits
+from .environments import EnvironmentCache
\ No newline at end of file
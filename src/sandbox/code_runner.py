@@ -0,0 +1,324 @@
+import os
+import shlex
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+
+from src.config import Config
+from src.logger import Logger
+from src.sandbox.firejail import available_isolation, wrap_command
+from src.sandbox.limits import SandboxLimits
+from src.socket_instance import emit_agent
+from src.state import AgentState
+
+READ_CHUNK = 4096
+EMIT_INTERVAL = 0.5  # seconds between live terminal updates of a running command
+
+
+class OutputBuffer:
+    """
+    Keeps the last `max_bytes` bytes of a command's output, dropping the oldest chunks.
+    """
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.chunks = deque()
+        self.size = 0
+        self.dropped = 0
+        self.lock = threading.Lock()
+
+    def append(self, data: bytes):
+        with self.lock:
+            self.chunks.append(data)
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                excess = self.size - self.max_bytes
+                head = self.chunks[0]
+                if len(head) <= excess:
+                    self.chunks.popleft()
+                    self.size -= len(head)
+                    self.dropped += len(head)
+                else:
+                    self.chunks[0] = head[excess:]
+                    self.size -= excess
+                    self.dropped += excess
+
+    def text(self) -> str:
+        with self.lock:
+            output = b"".join(self.chunks).decode("utf-8", errors="replace")
+            if self.dropped:
+                output = f"[... {self.dropped} bytes of earlier output truncated ...]\n" + output
+            return output
+
+
+class CommandResult:
+    def __init__(self, command: str, returncode: int, output: str, duration: float,
+                 timed_out: bool = False, cancelled: bool = False, truncated: bool = False,
+                 usage: dict = None):
+        self.command = command
+        self.returncode = returncode
+        self.output = output
+        self.duration = duration
+        self.timed_out = timed_out
+        self.cancelled = cancelled
+        self.truncated = truncated
+        self.usage = usage or {}  # wall_seconds, cpu_seconds, peak_memory_kb and oom_kills (cgroups), limit
+
+    @property
+    def failed(self) -> bool:
+        return self.returncode != 0
+
+
+class CommandRun:
+    """
+    One running command. stdout and stderr are merged and read as they are produced
+    by a background thread, so the terminal can show them before the command exits.
+    """
+    def __init__(self, command: str, cwd: str, timeout: float, max_output_bytes: int,
+                 on_output=None, env: dict = None, limits: SandboxLimits = None, isolation: str = None,
+                 writable_paths: list = None):
+        self.command = command
+        self.cwd = cwd
+        self.timeout = timeout
+        self.env = env
+        self.limits = limits
+        self.isolation = isolation
+        self.writable_paths = writable_paths
+        self.on_output = on_output
+        self.output = OutputBuffer(max_output_bytes)
+        self.process = None
+        self.reader = None
+        self.started_at = None
+        self.timed_out = False
+        self.cancelled = False
+        self.result = None
+
+    def popen_args(self) -> list:
+        args = shlex.split(self.command, posix=os.name != "nt")
+        if self.isolation:
+            args = wrap_command(args, os.path.abspath(self.cwd), self.isolation, self.writable_paths)
+        return args
+
+    def popen_options(self) -> dict:
+        options = {}
+        if os.name == "posix":
+            # own process group, so a timeout also kills whatever the command spawned
+            options["start_new_session"] = True
+            if self.limits:
+                options["preexec_fn"] = self.limits.preexec
+        return options
+
+    def start(self):
+        self.started_at = time.monotonic()
+        if self.limits:
+            self.limits.prepare()
+        try:
+            self.process = subprocess.Popen(
+                self.popen_args(),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                cwd=self.cwd,
+                env=self.env,
+                **self.popen_options()
+            )
+        except (OSError, ValueError, subprocess.SubprocessError) as e:
+            if self.limits:
+                self.limits.cleanup()
+            self.output.append(f"{e}\n".encode("utf-8"))
+            self.result = CommandResult(self.command, 127, self.output.text(), 0.0)
+            return self
+
+        self.reader = threading.Thread(target=self._read_output, name="command-output", daemon=True)
+        self.reader.start()
+        return self
+
+    def _read_output(self):
+        stream = self.process.stdout
+        read = getattr(stream, "read1", None) or stream.read
+        while True:
+            data = read(READ_CHUNK)
+            if not data:
+                break
+            self.output.append(data)
+            if self.on_output:
+                self.on_output(self)
+
+    def kill(self):
+        if self.process is None:
+            return
+        try:
+            if os.name == "posix":
+                os.killpg(self.process.pid, signal.SIGKILL)
+            else:
+                self.process.kill()
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def cancel(self):
+        self.cancelled = True
+        self.kill()
+
+    def _wait_process(self, timeout: float = None):
+        """
+        Wait for the process to exit and return its resource usage, when the platform
+        can report it. Reaps the child with wait4 instead of Popen.wait to get the rusage.
+        """
+        if os.name != "posix":
+            self.process.wait(timeout=timeout)
+            return None
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        interval = 0.01
+        while True:
+            try:
+                pid, status, rusage = os.wait4(self.process.pid, os.WNOHANG)
+            except ChildProcessError:
+                # already reaped elsewhere (e.g. by gevent's child watcher)
+                self.process.wait(timeout=None if deadline is None else max(0, deadline - time.monotonic()))
+                return None
+            if pid:
+                self.process.returncode = os.waitstatus_to_exitcode(status)
+                return rusage
+            if deadline is not None and time.monotonic() >= deadline:
+                raise subprocess.TimeoutExpired(self.command, timeout)
+            time.sleep(interval)
+            interval = min(interval * 2, 0.1)
+
+    def _usage(self, rusage, cgroup_stats: dict) -> dict:
+        usage = {"wall_seconds": round(time.monotonic() - self.started_at, 3)}
+        if rusage is not None:
+            # ru_maxrss isn't reported: the forked child starts out with the server's
+            # memory, so it would count that too. Peak memory comes from the cgroup only.
+            usage["cpu_seconds"] = round(rusage.ru_utime + rusage.ru_stime, 3)
+        usage.update(cgroup_stats)
+
+        limits = self.limits
+        returncode = self.process.returncode
+        if limits is None or returncode is None or returncode >= 0:
+            return usage
+        if returncode == -getattr(signal, "SIGXCPU", 0) or (
+            limits.cpu_seconds and usage.get("cpu_seconds", 0) >= limits.cpu_seconds
+        ):
+            usage["limit"] = f"CPU time limit ({limits.cpu_seconds} s)"
+        elif usage.get("oom_kills"):
+            usage["limit"] = f"memory limit ({limits.memory_mb} MB)"
+        elif returncode == -getattr(signal, "SIGXFSZ", 0):
+            usage["limit"] = f"file size limit ({limits.file_size_mb} MB)"
+        return usage
+
+    def wait(self) -> CommandResult:
+        if self.result is not None:
+            return self.result
+
+        remaining = None
+        if self.timeout:
+            remaining = max(0, self.started_at + self.timeout - time.monotonic())
+        try:
+            rusage = self._wait_process(remaining)
+        except subprocess.TimeoutExpired:
+            self.timed_out = True
+            self.kill()
+            rusage = self._wait_process()
+
+        self.reader.join(timeout=1)
+        if self.reader.is_alive():
+            # a background child still holds the output pipe open
+            self.kill()
+            self.reader.join()
+        usage = self._usage(rusage, self.limits.cleanup() if self.limits else {})
+        if self.timed_out:
+            self.output.append(f"\n[command timed out after {self.timeout} seconds]\n".encode("utf-8"))
+        elif self.cancelled:
+            self.output.append(b"\n[command cancelled]\n")
+        elif "limit" in usage:
+            self.output.append(f"\n[command stopped: exceeded the sandbox {usage['limit']}]\n".encode("utf-8"))
+        Logger().info(f"command finished: {self.command} :: exit {self.process.returncode} :: {usage}")
+
+        self.result = CommandResult(
+            self.command,
+            self.process.returncode,
+            self.output.text(),
+            time.monotonic() - self.started_at,
+            timed_out=self.timed_out,
+            cancelled=self.cancelled,
+            truncated=self.output.dropped > 0,
+            usage=usage
+        )
+        return self.result
+
+
+class CodeRunner:
+    """
+    Runs shell commands for a project with a timeout and a cap on the output kept,
+    streaming the output to the terminal panel while they run. The running commands
+    of a project can be cancelled with `cancel`.
+
+    Unless `sandboxed` is False, commands run under the [SANDBOX] resource limits and,
+    when configured and installed, inside firejail or bubblewrap. `limits` overrides
+    some of the limits (`SandboxLimits` arguments), and `writable_paths` are writable
+    inside the isolation besides the working directory.
+    """
+    _active = {}
+    _active_lock = threading.Lock()
+
+    def __init__(self, timeout: float = None, max_output_bytes: int = None, sandboxed: bool = True,
+                 limits: dict = None, writable_paths: list = None):
+        config = Config()
+        self.timeout = timeout if timeout is not None else config.get_timeout_command()
+        self.max_output_bytes = max_output_bytes or config.get_sandbox_output_max_kb() * 1024
+        self.sandboxed = sandboxed
+        self.limits = limits or {}
+        self.writable_paths = writable_paths
+        self.isolation = available_isolation(config.get_sandbox_isolation()) if sandboxed else None
+
+    def _emitter(self, project_name: str, command: str):
+        state = AgentState().new_state()
+        state["internal_monologue"] = "Running code..."
+        state["terminal_session"]["title"] = "Terminal"
+        state["terminal_session"]["command"] = command
+        last_emit = [0.0]
+
+        def emit(run: CommandRun):
+            now = time.monotonic()
+            if now - last_emit[0] < EMIT_INTERVAL:
+                return
+            last_emit[0] = now
+            state["terminal_session"]["output"] = run.output.text()
+            # live update only, the final output is stored in the agent state by the caller
+            emit_agent("agent-state", [state], False)
+
+        return emit
+
+    def start(self, command: str, cwd: str, project_name: str = None, env: dict = None) -> CommandRun:
+        on_output = self._emitter(project_name, command) if project_name else None
+        run = CommandRun(
+            command, cwd, self.timeout, self.max_output_bytes, on_output=on_output, env=env,
+            limits=SandboxLimits(**self.limits) if self.sandboxed else None, isolation=self.isolation,
+            writable_paths=self.writable_paths
+        )
+        with CodeRunner._active_lock:
+            CodeRunner._active.setdefault(project_name, set()).add(run)
+        return run.start()
+
+    def wait(self, run: CommandRun, project_name: str = None) -> CommandResult:
+        try:
+            return run.wait()
+        finally:
+            with CodeRunner._active_lock:
+                CodeRunner._active.get(project_name, set()).discard(run)
+
+    def run(self, command: str, cwd: str, project_name: str = None, env: dict = None) -> CommandResult:
+        return self.wait(self.start(command, cwd, project_name, env), project_name)
+
+    @classmethod
+    def cancel(cls, project_name: str) -> int:
+        """
+        Kill every command still running for `project_name`. Returns how many were cancelled.
+        """
+        with cls._active_lock:
+            runs = list(cls._active.get(project_name, ()))
+        for run in runs:
+            run.cancel()
+        return len(runs)
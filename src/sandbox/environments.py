@@ -0,0 +1,255 @@
+import hashlib
+import os
+import shutil
+import sys
+import threading
+import time
+
+from src.config import Config
+from src.logger import Logger
+from src.shared import Singleton
+
+PYTHON_MANIFESTS = ["requirements.txt", "requirements-dev.txt", "pyproject.toml", "setup.py", "setup.cfg"]
+NODE_MANIFESTS = ["package.json", "package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "pnpm-lock.yaml"]
+
+
+class EnvironmentCache(Singleton):
+    """
+    Warm, reusable execution environments for the commands `Runner` runs.
+
+    Each project gets a virtualenv (Python projects) and a node_modules directory
+    (Node projects) under `STORAGE.ENVS_DIR/<project>/`, named after a hash of the
+    project's dependency manifests. They are reused by every run until a manifest
+    changes, when a new one is built and the old one removed. A build that fails isn't
+    retried for the same manifests for `SANDBOX.FAILED_BUILD_TTL` seconds, commands run
+    without that environment instead. Commands run with the virtualenv's and
+    node_modules' bin directories first on PATH, and the project's node_modules is a
+    symlink to the cached one.
+
+    Builds run install scripts from the project, so they run sandboxed like any other
+    command, with the larger `SANDBOX.BUILD_*` limits.
+    """
+    def _setup(self):
+        config = Config()
+        # absolute, since commands run from the project directory
+        self.envs_dir = os.path.abspath(config.get_envs_dir())
+        self.build_limits = {
+            "cpu_seconds": config.get_sandbox_build_cpu_seconds(),
+            "memory_mb": config.get_sandbox_build_memory_mb(),
+            "max_processes": config.get_sandbox_build_max_processes(),
+        }
+        self.failed_build_ttl = config.get_sandbox_failed_build_ttl()
+        self.logger = Logger()
+        self.locks = {}
+        self.locks_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.counters = {
+            kind: {"hits": 0, "misses": 0, "builds_failed": 0, "skipped_failed": 0,
+                   "build_seconds": 0.0, "last_build_seconds": None}
+            for kind in ("python", "node")
+        }
+        # env path -> when its build failed, so commands run without it for a while
+        self.failed = {}
+
+    def _project_lock(self, project_name: str) -> threading.Lock:
+        with self.locks_lock:
+            return self.locks.setdefault(project_name, threading.Lock())
+
+    @staticmethod
+    def manifest_hash(project_path: str, manifests: list):
+        """
+        Hash of the dependency manifests present in the project, or None if it has none.
+        """
+        digest = hashlib.sha256()
+        found = False
+        for name in manifests:
+            path = os.path.join(project_path, name)
+            if os.path.isfile(path):
+                found = True
+                digest.update(name.encode("utf-8") + b"\0")
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+        return digest.hexdigest()[:16] if found else None
+
+    def _count(self, kind: str, key: str, value=1):
+        with self.stats_lock:
+            self.counters[kind][key] += value
+
+    def _known_failure(self, kind: str, env_path: str) -> bool:
+        failed_at = self.failed.get(env_path)
+        if failed_at is None:
+            return False
+        if time.monotonic() - failed_at >= self.failed_build_ttl:
+            del self.failed[env_path]
+            return False
+        self._count(kind, "skipped_failed")
+        return True
+
+    def _runner(self, env_path: str):
+        from src.sandbox.code_runner import CodeRunner
+
+        cache_dir = os.path.join(self.envs_dir, ".cache")
+        os.makedirs(cache_dir, exist_ok=True)
+        runner = CodeRunner(limits=self.build_limits, writable_paths=[env_path, cache_dir])
+        # the package managers' caches have to be writable inside the isolation
+        env = dict(os.environ, PIP_CACHE_DIR=os.path.join(cache_dir, "pip"),
+                   npm_config_cache=os.path.join(cache_dir, "npm"))
+        return runner, env
+
+    def _build(self, kind: str, env_path: str, build) -> bool:
+        """
+        Run `build` and record how long it took. `build` returns None once the environment
+        is ready, or the `CommandResult` of the step that failed. A failed build leaves
+        nothing behind. If it failed by itself, rather than by timing out or hitting a
+        sandbox limit, it isn't retried for the same manifests for a while.
+        """
+        start = time.monotonic()
+        shutil.rmtree(env_path, ignore_errors=True)
+        os.makedirs(env_path)
+        try:
+            failure = build()
+        except Exception as e:
+            self.logger.error(f"building the {kind} environment failed: {e}")
+            failure = e
+
+        elapsed = time.monotonic() - start
+        with self.stats_lock:
+            self.counters[kind]["build_seconds"] += elapsed
+            self.counters[kind]["last_build_seconds"] = round(elapsed, 3)
+        if failure is None:
+            return True
+
+        self._count(kind, "builds_failed")
+        shutil.rmtree(env_path, ignore_errors=True)
+        if not isinstance(failure, Exception) and not (
+            failure.timed_out or failure.cancelled or "limit" in failure.usage
+        ):
+            self.failed[env_path] = time.monotonic()
+        return False
+
+    def _remove_stale(self, project_dir: str, kind: str, keep: str):
+        for name in os.listdir(project_dir):
+            if name.startswith(f"{kind}-") and name != keep:
+                shutil.rmtree(os.path.join(project_dir, name), ignore_errors=True)
+
+    def _python_env(self, project_name: str, project_path: str, project_dir: str):
+        manifest_hash = self.manifest_hash(project_path, PYTHON_MANIFESTS)
+        if manifest_hash is None:
+            return None
+
+        name = f"python-{manifest_hash}"
+        env_path = os.path.join(project_dir, name)
+        if os.path.isfile(os.path.join(env_path, ".ready")):
+            self._count("python", "hits")
+            return env_path
+        if self._known_failure("python", env_path):
+            return None
+        self._count("python", "misses")
+
+        # venvs hardcode their location in their scripts, so they are built in place;
+        # like node environments they only count as ready once the marker file is written
+        def build():
+            runner, env = self._runner(env_path)
+            pip = os.path.join(env_path, "Scripts" if os.name == "nt" else "bin", "pip")
+            commands = [f'"{sys.executable}" -m venv "{env_path}"']
+            for requirements in ("requirements.txt", "requirements-dev.txt"):
+                if os.path.isfile(os.path.join(project_path, requirements)):
+                    commands.append(f'"{pip}" install -r {requirements}')
+            if os.path.isfile(os.path.join(project_path, "pyproject.toml")) or os.path.isfile(os.path.join(project_path, "setup.py")):
+                commands.append(f'"{pip}" install -e .')
+            for command in commands:
+                result = runner.run(command, project_path, project_name, env)
+                if result.failed:
+                    return result
+            open(os.path.join(env_path, ".ready"), "w").close()
+
+        if not self._build("python", env_path, build):
+            return None
+        self._remove_stale(project_dir, "python", name)
+        return env_path
+
+    def _node_env(self, project_name: str, project_path: str, project_dir: str):
+        if not os.path.isfile(os.path.join(project_path, "package.json")):
+            return None
+        manifest_hash = self.manifest_hash(project_path, NODE_MANIFESTS)
+
+        name = f"node-{manifest_hash}"
+        env_path = os.path.join(project_dir, name)
+        if os.path.isfile(os.path.join(env_path, ".ready")):
+            self._count("node", "hits")
+        elif self._known_failure("node", env_path):
+            return None
+        else:
+            self._count("node", "misses")
+
+            # installed next to a copy of the manifests, so the project directory is untouched
+            def build():
+                for manifest in NODE_MANIFESTS:
+                    if os.path.isfile(os.path.join(project_path, manifest)):
+                        shutil.copy2(os.path.join(project_path, manifest), env_path)
+                has_lockfile = os.path.isfile(os.path.join(env_path, "package-lock.json"))
+                runner, env = self._runner(env_path)
+                result = runner.run("npm ci" if has_lockfile else "npm install", env_path, project_name, env)
+                if result.failed:
+                    return result
+                open(os.path.join(env_path, ".ready"), "w").close()
+
+            if not self._build("node", env_path, build):
+                return None
+            self._remove_stale(project_dir, "node", name)
+
+        self._link_node_modules(project_path, os.path.join(env_path, "node_modules"))
+        return env_path
+
+    @staticmethod
+    def _link_node_modules(project_path: str, node_modules: str):
+        link = os.path.join(project_path, "node_modules")
+        if os.path.islink(link):
+            if os.readlink(link) == node_modules:
+                return
+            os.unlink(link)
+        elif os.path.exists(link):
+            return  # installed by the project itself, leave it alone
+        os.symlink(node_modules, link, target_is_directory=True)
+
+    def prepare(self, project_name: str, project_path: str) -> dict:
+        """
+        Build or reuse the environments of the project and return the process
+        environment its commands should run with.
+        """
+        env = dict(os.environ)
+        if not os.path.isdir(project_path):
+            return env
+
+        project_dir = os.path.join(self.envs_dir, project_name.lower().replace(" ", "-"))
+        os.makedirs(project_dir, exist_ok=True)
+        with self._project_lock(project_name):
+            python_env = self._python_env(project_name, project_path, project_dir)
+            node_env = self._node_env(project_name, project_path, project_dir)
+
+        paths = []
+        if python_env:
+            env["VIRTUAL_ENV"] = python_env
+            env.pop("PYTHONHOME", None)
+            paths.append(os.path.join(python_env, "Scripts" if os.name == "nt" else "bin"))
+        if node_env:
+            paths.append(os.path.join(node_env, "node_modules", ".bin"))
+        if paths:
+            env["PATH"] = os.pathsep.join(paths + [env.get("PATH", "")])
+        return env
+
+    def delete_project(self, project_name: str):
+        project_dir = os.path.join(self.envs_dir, project_name.lower().replace(" ", "-"))
+        self.failed = {
+            env_path: failed_at for env_path, failed_at in self.failed.items()
+            if os.path.dirname(env_path) != project_dir
+        }
+        shutil.rmtree(project_dir, ignore_errors=True)
+
+    def stats(self) -> dict:
+        with self.stats_lock:
+            stats = {}
+            for kind, counters in self.counters.items():
+                lookups = counters["hits"] + counters["misses"]
+                stats[kind] = dict(counters, hit_rate=round(counters["hits"] / lookups, 3) if lookups else None)
+            return stats
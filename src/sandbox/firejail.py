@@ -0,0 +1,53 @@
+import shutil
+
+ISOLATION_TOOLS = ["firejail", "bwrap"]
+
+
+def available_isolation(isolation: str):
+    """
+    The isolation tool to use for the configured `isolation` ("none", "firejail",
+    "bwrap" or "auto"), or None when it is disabled or not installed.
+    """
+    isolation = (isolation or "none").lower()
+    if isolation == "auto":
+        return next((tool for tool in ISOLATION_TOOLS if shutil.which(tool)), None)
+    if isolation in ISOLATION_TOOLS and shutil.which(isolation):
+        return isolation
+    return None
+
+
+def wrap_command(args: list, project_path: str, isolation: str, writable_paths: list = None) -> list:
+    """
+    Prefix `args` so the command only sees a private /tmp and can only write to the
+    project directory and `writable_paths`. The rest of the filesystem stays readable
+    so toolchains work.
+    """
+    writable_paths = [project_path] + list(writable_paths or [])
+    if isolation == "firejail":
+        return [
+            "firejail", "--quiet", "--noprofile",
+            "--private-tmp", "--private-dev",
+            "--read-only=/",
+        ] + [f"--read-write={path}" for path in writable_paths] + [
+            "--caps.drop=all", "--nonewprivs", "--noroot",
+            "--",
+        ] + args
+
+    if isolation == "bwrap":
+        binds = []
+        for path in writable_paths:
+            binds += ["--bind", path, path]
+        return [
+            "bwrap",
+            "--ro-bind", "/", "/",
+        ] + binds + [
+            "--dev", "/dev",
+            "--proc", "/proc",
+            "--tmpfs", "/tmp",
+            "--unshare-pid", "--unshare-ipc", "--unshare-uts",
+            "--die-with-parent",
+            "--chdir", project_path,
+            "--",
+        ] + args
+
+    return args
@@ -0,0 +1,198 @@
+import os
+import time
+import uuid
+
+from src.config import Config
+from src.logger import Logger
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+CGROUP_PARENT = "devika"
+
+
+class SandboxLimits:
+    """
+    Resource limits of one sandboxed command, read from the [SANDBOX] config.
+
+    The limits are applied as rlimits in the child right before it executes, so they
+    hold for the command and are inherited by everything it spawns. When a writable
+    cgroup v2 hierarchy is available the command also runs in its own cgroup, which
+    caps memory and process count for the whole process tree and reports peak memory
+    and OOM kills.
+    """
+    def __init__(self, cpu_seconds: int = None, memory_mb: int = None, max_processes: int = None,
+                 file_size_mb: int = None):
+        config = Config()
+        self.cpu_seconds = cpu_seconds if cpu_seconds is not None else config.get_sandbox_cpu_seconds()
+        self.memory_mb = memory_mb if memory_mb is not None else config.get_sandbox_memory_mb()
+        self.max_processes = max_processes if max_processes is not None else config.get_sandbox_max_processes()
+        self.file_size_mb = file_size_mb if file_size_mb is not None else config.get_sandbox_file_size_mb()
+        self.use_cgroups = config.get_sandbox_use_cgroups()
+        self.cgroup = None
+        self.nproc_limit = None
+
+    def _rlimits(self) -> list:
+        limits = [(resource.RLIMIT_CORE, 0)]
+        if self.cpu_seconds:
+            limits.append((resource.RLIMIT_CPU, self.cpu_seconds))
+        if self.memory_mb and self.cgroup is None:
+            # address space over-counts runtimes that reserve large virtual ranges (V8, JVM),
+            # so it is only used when the cgroup memory limit isn't available
+            limits.append((resource.RLIMIT_AS, self.memory_mb * 1024 * 1024))
+        if self.file_size_mb:
+            limits.append((resource.RLIMIT_FSIZE, self.file_size_mb * 1024 * 1024))
+        if self.nproc_limit:
+            limits.append((resource.RLIMIT_NPROC, self.nproc_limit))
+        return limits
+
+    @staticmethod
+    def _user_thread_count():
+        """
+        Threads owned by the current user. Linux checks RLIMIT_NPROC against the user's
+        threads, not processes, so this is the baseline the limit has to start from.
+        """
+        uid = os.getuid()
+        count = 0
+        try:
+            for pid in os.listdir("/proc"):
+                if not pid.isdigit():
+                    continue
+                try:
+                    if os.stat(f"/proc/{pid}").st_uid == uid:
+                        count += len(os.listdir(f"/proc/{pid}/task"))
+                except OSError:
+                    pass
+        except OSError:
+            return None
+        return count
+
+    def prepare(self):
+        """
+        Create the cgroup of the command, if cgroups are enabled and usable, or
+        work out the per-user process limit that stands in for it.
+        """
+        if self.use_cgroups and os.name == "posix":
+            self.cgroup = Cgroup.create(self)
+        if self.cgroup is None and self.max_processes and resource is not None and hasattr(resource, "RLIMIT_NPROC"):
+            # RLIMIT_NPROC counts every thread of the user, not just the command's,
+            # so the command gets `max_processes` on top of what the user already runs
+            user_threads = self._user_thread_count()
+            if user_threads is not None:
+                self.nproc_limit = user_threads + self.max_processes
+
+    def preexec(self):
+        """
+        Runs in the forked child before exec: join the cgroup and set the rlimits.
+        Must not allocate much or take locks.
+        """
+        if self.cgroup:
+            self.cgroup.add_self()
+        if resource is None:
+            return
+        for limit, value in self._rlimits():
+            try:
+                _soft, hard = resource.getrlimit(limit)
+                if hard != resource.RLIM_INFINITY:
+                    value = min(value, hard)
+                else:
+                    # one second of grace past the CPU limit, so SIGXCPU arrives before SIGKILL
+                    hard = value + 1 if limit == resource.RLIMIT_CPU else value
+                resource.setrlimit(limit, (value, hard))
+            except (ValueError, OSError):
+                pass
+
+    def cleanup(self) -> dict:
+        """
+        Remove the cgroup of the command. Returns what it recorded (peak memory, OOM kills).
+        """
+        if self.cgroup is None:
+            return {}
+        stats = self.cgroup.stats()
+        self.cgroup.remove()
+        self.cgroup = None
+        return stats
+
+
+class Cgroup:
+    unavailable = False
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @staticmethod
+    def _write(path: str, value: str):
+        with open(path, "w") as f:
+            f.write(value)
+
+    @classmethod
+    def create(cls, limits: SandboxLimits):
+        parent = os.path.join(CGROUP_ROOT, CGROUP_PARENT)
+        if cls.unavailable:
+            return None
+        try:
+            if not os.path.exists(os.path.join(CGROUP_ROOT, "cgroup.controllers")):
+                cls.unavailable = True
+                return None
+            if not os.path.isdir(parent):
+                os.mkdir(parent)
+                cls._write(os.path.join(parent, "cgroup.subtree_control"), "+memory +pids")
+
+            path = os.path.join(parent, uuid.uuid4().hex)
+            os.mkdir(path)
+            cgroup = cls(path)
+            if limits.memory_mb:
+                cls._write(os.path.join(path, "memory.max"), str(limits.memory_mb * 1024 * 1024))
+                if os.path.exists(os.path.join(path, "memory.swap.max")):
+                    cls._write(os.path.join(path, "memory.swap.max"), "0")
+            if limits.max_processes:
+                cls._write(os.path.join(path, "pids.max"), str(limits.max_processes))
+            return cgroup
+        except OSError as e:
+            Logger().warning(f"cgroup limits unavailable, using rlimits only: {e}")
+            cls.unavailable = True
+            return None
+
+    def add_self(self):
+        try:
+            self._write(os.path.join(self.path, "cgroup.procs"), "0")
+        except OSError:
+            pass
+
+    def _read(self, name: str) -> str:
+        try:
+            with open(os.path.join(self.path, name), "r") as f:
+                return f.read()
+        except OSError:
+            return ""
+
+    def stats(self) -> dict:
+        stats = {}
+        peak = self._read("memory.peak").strip()
+        if peak.isdigit():
+            stats["peak_memory_kb"] = int(peak) // 1024
+        for line in self._read("memory.events").splitlines():
+            key, _, value = line.partition(" ")
+            if key == "oom_kill" and value.strip().isdigit():
+                stats["oom_kills"] = int(value)
+        return stats
+
+    def remove(self):
+        try:
+            # kill anything left behind before removing the group
+            if os.path.exists(os.path.join(self.path, "cgroup.kill")):
+                self._write(os.path.join(self.path, "cgroup.kill"), "1")
+        except OSError:
+            pass
+        for _ in range(20):
+            try:
+                os.rmdir(self.path)
+                return
+            except FileNotFoundError:
+                return
+            except OSError:
+                time.sleep(0.05)  # killed processes are still exiting
+        Logger().warning(f"could not remove cgroup {self.path}")
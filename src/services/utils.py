@@ -5,15 +5,22 @@ from functools import wraps
 import json
 
 from src.socket_instance import emit_agent
+from src.llm import InferenceTimeoutError
 
 def retry_wrapper(func):
     def wrapper(*args, **kwargs):
         max_tries = 5
         tries = 0
         while tries < max_tries:
-            result = func(*args, **kwargs)
+            try:
+                result = func(*args, **kwargs)
+            except InferenceTimeoutError:
+                result = False
             if result:
                 return result
+            llm = getattr(args[0], "llm", None) if args else None
+            if llm is not None:
+                llm.discard_cached_response()
             print("Invalid response from the model, I'm trying again...")
             emit_agent("info", {"type": "warning", "message": "Invalid response from the model, trying again..."})
             tries += 1
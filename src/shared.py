@@ -0,0 +1,55 @@
+import asyncio
+import threading
+
+
+class Singleton:
+    """
+    Base class of the objects shared by the whole process. Constructing one returns
+    the existing instance; the first construction, from whichever thread, creates it
+    and calls its `_setup`.
+
+    Classes shared per key (a database file, a project directory) override `_key` to
+    turn their constructor arguments into the tuple of arguments `_setup` receives,
+    and get one instance per distinct key.
+    """
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._instances = {}
+        cls._instances_lock = threading.Lock()
+
+    @classmethod
+    def _key(cls, *args) -> tuple:
+        return ()
+
+    def _setup(self, *key):
+        pass
+
+    def __new__(cls, *args):
+        key = cls._key(*args)
+        instance = cls._instances.get(key)
+        if instance is None:
+            with cls._instances_lock:
+                instance = cls._instances.get(key)
+                if instance is None:
+                    instance = super().__new__(cls)
+                    instance._setup(*key)
+                    cls._instances[key] = instance
+        return instance
+
+
+class BackgroundLoop:
+    """
+    Mixin for clients whose async objects (Playwright, HTTP sessions) are bound to
+    the event loop that created them: `start_loop` runs a dedicated event loop on a
+    daemon thread, and the blocking `run` executes coroutines on it.
+    """
+    def start_loop(self, name: str):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name=name, daemon=True)
+        self.thread.start()
+
+    def run(self, coroutine, timeout: float = None):
+        """
+        Run `coroutine` on the background event loop and block until it finishes.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout)
@@ -9,6 +9,9 @@ logger = Logger()
 def emit_agent(channel, content, log=True):
     try:
         socketio.emit(channel, content)
+        # agents run as greenlets under gevent; yield so the event goes out now rather than
+        # at the next blocking call, which could be a long inference or command away
+        socketio.sleep(0)
         if log:
             logger.info(f"SOCKET {channel} MESSAGE: {content}")
         return True
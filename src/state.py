@@ -1,13 +1,19 @@
 import json
 import os
+import threading
 from datetime import datetime
 from typing import Optional
-from sqlmodel import Field, Session, SQLModel, create_engine
+from sqlalchemy import Index, func, insert
+from sqlmodel import Field, Session, SQLModel, select
 from src.socket_instance import emit_agent
-from src.config import Config
+from src.database import Database
 
 
 class AgentStateModel(SQLModel, table=True):
+    """
+    Legacy storage: the whole state stack of a project serialized as one JSON blob.
+    Only kept around so existing databases can be migrated to `AgentStateEvent`.
+    """
     __tablename__ = "agent_state"
 
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -15,12 +21,56 @@ class AgentStateModel(SQLModel, table=True):
     state_stack_json: str
 
 
+class AgentStateEvent(SQLModel, table=True):
+    """
+    One row per state of a project, ordered by `seq`.
+    Appending a state or touching the latest one never has to read the whole history.
+    """
+    __tablename__ = "agent_state_event"
+    __table_args__ = (
+        Index("ix_agent_state_event_project_seq", "project", "seq", unique=True),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    project: str
+    seq: int
+    state_json: str
+
+
 class AgentState:
+    _legacy_states_migrated = False
+    _migration_lock = threading.Lock()
+
     def __init__(self):
-        config = Config()
-        sqlite_path = config.get_sqlite_db()
-        self.engine = create_engine(f"sqlite:///{sqlite_path}")
-        SQLModel.metadata.create_all(self.engine)
+        database = Database()
+        database.create_tables(AgentStateModel, AgentStateEvent)
+        self.engine = database.engine
+
+        if not AgentState._legacy_states_migrated:
+            with AgentState._migration_lock:
+                if not AgentState._legacy_states_migrated:
+                    self.migrate_legacy_states()
+                    AgentState._legacy_states_migrated = True
+
+    def migrate_legacy_states(self):
+        """
+        Move every `agent_state` row into `agent_state_event` rows and drop the legacy row.
+        """
+        with Session(self.engine) as session:
+            legacy_states = session.exec(select(AgentStateModel)).all()
+            if not legacy_states:
+                return
+
+            for legacy_state in legacy_states:
+                next_seq = self._next_seq(session, legacy_state.project)
+                for offset, state in enumerate(json.loads(legacy_state.state_stack_json)):
+                    session.add(AgentStateEvent(
+                        project=legacy_state.project,
+                        seq=next_seq + offset,
+                        state_json=json.dumps(state)
+                    ))
+                session.delete(legacy_state)
+            session.commit()
 
     def new_state(self):
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -44,134 +94,135 @@ class AgentState:
             "timestamp": timestamp
         }
 
+    @staticmethod
+    def _next_seq(session: Session, project: str) -> int:
+        last_seq = session.exec(
+            select(func.max(AgentStateEvent.seq)).where(AgentStateEvent.project == project)
+        ).one()
+        return 0 if last_seq is None else last_seq + 1
+
+    @staticmethod
+    def _latest_event(session: Session, project: str) -> Optional[AgentStateEvent]:
+        return session.exec(
+            select(AgentStateEvent)
+            .where(AgentStateEvent.project == project)
+            .order_by(AgentStateEvent.seq.desc())
+            .limit(1)
+        ).first()
+
+    def _append_state(self, session: Session, project: str, state: dict):
+        # seq is allocated inside the INSERT itself, so concurrent appends to the same
+        # project can't both read the same MAX(seq) and collide on the unique index
+        table = AgentStateEvent.__table__
+        next_seq = (
+            select(func.coalesce(func.max(table.c.seq), -1) + 1)
+            .where(table.c.project == project)
+            .scalar_subquery()
+        )
+        session.exec(insert(table).values(project=project, seq=next_seq, state_json=json.dumps(state)))
+        session.commit()
+
+    def _update_latest(self, project: str, update, default_state: dict = None):
+        """
+        Apply `update` to the latest state of `project` in place, or append
+        `default_state` when the project has no state yet. Returns the stored state.
+        """
+        with Session(self.engine) as session:
+            latest_event = self._latest_event(session, project)
+            if latest_event:
+                state = json.loads(latest_event.state_json)
+                update(state)
+                latest_event.state_json = json.dumps(state)
+                session.add(latest_event)
+                session.commit()
+            else:
+                state = default_state if default_state is not None else self.new_state()
+                update(state)
+                self._append_state(session, project, state)
+            return state
+
     def create_state(self, project: str):
         with Session(self.engine) as session:
             new_state = self.new_state()
             new_state["step"] = 1
             new_state["internal_monologue"] = "I'm starting the work..."
-            agent_state = AgentStateModel(project=project, state_stack_json=json.dumps([new_state]))
-            session.add(agent_state)
-            session.commit()
+            self._append_state(session, project, new_state)
             emit_agent("agent-state", [new_state])
 
     def delete_state(self, project: str):
         with Session(self.engine) as session:
-            agent_state = session.query(AgentStateModel).filter(AgentStateModel.project == project).all()
-            if agent_state:
-                for state in agent_state:
-                    session.delete(state)
-                session.commit()
+            for model in (AgentStateEvent, AgentStateModel):
+                rows = session.exec(select(model).where(model.project == project)).all()
+                for row in rows:
+                    session.delete(row)
+            session.commit()
 
     def add_to_current_state(self, project: str, state: dict):
         with Session(self.engine) as session:
-            agent_state = session.query(AgentStateModel).filter(AgentStateModel.project == project).first()
-            if agent_state:
-                state_stack = json.loads(agent_state.state_stack_json)
-                state_stack.append(state)
-                agent_state.state_stack_json = json.dumps(state_stack)
-                session.commit()
-            else:
-                state_stack = [state]
-                agent_state = AgentStateModel(project=project, state_stack_json=json.dumps(state_stack))
-                session.add(agent_state)
-                session.commit()
-            emit_agent("agent-state", state_stack)
+            self._append_state(session, project, state)
+        emit_agent("agent-state", [state])
 
     def get_current_state(self, project: str):
         with Session(self.engine) as session:
-            agent_state = session.query(AgentStateModel).filter(AgentStateModel.project == project).first()
-            if agent_state:
-                return json.loads(agent_state.state_stack_json)
+            events = session.exec(
+                select(AgentStateEvent)
+                .where(AgentStateEvent.project == project)
+                .order_by(AgentStateEvent.seq)
+            ).all()
+            if events:
+                return [json.loads(event.state_json) for event in events]
             return None
 
     def update_latest_state(self, project: str, state: dict):
-        with Session(self.engine) as session:
-            agent_state = session.query(AgentStateModel).filter(AgentStateModel.project == project).first()
-            if agent_state:
-                state_stack = json.loads(agent_state.state_stack_json)
-                state_stack[-1] = state
-                agent_state.state_stack_json = json.dumps(state_stack)
-                session.commit()
-            else:
-                state_stack = [state]
-                agent_state = AgentStateModel(project=project, state_stack_json=json.dumps(state_stack))
-                session.add(agent_state)
-                session.commit()
-            emit_agent("agent-state", state_stack)
+        def replace(latest):
+            latest.clear()
+            latest.update(state)
+
+        state = self._update_latest(project, replace, default_state={})
+        emit_agent("agent-state", [state])
 
     def get_latest_state(self, project: str):
         with Session(self.engine) as session:
-            agent_state = session.query(AgentStateModel).filter(AgentStateModel.project == project).first()
-            if agent_state:
-                return json.loads(agent_state.state_stack_json)[-1]
+            latest_event = self._latest_event(session, project)
+            if latest_event:
+                return json.loads(latest_event.state_json)
             return None
 
     def set_agent_active(self, project: str, is_active: bool):
-        with Session(self.engine) as session:
-            agent_state = session.query(AgentStateModel).filter(AgentStateModel.project == project).first()
-            if agent_state:
-                state_stack = json.loads(agent_state.state_stack_json)
-                state_stack[-1]["agent_is_active"] = is_active
-                agent_state.state_stack_json = json.dumps(state_stack)
-                session.commit()
-            else:
-                state_stack = [self.new_state()]
-                state_stack[-1]["agent_is_active"] = is_active
-                agent_state = AgentStateModel(project=project, state_stack_json=json.dumps(state_stack))
-                session.add(agent_state)
-                session.commit()
-            emit_agent("agent-state", state_stack)
+        def update(state):
+            state["agent_is_active"] = is_active
+
+        state = self._update_latest(project, update)
+        emit_agent("agent-state", [state])
 
     def is_agent_active(self, project: str):
-        with Session(self.engine) as session:
-            agent_state = session.query(AgentStateModel).filter(AgentStateModel.project == project).first()
-            if agent_state:
-                return json.loads(agent_state.state_stack_json)[-1]["agent_is_active"]
-            return None
+        latest_state = self.get_latest_state(project)
+        if latest_state:
+            return latest_state["agent_is_active"]
+        return None
 
     def set_agent_completed(self, project: str, is_completed: bool):
-        with Session(self.engine) as session:
-            agent_state = session.query(AgentStateModel).filter(AgentStateModel.project == project).first()
-            if agent_state:
-                state_stack = json.loads(agent_state.state_stack_json)
-                state_stack[-1]["internal_monologue"] = "Agent has completed the task."
-                state_stack[-1]["completed"] = is_completed
-                agent_state.state_stack_json = json.dumps(state_stack)
-                session.commit()
-            else:
-                state_stack = [self.new_state()]
-                state_stack[-1]["completed"] = is_completed
-                agent_state = AgentStateModel(project=project, state_stack_json=json.dumps(state_stack))
-                session.add(agent_state)
-                session.commit()
-            emit_agent("agent-state", state_stack)
+        def update(state):
+            state["internal_monologue"] = "Agent has completed the task."
+            state["completed"] = is_completed
+
+        state = self._update_latest(project, update)
+        emit_agent("agent-state", [state])
 
     def is_agent_completed(self, project: str):
-        with Session(self.engine) as session:
-            agent_state = session.query(AgentStateModel).filter(AgentStateModel.project == project).first()
-            if agent_state:
-                return json.loads(agent_state.state_stack_json)[-1]["completed"]
-            return None
-            
+        latest_state = self.get_latest_state(project)
+        if latest_state:
+            return latest_state["completed"]
+        return None
+
     def update_token_usage(self, project: str, token_usage: int):
-        with Session(self.engine) as session:
-            agent_state = session.query(AgentStateModel).filter(AgentStateModel.project == project).first()
-            if agent_state:
-                state_stack = json.loads(agent_state.state_stack_json)
-                state_stack[-1]["token_usage"] += token_usage
-                agent_state.state_stack_json = json.dumps(state_stack)
-                session.commit()
-            else:
-                state_stack = [self.new_state()]
-                state_stack[-1]["token_usage"] = token_usage
-                agent_state = AgentStateModel(project=project, state_stack_json=json.dumps(state_stack))
-                session.add(agent_state)
-                session.commit()
+        def update(state):
+            state["token_usage"] += token_usage
+
+        self._update_latest(project, update)
 
     def get_latest_token_usage(self, project: str):
-        with Session(self.engine) as session:
-            agent_state = session.query(AgentStateModel).filter(AgentStateModel.project == project).first()
-            if agent_state:
-                return json.loads(agent_state.state_stack_json)[-1]["token_usage"]
-            return 0
-        
\ No newline at end of file
+        latest_state = self.get_latest_state(project)
+        if latest_state:
+            return latest_state["token_usage"]
+        return 0
@@ -0,0 +1,19 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import toml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Config reads and writes config.toml in the working directory and the storage paths
+# are relative to it, so the tests run in a scratch directory with the sample config.
+# The agents open their prompts at paths relative to the repository, hence the src link.
+WORKDIR = tempfile.mkdtemp(prefix="devika-tests-")
+shutil.copy(os.path.join(ROOT, "sample.config.toml"), WORKDIR)
+os.symlink(os.path.join(ROOT, "src"), os.path.join(WORKDIR, "src"))
+os.chdir(WORKDIR)
+for path in toml.load("sample.config.toml")["STORAGE"].values():
+    os.makedirs(os.path.dirname(path) if os.path.splitext(path)[1] else path, exist_ok=True)
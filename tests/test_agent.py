@@ -0,0 +1,35 @@
+from src.agents import agent as agent_module
+from src.agents.agent import Agent
+
+
+class FakeSearch:
+    def search_many(self, queries):
+        return {query: [{"href": f"https://example.com/{query}"}] for query in queries}
+
+    @staticmethod
+    def first_link(query_result):
+        return query_result[0]["href"]
+
+
+class FakeKnowledgeBase:
+    def get_knowledge(self, tag):
+        return "from the knowledge base" if tag == "known" else None
+
+    def add_knowledge(self, tag, contents):
+        pass
+
+
+def test_search_results_follow_the_query_order(monkeypatch):
+    agent = Agent.__new__(Agent)
+    agent.engine = "duckduckgo"
+    agent.logger = agent_module.Logger()
+    monkeypatch.setattr(agent_module, "KnowledgeBase", FakeKnowledgeBase)
+    monkeypatch.setattr(agent, "new_web_search", FakeSearch)
+    monkeypatch.setattr(agent, "research_query", lambda query, link, project_name: f"page of {link}")
+    monkeypatch.setattr(agent, "remember_research", lambda query, contents, project_name: None)
+
+    results = agent.search_queries(["First", "known", "last", "first"], "demo")
+
+    assert list(results) == ["first", "known", "last"]
+    assert results["known"] == "from the knowledge base"
+    assert results["last"] == "page of https://example.com/last"
@@ -0,0 +1,42 @@
+import hashlib
+
+import numpy as np
+
+from src.filesystem.context_packer import ContextPacker
+from src.filesystem.snapshot import ProjectSnapshot
+from src.memory import rag
+from src.memory.rag import VectorMemory
+
+
+def fake_embed(texts):
+    rows = [np.frombuffer(hashlib.sha256(text.encode()).digest(), dtype=np.uint8)[:16] for text in texts]
+    return np.asarray(rows, dtype=np.float32) / 255
+
+
+def chunks_of(project: str) -> list:
+    memory = VectorMemory("code")
+    return sorted(
+        item["text"] for item in memory.items
+        if item is not None and item["metadata"].get("project") == project
+    )
+
+
+def test_code_chunks_follow_the_project_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(rag, "embed", fake_embed)
+    project = tmp_path / "packer-project"
+    project.mkdir()
+    (project / "a.py").write_text("def a():\n    return 1\n")
+    (project / "b.py").write_text("def b():\n    return 2\n")
+
+    snapshot = ProjectSnapshot(str(project))
+    snapshot.refresh()
+    ContextPacker(snapshot).semantic_scores("return")
+    assert chunks_of("packer-project") == ["a.py\ndef a():\n    return 1\n", "b.py\ndef b():\n    return 2\n"]
+
+    (project / "a.py").write_text("def a():\n    return 10\n")
+    (project / "b.py").unlink()
+    snapshot.refresh()
+    scores = ContextPacker(snapshot).semantic_scores("return")
+
+    assert chunks_of("packer-project") == ["a.py\ndef a():\n    return 10\n"]
+    assert list(scores) == [str(project / "a.py")]
@@ -0,0 +1,48 @@
+import pytest
+
+from src.sandbox.code_runner import CommandResult
+from src.sandbox.environments import EnvironmentCache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = EnvironmentCache()
+    monkeypatch.setattr(cache, "envs_dir", str(tmp_path))
+    monkeypatch.setattr(cache, "failed", {})
+    return cache
+
+
+def test_failed_build_is_skipped_until_it_expires(cache, tmp_path, monkeypatch):
+    env_path = str(tmp_path / "p" / "python-0123")
+    builds = []
+
+    def build():
+        builds.append(env_path)
+        return CommandResult("pip install -r requirements.txt", 1, "no such package", 1.0)
+
+    assert not cache._build("python", env_path, build)
+    assert cache._known_failure("python", env_path)
+
+    monkeypatch.setattr(cache, "failed_build_ttl", 0)
+    assert not cache._known_failure("python", env_path)
+    assert env_path not in cache.failed
+
+
+@pytest.mark.parametrize("result", [
+    CommandResult("pip install", -9, "", 300.0, timed_out=True),
+    CommandResult("pip install", -9, "", 1.0, cancelled=True),
+    CommandResult("pip install", -24, "", 1800.0, usage={"limit": "CPU time limit (1800 s)"}),
+])
+def test_interrupted_build_is_retried(cache, tmp_path, result):
+    env_path = str(tmp_path / "p" / "python-0123")
+
+    assert not cache._build("python", env_path, lambda: result)
+    assert not cache._known_failure("python", env_path)
+
+
+def test_builds_run_sandboxed_with_the_build_limits(cache, tmp_path):
+    runner, env = cache._runner(str(tmp_path / "p" / "node-0123"))
+
+    assert runner.sandboxed
+    assert runner.limits == cache.build_limits
+    assert env["PIP_CACHE_DIR"].startswith(str(tmp_path))
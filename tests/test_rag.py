@@ -0,0 +1,113 @@
+import json
+import os
+import threading
+import uuid
+
+import numpy as np
+
+from src.memory import rag
+from src.memory.rag import VectorMemory
+
+DIM = 8
+
+
+def vector(i: int) -> np.ndarray:
+    v = np.zeros(DIM, dtype=np.float32)
+    v[i % DIM] = 1.0
+    return v
+
+
+def vectors(*indices) -> np.ndarray:
+    return np.stack([vector(i) for i in indices])
+
+
+def new_memory() -> VectorMemory:
+    return VectorMemory(f"test-{uuid.uuid4().hex}")
+
+
+def reload(memory: VectorMemory) -> VectorMemory:
+    collection = os.path.basename(memory.path)
+    VectorMemory._instances.pop((collection,))
+    return VectorMemory(collection)
+
+
+def texts(hits) -> list:
+    return [hit["text"] for hit in hits]
+
+
+def test_replace_drops_the_old_chunks_of_a_key():
+    memory = new_memory()
+    memory.replace(("demo", "a.py"), ["old a"], [{"project": "demo"}], vectors(0))
+    memory.replace(("demo", "b.py"), ["b"], [{"project": "demo"}], vectors(1))
+
+    assert memory.replace(("demo", "a.py"), ["b", "new a"], [{"project": "demo"}] * 2, vectors(1, 0)) == 2
+    assert len(memory) == 3
+    assert texts(memory.search("", 5, vector(0), project="demo")) == ["new a", "b", "b"]
+
+    memory.remove(("demo", "a.py"))
+    assert texts(memory.search("", 5, vector(0), project="demo")) == ["b"]
+    assert memory.keys() == [("demo", "b.py")]
+
+    reloaded = reload(memory)
+    assert len(reloaded) == 1
+    assert reloaded.keys() == [("demo", "b.py")]
+    assert texts(reloaded.search("", 5, vector(1))) == ["b"]
+
+
+def test_search_filters_by_metadata():
+    memory = new_memory()
+    memory.add(["one", "two", "three"], [{"project": "a"}, {"project": "b"}, {"project": "c"}], vectors(0, 0, 0))
+
+    assert texts(memory.search("", 5, vector(0), project="b")) == ["two"]
+    assert sorted(texts(memory.search("", 5, vector(0), project={"a", "c"}))) == ["one", "three"]
+    assert memory.search("", 5, vector(0), project="missing") == []
+
+
+def test_concurrent_adds_store_a_chunk_once(monkeypatch):
+    memory = new_memory()
+    barrier = threading.Barrier(4)
+
+    def slow_embed(chunks):
+        barrier.wait()  # every thread has passed the duplicate check
+        return vectors(*range(len(chunks)))
+
+    monkeypatch.setattr(rag, "embed", slow_embed)
+    threads = [threading.Thread(target=memory.add, args=(["same chunk"],)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(memory) == 1
+    with open(memory.items_path) as f:
+        assert len(f.readlines()) == 1
+
+
+def test_items_written_before_a_crash_are_kept():
+    memory = new_memory()
+    memory.add(["one", "two"], embeddings=vectors(0, 1))
+    # a crash after the items were appended but before the count was saved, mid-way through a line
+    with open(memory.meta_path, "w") as f:
+        json.dump({"dim": DIM, "count": 1}, f)
+    with open(memory.items_path, "a") as f:
+        f.write('{"digest": "torn')
+
+    reloaded = reload(memory)
+    assert len(reloaded) == 2
+    assert texts(reloaded.search("", 5, vector(1))) == ["two", "one"]
+    with open(reloaded.meta_path) as f:
+        assert json.load(f)["count"] == 2
+    assert reloaded.add(["three"], embeddings=vectors(2)) == 1
+    assert len(reload(reloaded)) == 3
+
+
+def test_removed_rows_are_compacted(monkeypatch):
+    monkeypatch.setattr(rag, "COMPACT_MIN_REMOVED", 4)
+    memory = new_memory()
+    for i in range(6):
+        memory.replace(("demo", "a.py"), [f"version {i}"], [{"project": "demo"}], vectors(i))
+
+    assert memory.count < 6
+    assert len(memory) == 1
+    assert texts(memory.search("", 5, vector(5), project="demo")) == ["version 5"]
+    assert texts(reload(memory).search("", 5, vector(5), project="demo")) == ["version 5"]
@@ -0,0 +1,18 @@
+import os
+
+from src.config import Config
+from src.filesystem import ReadCode
+from src.filesystem.context_packer import ContextPacker
+
+
+def test_code_budget_uses_the_model_api_id(monkeypatch):
+    os.makedirs(os.path.join(Config().get_projects_dir(), "budget-test"), exist_ok=True)
+    budgets = []
+    monkeypatch.setattr(ContextPacker, "pack", lambda self, query, budget: budgets.append(budget) or "")
+
+    read_code = ReadCode("budget test")
+    read_code.code_set_to_context("query", "LLAMA3 8B")
+    read_code.code_set_to_context("query", "GPT-4o")
+
+    context = Config().get_config()["CONTEXT"]
+    assert budgets == [context["MODEL_CODE_TOKEN_BUDGETS"]["llama3-8b-8192"], context["CODE_TOKEN_BUDGET"]]
@@ -0,0 +1,85 @@
+import os
+import sys
+
+import pytest
+
+from src.sandbox.code_runner import CodeRunner
+from src.sandbox.limits import SandboxLimits, resource
+
+FORK_BOMB = """
+import os, time
+forks = 0
+for _ in range(200):
+    try:
+        pid = os.fork()
+    except OSError:
+        break
+    if pid == 0:
+        time.sleep(2)
+        os._exit(0)
+    forks += 1
+print(forks)
+"""
+
+MEMORY_HOG = "data = b'x' * (1024 * 1024 * 1024); print(len(data))"
+
+
+def write_script(tmp_path, source: str) -> str:
+    path = tmp_path / "script.py"
+    path.write_text(source)
+    return str(path)
+
+
+def limits_enforced(max_processes: int) -> bool:
+    """
+    Process counts are capped by a cgroup, or by RLIMIT_NPROC, which root is exempt from.
+    """
+    limits = SandboxLimits(max_processes=max_processes)
+    limits.prepare()
+    try:
+        return limits.cgroup is not None or (limits.nproc_limit is not None and os.getuid() != 0)
+    finally:
+        limits.cleanup()
+
+
+@pytest.mark.skipif(resource is None, reason="no rlimits on this platform")
+def test_fork_bomb_is_stopped(tmp_path):
+    if not limits_enforced(16):
+        pytest.skip("neither cgroups nor RLIMIT_NPROC can cap the process count here")
+
+    runner = CodeRunner(timeout=30, limits={"max_processes": 16})
+    result = runner.run(f'"{sys.executable}" {write_script(tmp_path, FORK_BOMB)}', str(tmp_path))
+
+    assert not result.timed_out
+    assert int(result.output.split()[0]) < 16
+
+
+@pytest.mark.skipif(resource is None, reason="no rlimits on this platform")
+def test_memory_hog_is_stopped(tmp_path):
+    runner = CodeRunner(timeout=30, limits={"memory_mb": 256})
+    result = runner.run(f'"{sys.executable}" {write_script(tmp_path, MEMORY_HOG)}', str(tmp_path))
+
+    assert result.failed
+    assert str(1024 * 1024 * 1024) not in result.output
+    if "oom_kills" in result.usage:
+        assert result.usage["limit"] == "memory limit (256 MB)"
+
+
+@pytest.mark.skipif(resource is None, reason="no rlimits on this platform")
+def test_peak_memory_excludes_the_parent(tmp_path):
+    ballast = b"x" * (256 * 1024 * 1024)  # noqa: F841, the server's memory a forked child starts with
+    result = CodeRunner(timeout=30).run("true", str(tmp_path))
+
+    assert result.usage.get("peak_memory_kb", 0) < 128 * 1024
+
+
+def test_cancel_stops_the_commands_of_a_project(tmp_path):
+    runner = CodeRunner(timeout=30)
+    run = runner.start("sleep 30", str(tmp_path), "cancel-test")
+
+    assert CodeRunner.cancel("cancel-test") == 1
+    result = runner.wait(run, "cancel-test")
+
+    assert result.cancelled
+    assert result.duration < 10
+    assert CodeRunner.cancel("cancel-test") == 0
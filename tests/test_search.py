@@ -0,0 +1,56 @@
+import asyncio
+
+import json
+
+from src.browser.search import DuckDuckGoSearch, GoogleSearch
+
+
+def test_duckduckgo_fetch_parses_results(monkeypatch):
+    rows = [
+        {"u": "https://example.com/a%20b", "t": "<b>Example</b> &amp; co", "a": "First <b>result</b>"},
+        {"u": "https://example.com/empty", "t": "No body", "a": ""},
+        {"u": "http://www.google.com/search?q=devika ddg", "t": "Google", "a": "skipped"},
+    ]
+    page = b"DDG.pageLayout.load('d'," + json.dumps(rows).encode() + b");DDG.duckbar.load('images');"
+    requests = []
+
+    async def get_url(method, url, data=None, params=None):
+        requests.append((method, url))
+        if method == "POST":
+            return b'vqd="4-123456"'
+        assert params["vqd"] == "4-123456"
+        return page
+
+    engine = DuckDuckGoSearch()
+    monkeypatch.setattr(engine, "_get_url", get_url)
+
+    results = engine.search_many(["devika ddg"])
+
+    assert results["devika ddg"] == [{
+        "title": "Example & co",
+        "href": "https://example.com/a b",
+        "body": "First result",
+    }]
+    assert engine.first_link(results["devika ddg"]) == "https://example.com/a b"
+    assert [method for method, _ in requests] == ["POST", "GET"]
+
+    # the vqd token and the result are cached
+    assert engine.search_many(["devika ddg"]) == results
+    assert len(requests) == 2
+
+
+def test_duckduckgo_stale_token_is_not_cached(monkeypatch):
+    async def get_url(method, url, data=None, params=None):
+        return b'vqd="4-stale"' if method == "POST" else b"not a results page"
+
+    engine = DuckDuckGoSearch()
+    monkeypatch.setattr(engine, "_get_url", get_url)
+
+    assert asyncio.run(engine.fetch("devika stale")) == []
+    assert engine.client.vqd_tokens.get("devika stale") is None
+
+
+def test_google_empty_response_is_not_cached():
+    engine = GoogleSearch()
+    assert not engine.has_results({"searchInformation": {"totalResults": "0"}})
+    assert engine.has_results({"items": [{"link": "https://example.com"}]})
@@ -0,0 +1,19 @@
+from src.llm import TokenUsageTracker
+from src.state import AgentState
+
+
+def test_recreated_project_starts_from_zero():
+    tracker = TokenUsageTracker()
+    AgentState().create_state("evicted project")
+    tracker.add("evicted project", 120)
+    tracker.flush("evicted project")
+    tracker.add("evicted project", 30)
+
+    tracker.evict("evicted project")
+    AgentState().delete_state("evicted project")
+    AgentState().create_state("evicted project")
+
+    assert tracker.get("evicted project") == 0
+    assert tracker.add("evicted project", 5) == 5
+    tracker.flush("evicted project")
+    assert AgentState().get_latest_token_usage("evicted project") == 5
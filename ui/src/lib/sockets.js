@@ -1,10 +1,35 @@
 import { socket } from "./api";
-import { messages, agentState, isSending, tokenUsage } from "./store";
+import { messages, agentState, isSending, tokenUsage, streamingResponse } from "./store";
 import { toast } from "svelte-sonner";
 import { get } from "svelte/store";
 
 let prevMonologue = null;
 
+// The backend emits agent states the moment they happen. They are replayed from
+// this queue at most one per REPLAY_INTERVAL ms so quick successive steps (files
+// written, commands run) stay on screen long enough to read, without the agent
+// waiting for the UI. When the replay falls behind, the oldest states are skipped.
+const REPLAY_INTERVAL = 400;
+const REPLAY_MAX_BEHIND = 5;
+let replayQueue = [];
+let replayTimer = null;
+
+function replayNextState() {
+  if (replayQueue.length === 0) {
+    replayTimer = null;
+    return;
+  }
+  if (replayQueue.length > REPLAY_MAX_BEHIND) {
+    replayQueue = replayQueue.slice(-REPLAY_MAX_BEHIND);
+  }
+  const state = replayQueue.shift();
+  agentState.set(state);
+  if (state.completed) {
+    isSending.set(false);
+  }
+  replayTimer = setTimeout(replayNextState, REPLAY_INTERVAL);
+}
+
 export function initializeSockets() {
 
   socket.connect();
@@ -23,10 +48,9 @@ export function initializeSockets() {
   });
 
   socket.on("agent-state", function (state) {
-    const lastState = state[state.length - 1];
-    agentState.set(lastState);
-    if (lastState.completed) {
-      isSending.set(false);
+    replayQueue.push(state[state.length - 1]);
+    if (replayTimer === null) {
+      replayNextState();
     }
   });
 
@@ -35,7 +59,14 @@ export function initializeSockets() {
   });
 
   socket.on("inference", function (error) {
-    if (error["type"] == "error") {
+    if (error["type"] == "stream_start") {
+      streamingResponse.set("");
+    } else if (error["type"] == "stream") {
+      streamingResponse.update((text) => text + error["chunk"]);
+    } else if (error["type"] == "stream_end") {
+      streamingResponse.set("");
+    } else if (error["type"] == "error") {
+      streamingResponse.set("");
       toast.error(error["message"]);
       isSending.set(false);
     } else if (error["type"] == "warning") {
@@ -77,6 +108,9 @@ export function destroySockets() {
     socket.off("socket_response");
     socket.off("server-message");
     socket.off("agent-state");
+    clearTimeout(replayTimer);
+    replayTimer = null;
+    replayQueue = [];
     socket.off("tokens");
     socket.off("inference");
     socket.off("info");
@@ -43,6 +43,8 @@ export const searchEngineList = writable([]);
 // Agent related stores
 export const agentState = writable(null);
 export const isSending = writable(false);
+// Text of the model response being generated, shown live until the inference ends
+export const streamingResponse = writable('');
 
 // Token usage store
 export const tokenUsage = writable(0);